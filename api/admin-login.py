@@ -1,49 +1,28 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import os
+from admin_auth import check_password, issue_token
+from http_core import Endpoint, HTTPError, json_response, make_handler
+from security_utils import clear_failed_logins, get_client_id, is_login_throttled
 
-class handler(BaseHTTPRequestHandler):
-    def do_POST(self):
-        try:
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-            
-            password = data.get('password')
-            admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
-            
-            if password == admin_password:
-                success_response = json.dumps({
-                    'success': True,
-                    'message': 'Login successful',
-                    'token': 'admin_token_placeholder'
-                })
-                self.wfile.write(success_response.encode('utf-8'))
-            else:
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                error_response = json.dumps({'error': 'Invalid password'})
-                self.wfile.write(error_response.encode('utf-8'))
-                
-        except Exception as e:
-            print(f"Handler error: {e}")
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            error_response = json.dumps({'error': str(e)})
-            self.wfile.write(error_response.encode('utf-8'))
-    
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+def post(request):
+    client_id = get_client_id(request.headers)
+    with request.phase('rate_limit'):
+        is_limited, limit_msg = is_login_throttled(client_id)
+    if is_limited:
+        raise HTTPError(429, limit_msg)
+
+    data = request.json()
+
+    # The attempt was counted by is_login_throttled; a failure just keeps it
+    if not check_password(data.get('password')):
+        raise HTTPError(401, 'Invalid password')
+    clear_failed_logins(client_id)
+
+    token, expires = issue_token()
+    return json_response({
+        'success': True,
+        'message': 'Login successful',
+        'token': token,
+        'expiresAt': expires
+    }, headers=[('Cache-Control', 'no-store')])
+
+endpoint = Endpoint('admin-login', {'POST': post}, max_body=1000)
+handler = make_handler(endpoint)
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from http_core import HTTPError
+
+# Stateless admin tokens: "v1.<key id>.<expiry>.<signature>", where the
+# signature is an HMAC-SHA256 of the rest. Any instance holding the keys
+# verifies a token locally, with no session store to consult.
+#
+# ADMIN_TOKEN_KEYS is a comma-separated list of "kid:secret" pairs. The
+# first key signs new tokens and every key verifies, so rotation is: add the
+# new key first, keep the old one until its tokens expire, then drop it.
+# Without it, a key derived from ADMIN_PASSWORD is used, so changing the
+# password also revokes outstanding tokens.
+TOKEN_VERSION = 'v1'
+TOKEN_TTL = int(os.getenv('ADMIN_TOKEN_TTL', 8 * 3600))
+VERIFIED_CACHE_SIZE = 256
+
+class InvalidToken(Exception):
+    pass
+
+def _load_keys() -> Tuple[str, Dict[str, bytes]]:
+    keys = {}
+    for pair in os.getenv('ADMIN_TOKEN_KEYS', '').split(','):
+        kid, _, secret = pair.strip().partition(':')
+        if kid and secret:
+            keys[kid] = secret.encode('utf-8')
+    if not keys:
+        password = os.getenv('ADMIN_PASSWORD', 'admin123').encode('utf-8')
+        keys['pw'] = hmac.new(password, b'onam-admin-token', hashlib.sha256).digest()
+    return next(iter(keys)), keys
+
+SIGNING_KID, KEYS = _load_keys()
+
+def _sign(key: bytes, message: str) -> str:
+    digest = hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+def issue_token(ttl: int = TOKEN_TTL, now: Optional[float] = None) -> Tuple[str, int]:
+    """(token, expiry as a unix timestamp)"""
+    expires = int(now if now is not None else time.time()) + ttl
+    message = f"{TOKEN_VERSION}.{SIGNING_KID}.{expires}"
+    return f"{message}.{_sign(KEYS[SIGNING_KID], message)}", expires
+
+# Tokens already verified, mapped to their expiry. An admin session makes
+# hundreds of upload/delete calls with the same token; after the first, a
+# dict lookup replaces the HMAC.
+_verified: 'OrderedDict[str, int]' = OrderedDict()
+_verified_lock = threading.Lock()
+
+def verify_token(token: str, now: Optional[float] = None) -> int:
+    """Expiry of a valid token; raises InvalidToken otherwise"""
+    now = now if now is not None else time.time()
+    with _verified_lock:
+        expires = _verified.get(token)
+        if expires is not None:
+            _verified.move_to_end(token)
+    if expires is None:
+        expires = _check_signature(token)
+    if expires <= now:
+        with _verified_lock:
+            _verified.pop(token, None)
+        raise InvalidToken('expired')
+    with _verified_lock:
+        if token not in _verified:
+            _verified[token] = expires
+            if len(_verified) > VERIFIED_CACHE_SIZE:
+                _verified.popitem(last=False)
+    return expires
+
+def _check_signature(token: str) -> int:
+    try:
+        version, kid, expires, signature = token.split('.')
+        if not (expires.isascii() and expires.isdigit()):
+            raise ValueError(expires)  # int() would also take '+1', ' 1' or '١'
+        expires = int(expires)
+    except ValueError:
+        raise InvalidToken('malformed')
+    key = KEYS.get(kid)
+    if version != TOKEN_VERSION or key is None:
+        raise InvalidToken('unknown key')
+    # compare_digest only takes ASCII str, so compare bytes: a token with
+    # non-ASCII characters is just a bad signature, not a TypeError
+    expected = _sign(key, f"{version}.{kid}.{expires}").encode('ascii')
+    if not hmac.compare_digest(signature.encode('utf-8'), expected):
+        raise InvalidToken('bad signature')
+    return expires
+
+def check_password(password) -> bool:
+    expected = os.getenv('ADMIN_PASSWORD', 'admin123').encode('utf-8')
+    return isinstance(password, str) and hmac.compare_digest(password.encode('utf-8'), expected)
+
+def require_admin(request):
+    """Raise 401 unless the request carries a valid admin bearer token"""
+    auth_header = request.headers.get('Authorization') or ''
+    if not auth_header.startswith('Bearer '):
+        raise HTTPError(401, 'Admin authentication required')
+    try:
+        verify_token(auth_header[len('Bearer '):].strip())
+    except InvalidToken:
+        raise HTTPError(401, 'Admin session expired or invalid. Please log in again.')
@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# Vercel Blob API client. One keep-alive Session per warm process; listings
+# follow cursors to the end and are yielded as each page arrives.
+#
+# requests (~30ms to import) is loaded with the session on first use, so
+# cold starts that never reach the blob store (preflights, 304s, auth
+# failures, local storage) don't pay for it.
+BLOB_API_URL = os.getenv('BLOB_API_URL', 'https://blob.vercel-storage.com').rstrip('/')
+PAGE_LIMIT = 1000
+MAX_CONCURRENCY = 4
+
+_session = None
+_session_lock = threading.Lock()
+
+class BlobAPIError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"Blob API call failed with status {status_code}")
+        self.status_code = status_code
+
+def get_session() -> 'requests.Session':
+    """Shared keep-alive session, sized for the concurrent crawl"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=MAX_CONCURRENCY, pool_maxsize=MAX_CONCURRENCY * 2)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def iter_blobs(blob_token: str, prefix: str, timeout: float = 10) -> Iterator[dict]:
+    """Yield every blob under prefix, following cursor/hasMore page by page"""
+    session = get_session()
+    headers = {'Authorization': f'Bearer {blob_token}'}
+    params = {'prefix': prefix, 'limit': PAGE_LIMIT}
+    while True:
+        response = session.get(f'{BLOB_API_URL}/list', headers=headers, params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise BlobAPIError(response.status_code)
+        data = response.json()
+        yield from data.get('blobs', [])
+        if not data.get('hasMore') or not data.get('cursor'):
+            return
+        params['cursor'] = data['cursor']
+
+_DONE = object()
+
+def iter_prefixes(blob_token: str, prefixes: Iterable[str],
+                  max_workers: Optional[int] = None) -> Iterator[dict]:
+    """
+    Crawl several prefixes at once with bounded concurrency. Blobs are yielded
+    in arrival order (not sorted) so callers can start work before the crawl
+    finishes. The first crawl error is re-raised once the others stop.
+    """
+    prefixes = list(prefixes)
+    if len(prefixes) == 1:
+        yield from iter_blobs(blob_token, prefixes[0])
+        return
+
+    results: queue.Queue = queue.Queue(maxsize=PAGE_LIMIT * 2)
+    stop = threading.Event()
+
+    def crawl(prefix):
+        try:
+            for blob in iter_blobs(blob_token, prefix):
+                if stop.is_set():
+                    break
+                results.put(blob)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(_DONE)
+
+    from concurrent.futures import ThreadPoolExecutor
+    workers = min(max_workers or MAX_CONCURRENCY, len(prefixes)) or 1
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blob-list')
+    for prefix in prefixes:
+        executor.submit(crawl, prefix)
+
+    error = None
+    remaining = len(prefixes)
+    try:
+        while remaining:
+            item = results.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                error = error or item
+                stop.set()
+            elif not stop.is_set():
+                yield item
+    finally:
+        stop.set()
+        # Unblock any crawler waiting on a full queue, then let them exit
+        while remaining:
+            if results.get() is _DONE:
+                remaining -= 1
+        executor.shutdown(wait=False)
+    if error is not None:
+        raise error
+
+def put_blob(blob_token: str, pathname: str, chunks: Iterable[bytes],
+             content_type: str, overwrite: bool = True, timeout: float = 60) -> dict:
+    """
+    Stream chunks to the blob store (chunked transfer, never fully buffered).
+    With overwrite=False the call fails if the pathname already exists.
+    """
+    response = get_session().put(
+        f'{BLOB_API_URL}/{pathname}',
+        headers={
+            'Authorization': f'Bearer {blob_token}',
+            'access': 'public',
+            'x-api-version': '7',
+            'x-content-type': content_type,
+            'x-add-random-suffix': '0',
+            'x-allow-overwrite': '1' if overwrite else '0',
+        },
+        data=chunks,
+        timeout=timeout,
+    )
+    if response.status_code not in (200, 201):
+        raise BlobAPIError(response.status_code)
+    return response.json()
+
+def fetch_blob(url: str, timeout: float = 30) -> bytes:
+    """Download a (public) blob's bytes"""
+    response = get_session().get(url, timeout=timeout)
+    if response.status_code != 200:
+        raise BlobAPIError(response.status_code)
+    return response.content
+
+def delete_blobs(blob_token: str, urls: List[str], timeout: float = 30):
+    """Delete up to a batch of blobs by URL in one call"""
+    response = get_session().post(
+        f'{BLOB_API_URL}/delete',
+        headers={'Authorization': f'Bearer {blob_token}', 'x-api-version': '7'},
+        json={'urls': urls},
+        timeout=timeout,
+    )
+    if response.status_code != 200:
+        raise BlobAPIError(response.status_code)
@@ -0,0 +1,312 @@
+import html
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from email.mime.multipart import MIMEMultipart
+
+# Durable outbound email spool. Handlers enqueue and return immediately;
+# a background worker drains the spool over SMTP with retries and backoff.
+# smtplib, ssl and email.mime are only imported by the worker when it
+# delivers, keeping them off the register handlers' cold start.
+SPOOL_PATH = os.getenv('EMAIL_SPOOL_PATH', '/tmp/onam-email-spool.db')
+MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+BACKOFF_BASE = float(os.getenv('EMAIL_BACKOFF_SECONDS', 5))
+BACKOFF_MAX = 900  # 15 minutes
+BATCH_SIZE = 20
+SEND_LEASE = 300  # seconds a claimed message is reserved for the worker sending it
+
+# Digest mode: with EMAIL_DIGEST_INTERVAL (seconds) set, routine
+# notifications collect in the spool's digest table and go out as one
+# summary email when EMAIL_DIGEST_MAX_ITEMS have built up or the oldest has
+# waited the interval. The summary is written to the outbox in the same
+# transaction that clears the digest, so nothing is lost or sent twice.
+DIGEST_INTERVAL = float(os.getenv('EMAIL_DIGEST_INTERVAL', 0))
+DIGEST_MAX_ITEMS = int(os.getenv('EMAIL_DIGEST_MAX_ITEMS', 100))
+DIGEST_TITLES = {'player': 'Players', 'team': 'Teams', 'sponsor': 'Sponsors'}
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_conn = None
+_worker = None
+
+def smtp_config() -> Optional[dict]:
+    """Read SES SMTP settings from the environment (None if incomplete)"""
+    config = {
+        'sender': os.getenv('SENDER_EMAIL'),
+        'username': os.getenv('SES_SMTP_USERNAME'),
+        'password': os.getenv('SES_SMTP_PASSWORD'),
+        'host': os.getenv('SES_SMTP_HOST'),
+        'port': int(os.getenv('SES_SMTP_PORT', 587)),
+    }
+    if not all([config['sender'], config['username'], config['password'], config['host']]):
+        return None
+    return config
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(SPOOL_PATH, timeout=5, isolation_level=None, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        _conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)')
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS digest (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+    return _conn
+
+def build_message(sender: str, subject: str, body: str) -> 'MIMEMultipart':
+    """Build the HTML notification sent to the admin inbox"""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = sender  # Send to yourself for now
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+def enqueue_email(subject: str, body: str) -> bool:
+    """Spool an admin notification for background delivery"""
+    if smtp_config() is None:
+        print("Missing SMTP configuration")
+        return False
+
+    now = time.time()
+    try:
+        with _lock:
+            _get_conn().execute(
+                'INSERT INTO outbox (subject, body, next_attempt, created_at) VALUES (?, ?, ?, ?)',
+                (subject, body, now, now)
+            )
+    except sqlite3.Error as e:
+        print(f"Email spool error: {e}")
+        return False
+
+    ensure_worker()
+    _wake.set()
+    return True
+
+def digest_enabled() -> bool:
+    return DIGEST_INTERVAL > 0
+
+def notify(subject: str, body: str, kind: str, summary: dict, immediate: bool = False) -> bool:
+    """
+    Admin notification for one registration. In digest mode only `summary`
+    ({label: value}) is kept for the next digest, unless `immediate`, in
+    which case the full email is spooled right away as before.
+    """
+    if immediate or not digest_enabled():
+        return enqueue_email(subject, body)
+    if smtp_config() is None:
+        print("Missing SMTP configuration")
+        return False
+
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.execute('INSERT INTO digest (kind, summary, created_at) VALUES (?, ?, ?)',
+                         (kind, json.dumps(summary), time.time()))
+    except sqlite3.Error as e:
+        print(f"Email spool error: {e}")
+        return False
+
+    # The worker flushes when the digest is full and otherwise sleeps until
+    # the oldest entry is due; waking it is cheap, an SMTP session is not
+    ensure_worker()
+    _wake.set()
+    return True
+
+def render_digest(rows) -> Tuple[str, str]:
+    """(subject, html body) summarizing (kind, summary json, created_at) rows"""
+    groups = {}
+    for kind, summary, created_at in rows:
+        groups.setdefault(kind, []).append((json.loads(summary), created_at))
+
+    counts = ', '.join(f"{len(items)} {DIGEST_TITLES.get(kind, kind).lower()}" for kind, items in groups.items())
+    subject = f"📋 {len(rows)} New Registrations - Onam Tournament 2025 ({counts})"
+    sections = []
+    for kind, items in groups.items():
+        labels = list(items[0][0])
+        header = ''.join(f"<th>{html.escape(label)}</th>" for label in labels + ['Time'])
+        lines = []
+        for summary, created_at in items:
+            cells = [str(summary.get(label, '')) for label in labels]
+            cells.append(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created_at)))
+            lines.append('<tr>' + ''.join(f"<td>{html.escape(cell)}</td>" for cell in cells) + '</tr>')
+        sections.append(f"<h3>{DIGEST_TITLES.get(kind, kind)} ({len(items)})</h3>"
+                        f"<table border=\"1\" cellpadding=\"4\"><tr>{header}</tr>{''.join(lines)}</table>")
+    body = f"""
+    <html>
+    <body>
+        <h2>Registration Digest</h2>
+        <p><strong>Tournament:</strong> Onam Special Football Tournament 2025</p>
+        {''.join(sections)}
+        <p>Full details are available from the registrations export.</p>
+    </body>
+    </html>
+    """
+    return subject, body
+
+def flush_digest(force: bool = False) -> int:
+    """
+    Move accumulated digest entries into the outbox as summary emails (up
+    to DIGEST_MAX_ITEMS each) if the digest is full, overdue, or `force`.
+    Returns the number of entries flushed.
+    """
+    flushed = 0
+    with _lock:
+        conn = _get_conn()
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute('SELECT id, kind, summary, created_at FROM digest ORDER BY id LIMIT ?',
+                                    (DIGEST_MAX_ITEMS,)).fetchall()
+                now = time.time()
+                due = rows and (force or len(rows) >= DIGEST_MAX_ITEMS or rows[0][3] + DIGEST_INTERVAL <= now)
+                if not due:
+                    conn.execute('ROLLBACK')
+                    return flushed
+                subject, body = render_digest([row[1:] for row in rows])
+                conn.execute('INSERT INTO outbox (subject, body, next_attempt, created_at) VALUES (?, ?, ?, ?)',
+                             (subject, body, now, now))
+                conn.execute('DELETE FROM digest WHERE id <= ?', (rows[-1][0],))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+            flushed += len(rows)
+
+def _digest_due() -> Optional[float]:
+    with _lock:
+        row = _get_conn().execute('SELECT MIN(created_at) FROM digest').fetchone()
+    return None if not row or row[0] is None else row[0] + DIGEST_INTERVAL
+
+def _claim_due(now: float, limit: int):
+    # Due rows are leased ('sending' until now + SEND_LEASE) in the same
+    # transaction that selects them, so workers in two processes sharing the
+    # spool never send the same message. Rows whose worker died mid-send
+    # become due again when the lease runs out.
+    with _lock:
+        conn = _get_conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                "SELECT id, subject, body, attempts FROM outbox "
+                "WHERE status IN ('pending', 'sending') AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            conn.executemany("UPDATE outbox SET status = 'sending', next_attempt = ? WHERE id = ?",
+                             [(now + SEND_LEASE, row[0]) for row in rows])
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+    return rows
+
+def _next_due() -> Optional[float]:
+    with _lock:
+        row = _get_conn().execute(
+            "SELECT MIN(next_attempt) FROM outbox WHERE status IN ('pending', 'sending')"
+        ).fetchone()
+    return row[0] if row else None
+
+def _mark_sent(message_id: int):
+    with _lock:
+        _get_conn().execute('DELETE FROM outbox WHERE id = ?', (message_id,))
+
+def _mark_failed(message_id: int, attempts: int, error: str):
+    attempts += 1
+    if attempts >= MAX_ATTEMPTS:
+        status, next_attempt = 'failed', time.time()
+        print(f"Email {message_id} gave up after {attempts} attempts: {error}")
+    else:
+        # Exponential backoff with jitter so a recovering SES region isn't stampeded
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempts - 1)))
+        status, next_attempt = 'pending', time.time() + delay * random.uniform(0.8, 1.2)
+    with _lock:
+        _get_conn().execute(
+            'UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?',
+            (status, attempts, next_attempt, error[:500], message_id)
+        )
+
+def drain(max_messages: Optional[int] = None) -> Tuple[int, int]:
+    """Deliver due messages now; returns (sent, failed)"""
+    config = smtp_config()
+    if config is None:
+        return 0, 0
+
+    from smtp_pool import get_pool
+    pool = get_pool(config['host'], config['port'], config['username'], config['password'])
+    sent = failed = 0
+    while max_messages is None or sent + failed < max_messages:
+        limit = BATCH_SIZE if max_messages is None else min(BATCH_SIZE, max_messages - sent - failed)
+        rows = _claim_due(time.time(), limit)
+        if not rows:
+            break
+
+        # One pooled session carries the whole batch
+        sender = config['sender']
+        batch = [(sender, [sender], build_message(sender, subject, body).as_string())
+                 for _, subject, body, _ in rows]
+        for (message_id, _, _, attempts), error in zip(rows, pool.send_batch(batch)):
+            if error is None:
+                _mark_sent(message_id)
+                sent += 1
+            else:
+                print(f"Email error: {error}")
+                _mark_failed(message_id, attempts, str(error))
+                failed += 1
+    return sent, failed
+
+def _run_worker():
+    while True:
+        try:
+            flush_digest()
+            drain()
+            next_due = min((t for t in (_next_due(), _digest_due()) if t is not None), default=None)
+        except Exception as e:
+            print(f"Email worker error: {e}")
+            next_due = time.time() + BACKOFF_BASE
+
+        timeout = None if next_due is None else max(0.0, next_due - time.time())
+        _wake.wait(timeout)
+        _wake.clear()
+
+def ensure_worker():
+    """Start the background delivery thread once per warm process"""
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name='email-queue', daemon=True)
+            _worker.start()
+
+def pending_count() -> int:
+    with _lock:
+        return _get_conn().execute(
+            "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')"
+        ).fetchone()[0]
@@ -1,46 +1,46 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import os
-import requests
+from admin_auth import require_admin
+from gallery_bulk import BulkRequestError, bulk_delete, resolve_targets
+from http_core import Endpoint, HTTPError, json_response, make_handler
+from photo_storage import get_storage
 
-class handler(BaseHTTPRequestHandler):
-    def do_DELETE(self):
-        try:
-            # Check admin authentication
-            auth_header = self.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                error_response = json.dumps({'error': 'Admin authentication required'})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'DELETE, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            # For now, return success (implement actual delete later)
-            response = json.dumps({
-                'message': 'Photo deletion feature coming soon',
-                'status': 'success'
-            })
-            self.wfile.write(response.encode('utf-8'))
-            
-        except Exception as e:
-            print(f"Delete error: {e}")
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            error_response = json.dumps({'error': 'Delete failed'})
-            self.wfile.write(error_response.encode('utf-8'))
-    
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-        self.end_headers()
+def delete(request):
+    # Check admin authentication
+    require_admin(request)
+
+    data = request.json()
+
+    storage = get_storage()
+    if storage is None:
+        raise HTTPError(503, 'Photo storage not configured')
+
+    try:
+        with request.phase('resolve'):
+            targets = resolve_targets(storage, data)
+        with request.phase('delete'):
+            results = bulk_delete(storage, targets)
+    except BulkRequestError as e:
+        raise HTTPError(400, str(e))
+    deleted = sum(1 for r in results if r['status'] == 'deleted')
+    failed = sum(1 for r in results if r['status'] == 'error')
+    if not deleted and not failed:
+        # Every target was unknown: nothing happened, so don't report success
+        return json_response({
+            'error': 'Photo not found' if len(results) == 1 else 'No matching photos found',
+            'status': 'not_found',
+            'deleted': 0,
+            'results': results
+        }, 404)
+    # 'success' only when every requested photo is gone; per-item statuses say which weren't
+    complete = deleted == len(results)
+    return json_response({
+        'message': f"Deleted {deleted} of {len(results)} photos",
+        'status': 'success' if complete else 'partial',
+        'deleted': deleted,
+        'results': results
+    }, 200 if complete else 207)
+
+# Some proxies drop DELETE bodies; POST carries the same bulk request.
+# 500KB body limit: room for a few thousand pathnames
+endpoint = Endpoint('gallery-delete', {'DELETE': delete, 'POST': delete}, max_body=512000,
+                    allow_headers='Content-Type, Authorization', error_message='Delete failed')
+handler = make_handler(endpoint)
@@ -1,107 +1,114 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import os
-import requests
-from datetime import datetime
+from gallery_index import BlobAPIError, MAX_PAGE_SIZE, get_listing, paginate
+from gallery_search import SearchRequestError, get_index, parse_filters
+from http_core import Endpoint, HTTPError, Response, etag_matches, json_response, make_handler
+from json_stream import json_stream_response
+from photo_storage import get_storage
+from site_data import category_values
 
-class handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        try:
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            # Get Vercel Blob token
-            blob_token = os.getenv('BLOB_READ_WRITE_TOKEN')
-            
-            if not blob_token:
-                # Return empty gallery if no blob storage configured
-                response = json.dumps({
-                    'photos': [],
-                    'message': 'No photos uploaded yet. Blob storage not configured.'
-                })
-                self.wfile.write(response.encode('utf-8'))
-                return
-            
-            try:
-                # List all blobs in the tournament-photos folder
-                list_url = 'https://blob.vercel-storage.com/list'
-                headers = {
-                    'Authorization': f'Bearer {blob_token}'
-                }
-                params = {
-                    'prefix': 'tournament-photos/'
-                }
-                
-                blob_response = requests.get(list_url, headers=headers, params=params)
-                
-                if blob_response.status_code == 200:
-                    blob_data = blob_response.json()
-                    photos = []
-                    
-                    for i, blob in enumerate(blob_data.get('blobs', [])):
-                        # Extract metadata from blob
-                        photo = {
-                            'id': i + 1,
-                            'url': blob.get('url', ''),
-                            'title': blob.get('pathname', '').split('/')[-1].replace('.jpg', '').replace('.png', '').replace('-', ' ').title(),
-                            'description': f"Tournament photo uploaded on {blob.get('uploadedAt', '')[:10]}",
-                            'category': 'tournament',
-                            'date': blob.get('uploadedAt', '')[:10] if blob.get('uploadedAt') else datetime.now().strftime('%Y-%m-%d'),
-                            'size': blob.get('size', 0),
-                            'pathname': blob.get('pathname', ''),
-                            'tags': ['tournament', 'onam', 'football']
-                        }
-                        photos.append(photo)
-                    
-                    response = json.dumps({
-                        'photos': photos,
-                        'total': len(photos)
-                    })
-                else:
-                    # Fallback to sample photos if blob storage fails
-                    sample_photos = [
-                        {
-                            'id': 1,
-                            'url': '/static/images/sample1.jpg',
-                            'title': 'Tournament Opening',
-                            'description': 'Opening ceremony of Onam Football Tournament 2025',
-                            'category': 'tournament',
-                            'date': '2025-08-05',
-                            'size': 1024000,
-                            'pathname': 'sample1.jpg',
-                            'tags': ['onam', 'football', 'opening']
-                        }
-                    ]
-                    response = json.dumps({
-                        'photos': sample_photos,
-                        'message': 'Using sample photos - Blob storage error'
-                    })
-                
-            except Exception as blob_error:
-                print(f"Blob storage error: {blob_error}")
-                # Return empty gallery on error
-                response = json.dumps({
-                    'photos': [],
-                    'message': 'Error accessing photo storage'
-                })
-            
-            self.wfile.write(response.encode('utf-8'))
-            
-        except Exception as e:
-            print(f"Gallery photos error: {e}")
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            error_response = json.dumps({'error': 'Failed to fetch photos'})
-            self.wfile.write(error_response.encode('utf-8'))
-    
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+SAMPLE_PHOTOS = [
+    {
+        'id': 1,
+        'url': '/static/images/sample1.jpg',
+        'title': 'Tournament Opening',
+        'description': 'Opening ceremony of Onam Football Tournament 2025',
+        'category': 'tournament',
+        'date': '2025-08-05',
+        'size': 1024000,
+        'pathname': 'sample1.jpg',
+        'tags': ['onam', 'football', 'opening']
+    }
+]
+
+def get(request):
+    # Parse pagination parameters
+    cursor = request.query.get('cursor')
+    limit = request.query.get('limit')
+    try:
+        limit = None if limit is None else max(1, min(int(limit), MAX_PAGE_SIZE))
+    except ValueError:
+        raise HTTPError(400, 'limit must be a number')
+    # Optional filters: category, tag, from/to (YYYY-MM-DD) and q (title, description and tag words)
+    try:
+        filters = parse_filters(request.query, category_values())
+    except SearchRequestError as e:
+        raise HTTPError(400, str(e))
+    # Polling clients pass the version they have and get only what changed
+    since = request.query.get('since')
+    if since is not None:
+        if not since.isdigit():
+            raise HTTPError(400, 'since must be a gallery version number')
+        if cursor or any(filters.values()):
+            raise HTTPError(400, 'since cannot be combined with a cursor or filters')
+        since = int(since)
+
+    # Vercel Blob (or local) photo storage
+    storage = get_storage()
+
+    if storage is None:
+        # Return empty gallery if no blob storage configured
+        return json_response({
+            'photos': [],
+            'message': 'No photos uploaded yet. Blob storage not configured.'
+        })
+
+    try:
+        with request.phase('listing'):
+            listing = get_listing(storage)
+    except BlobAPIError as blob_error:
+        print(f"Blob storage error: {blob_error}")
+        # Fallback to sample photos if blob storage fails
+        return json_response({
+            'photos': SAMPLE_PHOTOS,
+            'message': 'Using sample photos - Blob storage error'
+        })
+    except Exception as blob_error:
+        print(f"Blob storage error: {blob_error}")
+        # Return empty gallery on error
+        return json_response({
+            'photos': [],
+            'message': 'Error accessing photo storage'
+        })
+
+    # Conditional GET: nothing changed since the client's copy
+    etag = listing.etag(limit, cursor, since, *filters.values())
+    cache_headers = [('ETag', etag), ('Cache-Control', 'public, max-age=0, must-revalidate')]
+    if etag_matches(request, etag):
+        cache_headers.append(('Vary', 'Accept-Encoding'))
+        return Response(304, b'', cache_headers)
+
+    changes = None if since is None else listing.changes(since)
+    if changes is not None:
+        changed, deleted = changes
+        return json_stream_response(request, {
+            'version': listing.manifest_version,
+            'since': since,
+            'deleted': [{'id': t['id'], 'pathname': t['pathname']} for t in deleted],
+            'reset': False
+        }, 'photos', changed, cache_headers, cache_key=etag)
+
+    matches = listing
+    if any(filters.values()):
+        with request.phase('search'):
+            matches = get_index(listing).search(**filters)
+
+    try:
+        photos, next_cursor = paginate(matches.photos, matches.pathnames, limit, cursor)
+    except ValueError:
+        raise HTTPError(400, 'Invalid cursor')
+
+    fields = {
+        'total': len(matches.photos),
+        'nextCursor': next_cursor,
+        'hasMore': next_cursor is not None,
+        'version': listing.manifest_version
+    }
+    if since is not None:
+        # Too old to diff against: this is the full listing to start over from
+        fields['reset'] = True
+    # Photos are encoded and compressed as they're written; an unchanged
+    # listing is served from the cached compressed body
+    return json_stream_response(request, fields, 'photos', photos, cache_headers, cache_key=etag)
+
+endpoint = Endpoint('gallery-photos', {'GET': get}, allow_headers='Content-Type, If-None-Match',
+                    expose_headers='ETag', error_message='Failed to fetch photos')
+handler = make_handler(endpoint)
@@ -1,47 +1,44 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import os
-import requests
-from datetime import datetime
+from admin_auth import require_admin
+from http_core import Endpoint, HTTPError, empty_response, json_response, make_handler
+from photo_storage import get_storage
+from upload_pipeline import MAX_UPLOAD_BYTES, upload_chunk, upload_multipart, upload_offset
 
-class handler(BaseHTTPRequestHandler):
-    def do_POST(self):
-        try:
-            # Check admin authentication
-            auth_header = self.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                error_response = json.dumps({'error': 'Admin authentication required'})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            # For now, return success (implement actual upload later)
-            response = json.dumps({
-                'message': 'Photo upload feature coming soon',
-                'status': 'success'
-            })
-            self.wfile.write(response.encode('utf-8'))
-            
-        except Exception as e:
-            print(f"Upload error: {e}")
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            error_response = json.dumps({'error': 'Upload failed'})
-            self.wfile.write(error_response.encode('utf-8'))
-    
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-        self.end_headers()
+def post(request):
+    # Check admin authentication
+    require_admin(request)
+
+    storage = get_storage()
+    if storage is None:
+        raise HTTPError(503, 'Photo storage not configured')
+
+    with request.phase('upload'):
+        # Stream the body straight through to storage. If an error leaves
+        # part of it unread, the connection is closed rather than reused.
+        chunks = request.iter_body(MAX_UPLOAD_BYTES)
+        content_type = request.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            result = upload_multipart(storage, chunks, content_type)
+        else:
+            # Resumable upload: raw bytes plus Upload-* headers
+            result = upload_chunk(storage, chunks, request.headers, dict(request.query))
+
+    if result.get('complete') is False:
+        return json_response(result, 202, [('Upload-Id', result['uploadId']),
+                                           ('Upload-Offset', str(result['offset']))])
+
+    result.update({'message': 'Photo uploaded successfully', 'status': 'success'})
+    return json_response(result, 201)
+
+def head(request):
+    # Resumable upload status: how many bytes the server already has
+    require_admin(request)
+    upload_id = request.headers.get('Upload-Id', '')
+    offset = upload_offset(upload_id)
+    return empty_response(200, [('Upload-Id', upload_id), ('Upload-Offset', str(offset)),
+                                ('Cache-Control', 'no-store')])
+
+# max_body=None: upload bodies are streamed and size-checked by the pipeline
+endpoint = Endpoint('gallery-upload', {'POST': post, 'HEAD': head}, max_body=None,
+                    allow_headers='Content-Type, Authorization, Upload-Id, Upload-Offset, Upload-Length',
+                    expose_headers='Upload-Id, Upload-Offset', error_message='Upload failed')
+handler = make_handler(endpoint)
@@ -0,0 +1,131 @@
+from typing import Dict, List
+
+from gallery_index import fetch_listing, record_changes
+from image_variants import variant_pathnames
+import photo_hash
+from photo_storage import PHOTO_PREFIX
+from site_data import category_values
+from state_store import StateStoreError, get_store
+
+# Bulk gallery operations for admins. Targets are resolved against the
+# listing, expanded with their derived variants, and deleted in batched
+# storage calls with bounded parallelism.
+DELETE_BATCH_SIZE = 100
+MAX_CONCURRENCY = 4
+MAX_ITEMS = 5000
+CATEGORIES = category_values()
+
+class BulkRequestError(Exception):
+    pass
+
+def resolve_targets(storage, data: dict) -> Dict[str, dict]:
+    """
+    Map each requested pathname to its photo object (None when unknown).
+    Accepts {pathname}, {pathnames: [...]}, {prefix} or {category}.
+    """
+    if data.get('category'):
+        category = str(data['category']).strip().lower()
+        if category not in CATEGORIES:
+            raise BulkRequestError('Invalid category')
+        prefix = f"{PHOTO_PREFIX}{category}/"
+    else:
+        prefix = data.get('prefix')
+
+    # Fresh listing rather than the cache: admins act on what's there now
+    listing = fetch_listing(storage)
+    by_pathname = {photo['pathname']: photo for photo in listing.photos}
+
+    if prefix is not None:
+        prefix = str(prefix)
+        if not prefix.startswith(PHOTO_PREFIX):
+            raise BulkRequestError(f"prefix must start with {PHOTO_PREFIX}")
+        targets = {p: photo for p, photo in by_pathname.items() if p.startswith(prefix)}
+    else:
+        pathnames = data.get('pathnames')
+        if pathnames is None and data.get('pathname'):
+            pathnames = [data['pathname']]
+        if not isinstance(pathnames, list) or not pathnames:
+            raise BulkRequestError('Provide pathnames, prefix or category')
+        targets = {str(p): by_pathname.get(str(p)) for p in pathnames}
+
+    if len(targets) > MAX_ITEMS:
+        raise BulkRequestError(f"Too many photos in one request (max {MAX_ITEMS})")
+    return targets
+
+def _variant_blobs(photo: dict) -> List[dict]:
+    # Variants share the original's storage base URL
+    base = photo['url'][:-len(photo['pathname'])] if photo['url'].endswith(photo['pathname']) else None
+    if base is None:
+        return []
+    return [{'pathname': p, 'url': base + p} for p in variant_pathnames(photo['pathname'])]
+
+def _forget_hashes(pathnames: List[str]):
+    """Drop content and perceptual hash entries so deleted photos can be uploaded again"""
+    store = get_store()
+    try:
+        digests = store.pipeline([('get', f"photo-path:{p}") for p in pathnames])
+        ops = [('delete', f"photo-path:{p}") for p in pathnames]
+        ops += [('delete', f"photo-sha256:{digest}") for digest, _ in digests if digest]
+        store.pipeline(ops)
+    except StateStoreError as e:
+        print(f"Hash index cleanup error: {e}")
+    try:
+        photo_hash.forget(pathnames)
+    except Exception as e:
+        print(f"Photo hash cleanup error: {e}")
+
+def bulk_delete(storage, targets: Dict[str, dict]) -> List[dict]:
+    """Delete photos and their variants; returns one result per pathname"""
+    results = {p: {'pathname': p, 'status': 'not_found'} for p, photo in targets.items() if photo is None}
+    photos = [photo for photo in targets.values() if photo is not None]
+
+    # Photos leave the manifest (and so the gallery) first. If a storage
+    # delete then fails, the blob is only orphaned, and a retry still finds
+    # it because targets are resolved against storage.
+    if photos:
+        try:
+            record_changes(storage, remove=[photo['pathname'] for photo in photos])
+        except Exception as e:
+            print(f"Manifest update error: {e}")
+            for photo in photos:
+                results[photo['pathname']] = {'pathname': photo['pathname'], 'status': 'error',
+                                              'error': 'Gallery is busy, please retry'}
+            return [results[p] for p in targets]
+
+    # Each batch carries whole photos (original plus variants) so a failed
+    # call maps cleanly back to the photos it covered
+    batches, batch, batch_photos = [], [], []
+    for photo in photos:
+        blobs = [{'pathname': photo['pathname'], 'url': photo['url']}] + _variant_blobs(photo)
+        if batch and len(batch) + len(blobs) > DELETE_BATCH_SIZE:
+            batches.append((batch, batch_photos))
+            batch, batch_photos = [], []
+        batch.extend(blobs)
+        batch_photos.append(photo['pathname'])
+    if batch:
+        batches.append((batch, batch_photos))
+
+    def run(item):
+        blobs, pathnames = item
+        try:
+            storage.delete(blobs)
+            return pathnames, None
+        except Exception as e:
+            return pathnames, str(e)
+
+    deleted = []
+    if batches:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, len(batches))) as executor:
+            for pathnames, error in executor.map(run, batches):
+                for pathname in pathnames:
+                    if error is None:
+                        results[pathname] = {'pathname': pathname, 'status': 'deleted'}
+                        deleted.append(pathname)
+                    else:
+                        print(f"Delete error: {error}")
+                        results[pathname] = {'pathname': pathname, 'status': 'error', 'error': 'Delete failed'}
+
+    if deleted:
+        _forget_hashes(deleted)
+    return [results[p] for p in targets]
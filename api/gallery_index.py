@@ -0,0 +1,239 @@
+import base64
+import bisect
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from blob_client import BlobAPIError
+import gallery_manifest
+from image_variants import VARIANT_PREFIX, build_srcset, parse_variant, photo_stem
+from photo_storage import PHOTO_PREFIX
+from site_data import categories_by_value
+
+# Cached view of the gallery shared by requests in a warm process, read
+# from the gallery manifest (see gallery_manifest). Fresh for CACHE_TTL
+# seconds, then served stale for up to STALE_TTL more while one background
+# refresh checks for a newer manifest version. Uploads and deletes update
+# the manifest and this cache together. The manifest is created from a
+# full storage listing the first time it's needed.
+CACHE_TTL = float(os.getenv('GALLERY_CACHE_TTL', 5))
+STALE_TTL = float(os.getenv('GALLERY_STALE_TTL', 300))
+MAX_PAGE_SIZE = 500
+DEFAULT_CATEGORY = 'tournament'
+
+_upload_token = re.compile(r'-[0-9a-f]{6}$')
+
+class GalleryListing:
+    """Immutable snapshot of the gallery, sorted by pathname"""
+
+    def __init__(self, photos: List[dict], manifest_version: Optional[int] = None,
+                 deleted: Iterable[dict] = (), since: int = 0):
+        self.photos = photos
+        self.pathnames = [photo['pathname'] for photo in photos]
+        self.fetched_at = time.time()
+        self.manifest_version = manifest_version
+        self.deleted = list(deleted)
+        self.since = since
+        self._by_version = None
+        if manifest_version is not None:
+            self.version = f"m{manifest_version}"
+        else:
+            digest = hashlib.sha1()
+            for photo in photos:
+                digest.update(f"{photo['pathname']}|{photo['size']}|{photo['date']}\n".encode('utf-8'))
+            self.version = digest.hexdigest()[:16]
+
+    def find(self, pathname: str) -> Optional[dict]:
+        i = bisect.bisect_left(self.pathnames, pathname)
+        return self.photos[i] if i < len(self.pathnames) and self.pathnames[i] == pathname else None
+
+    def page(self, limit: Optional[int], cursor: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+        return paginate(self.photos, self.pathnames, limit, cursor)
+
+    def changes(self, since: int) -> Optional[Tuple[List[dict], List[dict]]]:
+        """
+        (photos added or changed, tombstones of photos deleted) after
+        manifest version `since`, or None when that version is too old to
+        diff against and the client needs the full listing
+        """
+        if self.manifest_version is None or since < self.since or since > self.manifest_version:
+            return None
+        if self._by_version is None:
+            self._by_version = sorted(self.photos, key=lambda photo: photo['version'])
+        versions = [photo['version'] for photo in self._by_version]
+        changed = self._by_version[bisect.bisect_right(versions, since):]
+        return changed, [t for t in self.deleted if t['version'] > since]
+
+    def etag(self, *variant) -> str:
+        """
+        Validator for this snapshot plus any query parameters. It's weak:
+        gzip, brotli and identity bodies of the same JSON share it, and a
+        strong tag would claim they're byte-for-byte identical.
+        """
+        key = '|'.join([self.version] + [str(v) for v in variant])
+        return 'W/"' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '"'
+
+def paginate(photos: List[dict], pathnames: List[str], limit: Optional[int],
+             cursor: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+    """Keyset pagination on pathname, so inserts don't shift later pages"""
+    start = 0
+    if cursor:
+        start = bisect.bisect_right(pathnames, decode_cursor(cursor))
+    if limit is None:
+        return photos[start:], None
+    end = start + limit
+    next_cursor = encode_cursor(pathnames[end - 1]) if end < len(photos) else None
+    return photos[start:end], next_cursor
+
+def encode_cursor(pathname: str) -> str:
+    return base64.urlsafe_b64encode(pathname.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> str:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+
+def photo_category(pathname: str) -> str:
+    """Uploads are stored under tournament-photos/<category>/; older ones sit at the top level"""
+    parts = pathname[len(PHOTO_PREFIX):].split('/')
+    if len(parts) > 1 and parts[0] in categories_by_value():
+        return parts[0]
+    return DEFAULT_CATEGORY
+
+def category_tags(category: str) -> List[str]:
+    return list(dict.fromkeys([category] + categories_by_value().get(category, {}).get('tags', [])))
+
+def title_from_pathname(pathname: str) -> str:
+    """'tournament-photos/awards/best-goal-3fa9c1.jpg' -> 'Best Goal'"""
+    stem = _upload_token.sub('', os.path.splitext(pathname.rsplit('/', 1)[-1])[0])
+    return ' '.join(stem.replace('_', '-').split('-')).title()
+
+def photo_record(pathname: str, url: str, size: int, uploaded_at: str, srcset: Optional[dict] = None,
+                 title: str = '', description: str = '', category: Optional[str] = None) -> dict:
+    """The photo object the frontend expects, as stored in the manifest (which assigns the id)"""
+    category = category or photo_category(pathname)
+    return {
+        'url': url,
+        'title': title or title_from_pathname(pathname),
+        'description': description or f"Tournament photo uploaded on {uploaded_at[:10]}",
+        'category': category,
+        'date': uploaded_at[:10] if uploaded_at else time.strftime('%Y-%m-%d'),
+        'size': size,
+        'pathname': pathname,
+        'tags': category_tags(category),
+        'srcset': srcset or {}
+    }
+
+def photo_from_blob(blob: dict, index: int, srcset: Optional[dict] = None) -> dict:
+    """Derive the photo object for a raw blob entry found by a storage listing"""
+    record = photo_record(blob.get('pathname', ''), blob.get('url', ''), blob.get('size', 0),
+                          blob.get('uploadedAt', ''), srcset)
+    return dict(record, id=index + 1)
+
+def fetch_listing(storage) -> GalleryListing:
+    """
+    List every photo plus its responsive variants (both prefixes crawled
+    concurrently), following pagination cursors
+    """
+    photos, variants = [], {}
+    for blob in storage.iter_prefixes([PHOTO_PREFIX, VARIANT_PREFIX]):
+        pathname = blob.get('pathname', '')
+        if pathname.startswith(VARIANT_PREFIX):
+            parsed = parse_variant(pathname)
+            if parsed:
+                stem, width, fmt = parsed
+                variants.setdefault(stem, []).append((width, fmt, blob.get('url', '')))
+        else:
+            photos.append(blob)
+
+    photos.sort(key=lambda blob: blob.get('pathname', ''))
+    return GalleryListing([
+        photo_from_blob(blob, i, build_srcset(variants.get(photo_stem(blob.get('pathname', '')), [])))
+        for i, blob in enumerate(photos)
+    ])
+
+def listing_from_manifest(manifest: 'gallery_manifest.Manifest') -> GalleryListing:
+    # Manifest files are stored in pathname order, so this sort is one pass
+    photos = sorted(manifest.photos.values(), key=lambda photo: photo['pathname'])
+    return GalleryListing(photos, manifest.version, manifest.deleted, manifest.since)
+
+_cache: Optional[GalleryListing] = None
+_lock = threading.Lock()
+_refreshing = False
+
+def load_listing(storage) -> GalleryListing:
+    """
+    The listing for the current manifest version. When that's the version
+    already cached, this costs one state-store read.
+    """
+    manifest = gallery_manifest.read(storage)
+    if manifest is None:
+        manifest = gallery_manifest.update(storage, bootstrap=lambda: fetch_listing(storage).photos)
+    cached = _cache
+    if cached is not None and cached.manifest_version == manifest.version:
+        cached.fetched_at = time.time()
+        return cached
+    return listing_from_manifest(manifest)
+
+def _install(listing: GalleryListing):
+    # A slow refresh can finish after an upload published a newer version;
+    # never replace the cache with an older one
+    global _cache
+    with _lock:
+        if _cache is None or (_cache.manifest_version or 0) <= (listing.manifest_version or 0):
+            _cache = listing
+
+def record_changes(storage, add: Iterable[dict] = (), remove: Iterable[str] = ()) -> GalleryListing:
+    """Publish uploaded photo records and/or deleted pathnames and refresh the cache"""
+    manifest = gallery_manifest.update(storage, add, remove,
+                                       bootstrap=lambda: fetch_listing(storage).photos)
+    listing = listing_from_manifest(manifest)
+    _install(listing)
+    return listing
+
+def _refresh_in_background(storage):
+    global _refreshing
+    try:
+        _install(load_listing(storage))
+    except Exception as e:
+        print(f"Gallery refresh error: {e}")
+    finally:
+        _refreshing = False
+
+def get_listing(storage) -> GalleryListing:
+    """
+    Return the cached listing, revalidating in the background once it is
+    older than CACHE_TTL. Only a cold or fully expired cache blocks the
+    caller, and concurrent callers share that one fetch. If the fetch fails
+    and an old snapshot exists, the old snapshot is served.
+    """
+    global _cache, _refreshing
+    cached = _cache
+    age = time.time() - cached.fetched_at if cached else None
+    if cached is not None and age < CACHE_TTL:
+        return cached
+
+    if cached is not None and age < CACHE_TTL + STALE_TTL:
+        with _lock:
+            if not _refreshing:
+                _refreshing = True
+                threading.Thread(target=_refresh_in_background, args=(storage,), daemon=True).start()
+        return cached
+
+    with _lock:
+        if _cache is not None and _cache is not cached:
+            return _cache  # another request refreshed while we waited
+        try:
+            _cache = load_listing(storage)
+        except Exception:
+            if cached is None:
+                raise
+            print("Gallery refresh failed, serving expired listing")
+        return _cache
+
+def invalidate():
+    """Drop the cached listing so the next request re-reads the manifest"""
+    global _cache
+    _cache = None
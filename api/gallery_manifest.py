@@ -0,0 +1,260 @@
+import gzip
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from state_store import StateStoreError, get_store
+
+# The gallery manifest: every photo's record (stable id, title, category,
+# date, srcset...) in one gzip'd JSON-lines file, so a gallery read is one
+# fetch instead of a storage listing plus per-blob derivation.
+#
+# Each version is written as a new, never-modified file
+# (gallery-manifest/v0000000042.jsonl.gz), so CDN caching can't serve a
+# half-updated copy. The state store holds a pointer to the current one.
+# Writers (uploads and deletes) serialize on a state-store lock, apply
+# their change to the latest version, write the next version and move the
+# pointer; the two newest files are kept for readers that are mid-fetch.
+#
+# Storage is the source of truth. Writers also list the manifest folder
+# (a few files, since old versions are pruned) in case the pointer lags,
+# and write with overwrite disabled, so two writers that pick the same
+# version can't both publish it: the loser re-applies its change on top.
+# Without a shared state backend (STATE_BACKEND=sqlite or redis) the
+# pointer and lock only cover this process, so readers use the listing
+# instead of the pointer.
+#
+# Records carry the version that last changed them, and deletions leave a
+# tombstone (the newest MAX_TOMBSTONES are kept), so "changes since
+# version N" is answerable for any N at or after `since`.
+MANIFEST_PREFIX = 'gallery-manifest/'
+FORMAT = 1
+MAX_TOMBSTONES = int(os.getenv('GALLERY_MANIFEST_TOMBSTONES', 1000))
+KEEP_VERSIONS = 2
+POINTER_KEY = 'gallery-manifest:current'
+LOCK_KEY = 'gallery-manifest:lock'
+LOCK_TTL = 30
+LOCK_WAIT = 10.0
+WRITE_ATTEMPTS = 5
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+_version_pattern = re.compile(r'^' + re.escape(MANIFEST_PREFIX) + r'v(\d+)\.jsonl\.gz$')
+
+class ManifestError(Exception):
+    pass
+
+class Manifest:
+    """One version of the gallery: photo records by pathname plus recent deletions"""
+
+    def __init__(self, version: int = 0, next_id: int = 1, photos: Optional[Dict[str, dict]] = None,
+                 deleted: Optional[List[dict]] = None, since: int = 0):
+        self.version = version
+        self.next_id = next_id
+        self.photos = photos if photos is not None else {}
+        self.deleted = deleted if deleted is not None else []  # oldest first
+        self.since = since
+
+    def apply(self, add: Iterable[dict] = (), remove: Iterable[str] = ()) -> 'Manifest':
+        """
+        The next version with `add` records stored (new pathnames get the
+        next id, replaced ones keep theirs) and `remove` pathnames deleted
+        """
+        version = self.version + 1
+        photos = dict(self.photos)
+        deleted = list(self.deleted)
+        next_id = self.next_id
+        for record in add:
+            record = dict(record, version=version)
+            previous = photos.get(record['pathname'])
+            if previous is not None:
+                record['id'] = previous['id']
+            elif not record.get('id'):
+                record['id'] = next_id
+            next_id = max(next_id, record['id'] + 1)
+            photos[record['pathname']] = record
+        for pathname in remove:
+            record = photos.pop(pathname, None)
+            if record is not None:
+                deleted.append({'id': record['id'], 'pathname': pathname, 'version': version})
+
+        since = self.since
+        if len(deleted) > MAX_TOMBSTONES:
+            # Clients older than the newest dropped tombstone can't be given a delta
+            since = max(since, deleted[-MAX_TOMBSTONES - 1]['version'])
+            deleted = deleted[-MAX_TOMBSTONES:]
+        return Manifest(version, next_id, photos, deleted, since)
+
+    def encode(self) -> bytes:
+        header = {'format': FORMAT, 'version': self.version, 'nextId': self.next_id, 'since': self.since,
+                  'photos': len(self.photos), 'updatedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+        lines = [_encode(header)]
+        lines += [_encode(self.photos[p]) for p in sorted(self.photos)]
+        lines += [_encode(dict(t, deleted=True)) for t in self.deleted]
+        return gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'), compresslevel=6, mtime=0)
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'Manifest':
+        lines = gzip.decompress(data).decode('utf-8').splitlines()
+        header = json.loads(lines[0])
+        if header.get('format') != FORMAT:
+            raise ManifestError(f"Unsupported manifest format: {header.get('format')}")
+        photos, deleted = {}, []
+        for line in lines[1:]:
+            record = json.loads(line)
+            if record.pop('deleted', False):
+                deleted.append(record)
+            else:
+                photos[record['pathname']] = record
+        return cls(header['version'], header['nextId'], photos, deleted, header.get('since', 0))
+
+def manifest_pathname(version: int) -> str:
+    return f"{MANIFEST_PREFIX}v{version:010d}.jsonl.gz"
+
+def _newest_stored(storage) -> Optional[dict]:
+    newest = None
+    for blob in storage.iter_blobs(MANIFEST_PREFIX):
+        match = _version_pattern.match(blob.get('pathname', ''))
+        if match and (newest is None or int(match.group(1)) > newest['version']):
+            newest = {'version': int(match.group(1)), 'pathname': blob['pathname'], 'url': blob.get('url', '')}
+    return newest
+
+def current_pointer(storage) -> Optional[dict]:
+    """{'version', 'pathname', 'url'} of the current manifest, or None if there is none yet"""
+    if not get_store().shared:
+        # A process-local pointer never sees other instances' versions
+        return _newest_stored(storage)
+    try:
+        value, _ = get_store().get(POINTER_KEY)
+    except StateStoreError as e:
+        print(f"Manifest pointer error: {e}")
+        value = None
+    if value:
+        return json.loads(value)
+    # First use on this state store: find the newest file and remember it
+    pointer = _newest_stored(storage)
+    if pointer is not None:
+        try:
+            get_store().add(POINTER_KEY, json.dumps(pointer))
+        except StateStoreError:
+            pass
+    return pointer
+
+def _latest(storage) -> Optional[dict]:
+    # The pointer lags storage if an instance published a version but
+    # couldn't move it, so writers take whichever is newer
+    pointer = current_pointer(storage)
+    if not get_store().shared:
+        return pointer
+    stored = _newest_stored(storage)
+    if stored is not None and (pointer is None or stored['version'] > pointer['version']):
+        return stored
+    return pointer
+
+_cached: Optional[Manifest] = None
+_write_lock = threading.Lock()
+
+def _load(storage, pointer: dict) -> Manifest:
+    global _cached
+    cached = _cached
+    if cached is not None and cached.version == pointer['version']:
+        return cached
+    try:
+        data = storage.read(pointer)
+    except Exception:
+        # Pruned between reading the pointer and fetching it: a newer one exists
+        newest = _newest_stored(storage)
+        if newest is None or newest['version'] <= pointer['version']:
+            raise
+        data = storage.read(newest)
+    manifest = Manifest.decode(data)
+    if _cached is None or manifest.version > _cached.version:
+        _cached = manifest
+    return manifest
+
+def read(storage) -> Optional[Manifest]:
+    """The current manifest (one state-store read when this process already has it)"""
+    pointer = current_pointer(storage)
+    return None if pointer is None else _load(storage, pointer)
+
+def _acquire(token: str):
+    store = get_store()
+    deadline = time.monotonic() + LOCK_WAIT
+    delay = 0.01
+    while not store.add(LOCK_KEY, token, LOCK_TTL):
+        if time.monotonic() >= deadline:
+            raise ManifestError('Timed out waiting for the gallery manifest lock')
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+def _release(token: str):
+    store = get_store()
+    value, _ = store.get(LOCK_KEY)
+    if value == token:
+        store.delete(LOCK_KEY)
+
+def _prune(storage, version: int):
+    old = []
+    for blob in storage.iter_blobs(MANIFEST_PREFIX):
+        match = _version_pattern.match(blob.get('pathname', ''))
+        if match and int(match.group(1)) <= version - KEEP_VERSIONS:
+            old.append({'pathname': blob['pathname'], 'url': blob.get('url', '')})
+    if old:
+        storage.delete(old)
+
+def update(storage, add: Iterable[dict] = (), remove: Iterable[str] = (),
+           bootstrap: Optional[Callable[[], List[dict]]] = None) -> Manifest:
+    """
+    Apply a change and publish the next version. Without a manifest yet,
+    version 1 is created from `bootstrap()` records first. Raises
+    ManifestError (or the storage/state store error) if nothing was published.
+    """
+    global _cached
+    add, remove = list(add), list(remove)
+    token = secrets.token_hex(8)
+    with _write_lock:
+        _acquire(token)
+        try:
+            for _ in range(WRITE_ATTEMPTS):
+                pointer = _latest(storage)
+                if pointer is None:
+                    manifest = Manifest().apply(bootstrap() if bootstrap else [])
+                    if add or remove:
+                        manifest = manifest.apply(add, remove)
+                else:
+                    manifest = _load(storage, pointer)
+                    if not (add or remove):
+                        return manifest
+                    manifest = manifest.apply(add, remove)
+                try:
+                    blob = storage.put(manifest_pathname(manifest.version), iter([manifest.encode()]),
+                                       'application/gzip', overwrite=False)
+                    break
+                except Exception:
+                    # Lost the race for this version number? Then retry on top of the winner
+                    newest = _newest_stored(storage)
+                    if newest is None or newest['version'] < manifest.version:
+                        raise
+            else:
+                raise ManifestError('The gallery manifest kept changing, giving up')
+
+            _cached = manifest
+            try:
+                get_store().set(POINTER_KEY, json.dumps({'version': manifest.version, 'pathname': blob['pathname'],
+                                                         'url': blob.get('url', '')}))
+            except StateStoreError as e:
+                # Published regardless; the next writer finds it in storage
+                print(f"Manifest pointer error: {e}")
+        finally:
+            _release(token)
+
+    if manifest.version <= KEEP_VERSIONS:
+        return manifest
+    try:
+        _prune(storage, manifest.version)
+    except Exception as e:
+        print(f"Manifest prune error: {e}")
+    return manifest
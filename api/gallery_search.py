@@ -0,0 +1,166 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from gallery_index import GalleryListing
+
+# Server-side filtering for the gallery. Each listing snapshot gets a
+# metadata index, built once on first search and shared by every request
+# that sees the same snapshot:
+#   - inverted indexes from category and tag to photo positions
+#   - positions sorted by date, for from/to ranges by bisection
+#   - a sorted (word, position) list over the words of each photo's title,
+#     description and tags, so a query word is a prefix range found by
+#     bisection rather than a scan of every photo's text
+# Positions are indexes into the listing's pathname-sorted photos, so a
+# filtered result keeps pathname order and pages with the same cursors.
+QUERY_CACHE_SIZE = 128
+MAX_QUERY_WORDS = 8
+
+_date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_word = re.compile(r'\w+')
+
+class SearchRequestError(Exception):
+    pass
+
+class SearchResult:
+    """Photos matching one query, in listing (pathname) order"""
+
+    def __init__(self, photos: List[dict]):
+        self.photos = photos
+        self.pathnames = [photo['pathname'] for photo in photos]
+
+def words(text: str) -> List[str]:
+    return _word.findall(text.casefold())
+
+class PhotoIndex:
+    """Metadata indexes over one GalleryListing"""
+
+    def __init__(self, listing: GalleryListing):
+        self.listing = listing
+        self.by_category: Dict[str, List[int]] = {}
+        self.by_tag: Dict[str, List[int]] = {}
+        text_words = []
+        for position, photo in enumerate(listing.photos):
+            self.by_category.setdefault(photo['category'], []).append(position)
+            for tag in photo['tags']:
+                self.by_tag.setdefault(tag.casefold(), []).append(position)
+            text = ' '.join([photo['title'], photo.get('description') or ''] + photo['tags'])
+            text_words.extend((word, position) for word in set(words(text)))
+
+        by_date = sorted(range(len(listing.photos)), key=lambda p: listing.photos[p]['date'])
+        self._dates = [listing.photos[p]['date'] for p in by_date]
+        self._by_date = by_date
+        text_words.sort()
+        self._words = [word for word, _ in text_words]
+        self._word_positions = [position for _, position in text_words]
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _date_range(self, start: Optional[str], end: Optional[str]) -> set:
+        lo = bisect.bisect_left(self._dates, start) if start else 0
+        hi = bisect.bisect_right(self._dates, end) if end else len(self._dates)
+        return set(self._by_date[lo:hi])
+
+    def _word_prefix(self, prefix: str, within: Optional[set]) -> set:
+        lo = bisect.bisect_left(self._words, prefix)
+        # Every word starting with `prefix` sorts before prefix + U+10FFFF
+        hi = bisect.bisect_left(self._words, prefix + '\U0010ffff', lo)
+        positions = self._word_positions[lo:hi]
+        return set(positions) if within is None else within.intersection(positions)
+
+    def search(self, category: Optional[str] = None, tag: Optional[str] = None,
+               start: Optional[str] = None, end: Optional[str] = None,
+               query: Optional[str] = None) -> SearchResult:
+        """
+        Photos matching every given filter. `start`/`end` are inclusive
+        YYYY-MM-DD dates; each word of `query` must prefix a word of the
+        title, description or tags. A query with no words at all (only
+        punctuation) matches nothing.
+        """
+        key = (category, tag, start, end, query)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        # Start from the smallest posting list and narrow it with the others
+        candidates = []
+        if category:
+            candidates.append(self.by_category.get(category, []))
+        if tag:
+            candidates.append(self.by_tag.get(tag.casefold(), []))
+        candidates.sort(key=len)
+        photos = self.listing.photos
+        if len(candidates) == 1 and not (query or start or end):
+            # Posting lists are already in listing order
+            return self._remember(key, SearchResult([photos[p] for p in candidates[0]]))
+        matches = set(candidates[0]) if candidates else None
+        for postings in candidates[1:]:
+            matches &= set(postings)
+        query_words = words(query or '')[:MAX_QUERY_WORDS]
+        if query and not query_words:
+            matches = set()
+        for word in query_words:
+            if matches is not None and not matches:
+                break
+            matches = self._word_prefix(word, matches)
+        if start or end:
+            if matches is None:
+                matches = self._date_range(start, end)
+            else:
+                # Checking the remaining candidates' dates beats building the range
+                matches = {p for p in matches
+                           if (not start or self.listing.photos[p]['date'] >= start)
+                           and (not end or self.listing.photos[p]['date'] <= end)}
+
+        return self._remember(key, SearchResult(photos if matches is None else [photos[p] for p in sorted(matches)]))
+
+    def _remember(self, key: tuple, result: SearchResult) -> SearchResult:
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+_index: Optional[PhotoIndex] = None
+_index_lock = threading.Lock()
+
+def get_index(listing: GalleryListing) -> PhotoIndex:
+    """The index for `listing`, rebuilt when the cached listing changes"""
+    global _index
+    index = _index
+    if index is not None and index.listing is listing:
+        return index
+    with _index_lock:
+        if _index is None or _index.listing is not listing:
+            _index = PhotoIndex(listing)
+        return _index
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    if not value:
+        return None
+    if not _date_pattern.match(value):
+        raise SearchRequestError(f"{name} must be a YYYY-MM-DD date")
+    return value
+
+def parse_filters(query: Dict[str, str], categories: List[str]) -> Dict[str, Optional[str]]:
+    """Validated search filters from gallery query parameters"""
+    category = (query.get('category') or '').strip().lower() or None
+    if category == 'all':
+        category = None
+    if category is not None and category not in categories:
+        raise SearchRequestError('Invalid category')
+    filters = {
+        'category': category,
+        'tag': (query.get('tag') or '').strip() or None,
+        'start': parse_date(query.get('from'), 'from'),
+        'end': parse_date(query.get('to'), 'to'),
+        'query': (query.get('q') or '').strip() or None,
+    }
+    if filters['start'] and filters['end'] and filters['start'] > filters['end']:
+        raise SearchRequestError('from must not be after to')
+    return filters
@@ -0,0 +1,296 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+import instrumentation
+import traffic_capture
+
+# Shared request handling for every endpoint under api/. An Endpoint maps
+# HTTP methods to plain functions taking a Request and returning a Response;
+# CORS, preflight, body-size limits, JSON errors, timing and metrics are
+# handled here once. make_handler() turns an Endpoint into the
+# BaseHTTPRequestHandler class Vercel expects, and server.py mounts the same
+# endpoints together.
+
+class HTTPError(Exception):
+    """Raise from an endpoint to answer with {'error': message, **extra}"""
+
+    def __init__(self, status: int, message: str, **extra):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.extra = extra
+
+class Request:
+    def __init__(self, method: str, target: str, headers, rfile, client_address=None):
+        url = urlparse(target)
+        self.method = method
+        self.path = url.path
+        self.query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.rfile = rfile
+        self.client_address = client_address
+        self.max_body = None
+        self.body_consumed = False
+        self.data = None  # parsed JSON body, once json() has run
+        self.timings = []  # (phase, seconds) for Server-Timing and metrics
+        self._body = None
+
+    def phase(self, name: str) -> instrumentation.PhaseTimer:
+        """`with request.phase('validate'):` times a block of the handler"""
+        return instrumentation.PhaseTimer(self.timings, name)
+
+    @property
+    def content_length(self) -> int:
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length < 0:
+            # read(-1) would wait for the client to close the connection
+            raise HTTPError(400, 'Invalid Content-Length')
+        return length
+
+    def body(self) -> bytes:
+        """Read the whole body (size already checked against the endpoint limit)"""
+        if self._body is None:
+            if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                # No Content-Length to check up front, so the limit applies as chunks arrive
+                self._body = b''.join(self._iter_chunked(self.max_body, None))
+            else:
+                length = self.content_length
+                self._body = self.rfile.read(length) if length else b''
+            self.body_consumed = True
+        return self._body
+
+    def iter_body(self, max_bytes: Optional[int] = None, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        The body in pieces of at most chunk_size, for endpoints that stream
+        it (max_body=None). max_bytes is checked against Content-Length up
+        front, or as chunks arrive with chunked encoding.
+        """
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            return self._iter_chunked(max_bytes, chunk_size)
+        length = self.content_length
+        if max_bytes is not None and length > max_bytes:
+            raise HTTPError(413, 'Request too large')
+        return self._iter_length(length, chunk_size)
+
+    def _iter_length(self, length: int, chunk_size: int) -> Iterator[bytes]:
+        while length:
+            data = self.rfile.read(min(length, chunk_size))
+            if not data:
+                raise HTTPError(400, 'Unexpected end of body')
+            length -= len(data)
+            yield data
+        self.body_consumed = True
+
+    def _iter_chunked(self, max_bytes: Optional[int], chunk_size: Optional[int]) -> Iterator[bytes]:
+        total = 0
+        while True:
+            try:
+                size = int(self.rfile.readline(1024).split(b';')[0].strip(), 16)
+            except ValueError:
+                raise HTTPError(400, 'Malformed chunked body')
+            if size == 0:
+                # Skip optional trailers up to the blank line
+                while self.rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.body_consumed = True
+                return
+            total += size
+            if max_bytes is not None and total > max_bytes:
+                raise HTTPError(413, 'Request too large')
+            while size:
+                data = self.rfile.read(min(size, chunk_size or size))
+                if not data:
+                    raise HTTPError(400, 'Unexpected end of body')
+                size -= len(data)
+                yield data
+            self.rfile.readline(1024)  # CRLF after each chunk
+
+    def json(self) -> dict:
+        with self.phase('parse'):
+            try:
+                data = json.loads(self.body().decode('utf-8') or '{}')
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise HTTPError(400, 'Invalid JSON data')
+        if not isinstance(data, dict):
+            raise HTTPError(400, 'Invalid JSON data')
+        self.data = data
+        return data
+
+class Response:
+    def __init__(self, status: int = 200, body: Union[bytes, Iterable[bytes]] = b'',
+                 headers: Optional[List[Tuple[str, str]]] = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or []
+
+    def header(self, name: str, value: str) -> 'Response':
+        self.headers.append((name, value))
+        return self
+
+def json_response(payload, status: int = 200, headers: Optional[List[Tuple[str, str]]] = None) -> Response:
+    body = json.dumps(payload).encode('utf-8')
+    return Response(status, body, [('Content-Type', 'application/json')] + (headers or []))
+
+def empty_response(status: int = 204, headers: Optional[List[Tuple[str, str]]] = None) -> Response:
+    return Response(status, b'', headers)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match revalidation (weak comparison, as for GET)"""
+    client_tags = [t.strip().removeprefix('W/') for t in request.headers.get('If-None-Match', '').split(',')]
+    return etag.removeprefix('W/') in client_tags or '*' in client_tags
+
+def negotiate_encoding(request: Request, available: Iterable[str]) -> str:
+    """
+    Best content-coding from Accept-Encoding among `available`, in the
+    server's order of preference; 'identity' when none is acceptable.
+    """
+    accepted = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().lower().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    best, best_q = 'identity', 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+class Endpoint:
+    """
+    One API endpoint. `max_body` is enforced from Content-Length before any
+    of the body is read; endpoints that stream their body (uploads) pass
+    max_body=None and police size themselves.
+    """
+
+    def __init__(self, name: str, routes: Dict[str, Callable[[Request], Response]],
+                 max_body: Optional[int] = 10000, allow_headers: str = 'Content-Type',
+                 expose_headers: Optional[str] = None, error_message: str = 'Server error occurred'):
+        self.name = name
+        self.routes = routes
+        self.max_body = max_body
+        self.allow_headers = allow_headers
+        self.expose_headers = expose_headers
+        self.error_message = error_message
+        self.allow_methods = ', '.join(list(routes) + ['OPTIONS'])
+        self._cors_headers = [
+            ('Access-Control-Allow-Origin', '*'),
+            ('Access-Control-Allow-Methods', self.allow_methods),
+            ('Access-Control-Allow-Headers', self.allow_headers),
+        ]
+        if self.expose_headers:
+            self._cors_headers.append(('Access-Control-Expose-Headers', self.expose_headers))
+        # Browsers may cache the preflight answer instead of repeating it
+        self._preflight_headers = self._cors_headers + [('Access-Control-Max-Age', '86400')]
+
+    def cors_headers(self) -> List[Tuple[str, str]]:
+        return list(self._cors_headers)
+
+    def dispatch(self, request: Request) -> Response:
+        start = time.perf_counter()
+        request.max_body = self.max_body
+        try:
+            if request.method == 'OPTIONS':
+                response = empty_response(200)
+            else:
+                route = self.routes.get(request.method)
+                if route is None and request.method == 'HEAD':
+                    route = self.routes.get('GET')
+                if route is None:
+                    raise HTTPError(405, 'Method not allowed')
+                if self.max_body is not None and request.content_length > self.max_body:
+                    raise HTTPError(413, 'Request too large')
+                if instrumentation.should_profile():
+                    response = instrumentation.profiled(self.name, route, request)
+                else:
+                    response = route(request)
+        except HTTPError as e:
+            response = json_response({'error': e.message, **e.extra}, e.status)
+        except Exception as e:
+            print(f"{self.name} error: {e}")
+            response = json_response({'error': self.error_message}, 500)
+
+        elapsed = time.perf_counter() - start
+        cors = self._preflight_headers if request.method == 'OPTIONS' else self._cors_headers
+        response.headers = cors + response.headers
+        response.headers.append(('Server-Timing', instrumentation.server_timing(elapsed, request.timings)))
+        instrumentation.observe(self.name, response.status, elapsed, request.timings)
+        if traffic_capture.enabled():
+            traffic_capture.record(self.name, request, response.status, elapsed * 1000)
+        return response
+
+def write_response(handler: BaseHTTPRequestHandler, response: Response, head_only: bool = False):
+    """Send a Response through a BaseHTTPRequestHandler"""
+    handler.send_response(response.status)
+    body = response.body
+    names = {name.lower() for name, _ in response.headers}
+    for name, value in response.headers:
+        handler.send_header(name, value)
+    if isinstance(body, (bytes, bytearray)):
+        if 'content-length' not in names and response.status not in (204, 304):
+            handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if body and not head_only:
+            handler.wfile.write(body)
+        return
+
+    # Streaming body: chunked on HTTP/1.1, close-delimited on HTTP/1.0
+    chunked = handler.request_version == 'HTTP/1.1' and handler.protocol_version == 'HTTP/1.1'
+    if chunked:
+        handler.send_header('Transfer-Encoding', 'chunked')
+    else:
+        handler.close_connection = True
+    handler.end_headers()
+    if head_only:
+        return
+    for chunk in body:
+        if not chunk:
+            continue
+        if chunked:
+            handler.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        else:
+            handler.wfile.write(chunk)
+    if chunked:
+        handler.wfile.write(b'0\r\n\r\n')
+
+def handle_request(handler: BaseHTTPRequestHandler, endpoint: Endpoint):
+    """Serve the request held by `handler` with `endpoint`"""
+    request = Request(handler.command, handler.path, handler.headers, handler.rfile, handler.client_address)
+    response = endpoint.dispatch(request)
+    write_response(handler, response, head_only=handler.command == 'HEAD')
+    # Don't reuse a connection whose request body was left unread
+    headers = handler.headers
+    has_body = headers.get('Content-Length', '0') != '0' or 'Transfer-Encoding' in headers
+    if has_body and not request.body_consumed:
+        handler.close_connection = True
+
+def make_handler(endpoint: Endpoint) -> type:
+    """BaseHTTPRequestHandler subclass serving one endpoint (Vercel entry point)"""
+
+    class handler(BaseHTTPRequestHandler):
+        # Headers and body are separate writes; with Nagle on, keep-alive
+        # clients wait out a delayed ACK (~40ms) on every response
+        disable_nagle_algorithm = True
+
+        def _handle(self):
+            handle_request(self, endpoint)
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+    handler.endpoint = endpoint
+    return handler
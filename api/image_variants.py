@@ -0,0 +1,129 @@
+import importlib.util
+import io
+import os
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from photo_storage import PHOTO_PREFIX
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Pillow is optional: without it photos are served at original size only.
+# It's imported on first render (~10ms), not by every endpoint that merely
+# names variant paths.
+PILLOW_AVAILABLE = importlib.util.find_spec('PIL') is not None
+Image = ImageOps = features = None
+
+def _load_pillow():
+    global Image, ImageOps, features
+    if Image is None:
+        from PIL import Image, ImageOps, features
+
+# Responsive variants for gallery photos. Each upload is re-encoded at a few
+# widths as WebP (and AVIF where Pillow supports it), without EXIF, under
+# VARIANT_PREFIX. Rendering runs in a process pool so big batches of phone
+# photos use every core.
+VARIANT_PREFIX = 'gallery-variants/'
+VARIANT_WIDTHS = (320, 640, 1280)
+QUALITY = {'webp': 80, 'avif': 60}
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+_variant_pattern = re.compile(r'^(?P<stem>.+)-(?P<width>\d+)w\.(?P<format>webp|avif)$')
+_pool: Optional['ProcessPoolExecutor'] = None
+
+def enabled() -> bool:
+    return PILLOW_AVAILABLE and os.getenv('GALLERY_VARIANTS', '1') != '0'
+
+def output_formats() -> List[str]:
+    _load_pillow()
+    formats = ['webp']
+    try:
+        if features.check('avif'):
+            formats.append('avif')
+    except (ValueError, AttributeError):
+        pass  # Pillow built without AVIF
+    return formats
+
+def photo_stem(pathname: str) -> str:
+    return os.path.splitext(pathname[len(PHOTO_PREFIX):] if pathname.startswith(PHOTO_PREFIX) else pathname)[0]
+
+def variant_pathname(pathname: str, width: int, fmt: str) -> str:
+    return f"{VARIANT_PREFIX}{photo_stem(pathname)}-{width}w.{fmt}"
+
+def variant_pathnames(pathname: str) -> List[str]:
+    """Every variant pathname a photo can have (for cleanup on delete)"""
+    return [variant_pathname(pathname, width, fmt)
+            for width in VARIANT_WIDTHS for fmt in ('webp', 'avif')]
+
+def parse_variant(pathname: str) -> Optional[Tuple[str, int, str]]:
+    """Map a variant pathname back to (original stem, width, format)"""
+    match = _variant_pattern.match(pathname[len(VARIANT_PREFIX):])
+    if not match:
+        return None
+    return match.group('stem'), int(match.group('width')), match.group('format')
+
+def render_width(source_path: str, width: int, formats: List[str]) -> List[Tuple[str, bytes]]:
+    """Decode, orient and downscale one source to `width`; runs in a worker process"""
+    _load_pillow()
+    with Image.open(source_path) as image:
+        # JPEG draft mode decodes at a reduced scale directly, which is much faster
+        image.draft('RGB', (width, width))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            # Palette and greyscale images mark transparency in info, not a band
+            transparent = 'A' in image.getbands() or 'transparency' in image.info
+            image = image.convert('RGBA' if transparent else 'RGB')
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        outputs = []
+        for fmt in formats:
+            buffer = io.BytesIO()
+            # No exif= argument, so EXIF (GPS, device serials) is not carried over
+            image.save(buffer, format=fmt.upper(), quality=QUALITY[fmt])
+            outputs.append((fmt, buffer.getvalue()))
+        return outputs
+
+def _get_pool() -> 'ProcessPoolExecutor':
+    global _pool
+    if _pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        workers = int(os.getenv('GALLERY_VARIANT_WORKERS', os.cpu_count() or 1))
+        _pool = ProcessPoolExecutor(max_workers=max(1, workers))
+    return _pool
+
+def source_width(source_path: str) -> int:
+    _load_pillow()
+    with Image.open(source_path) as image:
+        transposed = image.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+        return image.height if transposed else image.width
+
+def generate_variants(storage, pathname: str, source_path: str) -> Dict[str, str]:
+    """
+    Render and store all variants of one photo. Widths wider than the source
+    are skipped (the smallest is always produced). Returns the srcset field.
+    """
+    if not enabled():
+        return {}
+    formats = output_formats()
+    original_width = source_width(source_path)
+    widths = [w for w in VARIANT_WIDTHS if w < original_width] or [VARIANT_WIDTHS[0]]
+
+    pool = _get_pool()
+    futures = [pool.submit(render_width, source_path, width, formats) for width in widths]
+    variants = []
+    for future, width in zip(futures, widths):
+        for fmt, data in future.result():
+            blob = storage.put(variant_pathname(pathname, width, fmt), iter([data]), CONTENT_TYPES[fmt])
+            variants.append((width, fmt, blob.get('url', '')))
+    return build_srcset(variants)
+
+def build_srcset(variants: List[Tuple[int, str, str]]) -> Dict[str, str]:
+    """{'webp': 'url 320w, url 640w', ...} from (width, format, url) tuples"""
+    by_format: Dict[str, List[Tuple[int, str]]] = {}
+    for width, fmt, url in variants:
+        by_format.setdefault(fmt, []).append((width, url))
+    return {fmt: ', '.join(f"{url} {width}w" for width, url in sorted(entries))
+            for fmt, entries in by_format.items()}
@@ -0,0 +1,179 @@
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Per-endpoint, per-phase latency histograms. Handlers time phases with
+# request.phase('validate') etc.; Endpoint.dispatch records them here, adds
+# them to the Server-Timing header, and /api/metrics renders everything in
+# Prometheus text format.
+#
+# Histograms are HDR-style: log-linear buckets with 8 sub-buckets per power
+# of two over integer microseconds, so each one is a fixed list of 200
+# counters (about 6% relative error) covering 1us to ~67s, whatever the
+# traffic. Metrics are per process: on serverless each instance reports its
+# own.
+SUB_BUCKETS = 8
+_SUB_BITS = 3
+BUCKET_COUNT = SUB_BUCKETS * 25
+MAX_MICROS = (1 << 27) - 1
+
+# Coarse Prometheus buckets (seconds) derived from the fine ones at export
+EXPORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/onam-profiles')
+
+def bucket_index(micros: int) -> int:
+    if micros < SUB_BUCKETS:
+        return max(0, micros)
+    micros = min(micros, MAX_MICROS)
+    shift = micros.bit_length() - _SUB_BITS - 1
+    return SUB_BUCKETS * (shift + 1) + (micros >> shift) - SUB_BUCKETS
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """[low, high) in microseconds"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = SUB_BUCKETS + index % SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        index = bucket_index(int(seconds * 1e6))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile in seconds (bucket midpoint)"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = max(1, round(q * total))
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return (low + high) / 2e6
+        return MAX_MICROS / 1e6
+
+    def cumulative(self, bounds=EXPORT_BUCKETS) -> List[int]:
+        """Counts at or below each bound (seconds), for Prometheus `le` buckets"""
+        with self._lock:
+            counts = list(self.counts)
+        result, seen, index = [], 0, 0
+        for bound in bounds:
+            limit = bound * 1e6
+            while index < BUCKET_COUNT and bucket_bounds(index)[1] <= limit:
+                seen += counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+class PhaseTimer:
+    """Context manager that appends (phase, seconds) to a timings list"""
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings: List[Tuple[str, float]], name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.append((self.name, time.perf_counter() - self.start))
+        return False
+
+_histograms: Dict[Tuple[str, str], Histogram] = {}
+_status_counts: Dict[Tuple[str, int], int] = {}
+_registry_lock = threading.Lock()
+
+def _histogram(endpoint: str, phase: str) -> Histogram:
+    histogram = _histograms.get((endpoint, phase))
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault((endpoint, phase), Histogram())
+    return histogram
+
+def observe(endpoint: str, status: int, total: float, timings: List[Tuple[str, float]]):
+    """Record one request: the whole dispatch plus each timed phase"""
+    _histogram(endpoint, 'total').record(total)
+    for phase, seconds in timings:
+        _histogram(endpoint, phase).record(seconds)
+    key = (endpoint, status)
+    with _registry_lock:
+        _status_counts[key] = _status_counts.get(key, 0) + 1
+
+def server_timing(total: float, timings: List[Tuple[str, float]]) -> str:
+    parts = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in timings]
+    parts.append(f"app;dur={total * 1000:.2f}")
+    return ', '.join(parts)
+
+def render_prometheus() -> str:
+    lines = [
+        '# HELP onam_request_duration_seconds Request latency by endpoint and phase',
+        '# TYPE onam_request_duration_seconds histogram',
+    ]
+    with _registry_lock:
+        histograms = sorted(_histograms.items())
+        statuses = sorted(_status_counts.items())
+    for (endpoint, phase), histogram in histograms:
+        labels = f'endpoint="{endpoint}",phase="{phase}"'
+        for bound, count in zip(EXPORT_BUCKETS, histogram.cumulative()):
+            lines.append(f'onam_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'onam_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'onam_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+        lines.append(f'onam_request_duration_seconds_count{{{labels}}} {histogram.count}')
+
+    lines += ['# HELP onam_requests_total Requests by endpoint and status',
+              '# TYPE onam_requests_total counter']
+    for (endpoint, status), count in statuses:
+        lines.append(f'onam_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+# --- Sampling profiler ---
+#
+# With PROFILE_SAMPLE_RATE > 0, that fraction of requests runs under cProfile
+# and the stats go to the profile hook: by default a .prof file per sample in
+# PROFILE_DIR (inspect with `python -m pstats` or snakeviz).
+
+def _write_profile(endpoint: str, profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile.dump_stats(os.path.join(PROFILE_DIR, f"{endpoint}-{time.time():.3f}.prof"))
+
+_profile_hook: Callable = _write_profile
+
+def set_profile_hook(hook: Callable):
+    """hook(endpoint_name, cProfile.Profile) for each sampled request"""
+    global _profile_hook
+    _profile_hook = hook
+
+def should_profile() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def profiled(endpoint: str, func: Callable, *args):
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args)
+    finally:
+        try:
+            _profile_hook(endpoint, profile)
+        except Exception as e:
+            print(f"Profile hook error: {e}")
@@ -0,0 +1,147 @@
+import itertools
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from http_core import Request, Response, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Streaming JSON for large list responses (the gallery). The list is
+# encoded in small batches into ~64KB chunks and compressed as it goes, so a
+# response's memory stays at one buffer plus the compressor's window no
+# matter how many items there are. The coding is negotiated from
+# Accept-Encoding: brotli (when the brotli package is installed), gzip,
+# or identity.
+#
+# Finished bodies are kept, per coding, in a small in-process LRU keyed by
+# the caller's ETag, so repeat requests for an unchanged listing are served
+# as cached bytes with a Content-Length and no re-encoding. Bodies larger
+# than CACHE_ENTRY_BYTES are streamed every time rather than held.
+FLUSH_BYTES = 64 * 1024
+BATCH_ITEMS = 128
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+CACHE_MAX_BYTES = int(os.getenv('JSON_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+CACHE_ENTRY_BYTES = int(os.getenv('JSON_CACHE_ENTRY_BYTES', 4 * 1024 * 1024))
+CODINGS = (['br'] if brotli is not None else []) + ['gzip', 'identity']
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+def encode_json(fields: dict, key: str, items: Iterable) -> Iterator[bytes]:
+    """`{...fields, key: [items]}` as UTF-8 chunks of about FLUSH_BYTES"""
+    head = _encode(fields)
+    parts = [head[:-1] + (',' if fields else '') + _encode(key) + ':[']
+    size = len(parts[0])
+    separator = ''
+    items = iter(items)
+    while True:
+        # Items are encoded a batch at a time: one encoder call per batch
+        # is much cheaper than one per item
+        batch = list(itertools.islice(items, BATCH_ITEMS))
+        if not batch:
+            break
+        text = separator + _encode(batch)[1:-1]
+        parts.append(text)
+        size += len(text)
+        separator = ','
+        if size >= FLUSH_BYTES:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    parts.append(']}')
+    yield ''.join(parts).encode('utf-8')
+
+def compress(chunks: Iterable[bytes], coding: str) -> Iterator[bytes]:
+    """Compress a chunk stream with 'gzip' or 'br' ('identity' passes through)"""
+    if coding == 'identity':
+        yield from chunks
+        return
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        out = process(chunk)
+        if out:
+            yield out
+    yield finish()
+
+class BodyCache:
+    """LRU of finished response bodies, bounded by total bytes; thread-safe"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def put(self, key: Tuple[str, str], body: bytes):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+_cache = BodyCache()
+
+def _tee(chunks: Iterable[bytes], cache: BodyCache, key: Tuple[str, str]) -> Iterator[bytes]:
+    # Keep a copy while it's small enough to cache; past the limit, stop holding it
+    kept: Optional[List[bytes]] = []
+    size = 0
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            if size > CACHE_ENTRY_BYTES:
+                kept = None
+            else:
+                kept.append(chunk)
+        yield chunk
+    if kept is not None:
+        cache.put(key, b''.join(kept))
+
+def json_stream_response(request: Request, fields: dict, key: str, items: Iterable,
+                         headers: Optional[List[Tuple[str, str]]] = None, cache_key: Optional[str] = None,
+                         status: int = 200, cache: BodyCache = _cache) -> Response:
+    """
+    Response with `{...fields, key: [items]}`, compressed for the client.
+    `cache_key` (usually the ETag) must change whenever the content does.
+    An ETag in `headers` should be weak (W/"..."): it's sent with every
+    coding, and their bytes differ.
+    """
+    coding = negotiate_encoding(request, CODINGS)
+    headers = [('Content-Type', 'application/json'), ('Vary', 'Accept-Encoding')] + (headers or [])
+    if coding != 'identity':
+        headers.append(('Content-Encoding', coding))
+
+    if cache_key is not None:
+        body = cache.get((cache_key, coding))
+        if body is not None:
+            return Response(status, body, headers)
+    body = compress(encode_json(fields, key, items), coding)
+    if cache_key is not None:
+        body = _tee(body, cache, (cache_key, coding))
+    return Response(status, body, headers)
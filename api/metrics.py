@@ -0,0 +1,16 @@
+import os
+
+from http_core import Endpoint, HTTPError, Response, make_handler
+from instrumentation import render_prometheus
+
+def get(request):
+    # Optional bearer token so the numbers aren't public
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        raise HTTPError(401, 'Metrics token required')
+    body = render_prometheus().encode('utf-8')
+    return Response(200, body, [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+                                ('Cache-Control', 'no-store')])
+
+endpoint = Endpoint('metrics', {'GET': get}, allow_headers='Authorization')
+handler = make_handler(endpoint)
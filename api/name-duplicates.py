@@ -0,0 +1,37 @@
+from admin_auth import require_admin
+from http_core import Endpoint, HTTPError, json_response, make_handler
+from name_index import NAME_KINDS, SIMILARITY_THRESHOLD, canonical_name, get_name_index
+
+def get(request):
+    require_admin(request)
+
+    kinds = list(NAME_KINDS)
+    kind = request.query.get('type')
+    if kind:
+        if kind not in NAME_KINDS:
+            raise HTTPError(400, 'type must be team or sponsor')
+        kinds = [kind]
+    try:
+        threshold = float(request.query.get('threshold', SIMILARITY_THRESHOLD))
+    except ValueError:
+        raise HTTPError(400, 'threshold must be a number')
+    if not 0 < threshold <= 1:
+        raise HTTPError(400, 'threshold must be between 0 and 1')
+
+    # Every group of names linked by similarity, for organizers to merge or follow up
+    clusters = []
+    with request.phase('cluster'):
+        for kind in kinds:
+            index = get_name_index(kind)
+            for ids in index.clusters(threshold):
+                clusters.append({
+                    'type': kind,
+                    'canonical': canonical_name(index.names[ids[0]]),
+                    'registrations': [{'id': entry_id, 'name': index.names[entry_id]} for entry_id in ids],
+                })
+    return json_response({'threshold': threshold, 'clusters': clusters},
+                         headers=[('Cache-Control', 'no-store')])
+
+endpoint = Endpoint('name-duplicates', {'GET': get}, allow_headers='Content-Type, Authorization',
+                    error_message='Failed to find duplicates')
+handler = make_handler(endpoint)
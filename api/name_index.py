@@ -0,0 +1,166 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from registration_store import KINDS, RegistrationStoreError, get_registration_store
+
+# Near-duplicate detection for team and company names. The registration
+# store's unique index only catches names that match after whitespace and
+# case folding; "Kerala Blasters FC" and "kerala blasters" slip through.
+#
+# Names are canonicalized (accents, punctuation and filler words such as
+# FC/club/ltd removed) and indexed as character trigrams in an inverted
+# index. A lookup only walks the postings of the query's rarest trigrams:
+# for a Jaccard threshold t, a match must share at least t*|A| of the
+# query's |A| trigrams, so it must contain one of any |A| - ceil(t*|A|) + 1
+# of them (prefix filtering). Candidates are then scored exactly. That
+# keeps lookups well under a millisecond at tens of thousands of names.
+#
+# Each process builds its index from the registration store on first use,
+# adds its own registrations as they happen, and picks up other instances'
+# rows at most every SYNC_INTERVAL seconds.
+SIMILARITY_THRESHOLD = 0.6
+SYNC_INTERVAL = 1.0
+NAME_KINDS = {kind: name_field for kind, (_, name_field) in KINDS.items() if name_field}
+
+STOPWORDS = {
+    'the', 'and', 'of',
+    'fc', 'sc', 'afc', 'cf', 'club', 'football', 'team', 'xi',
+    'ltd', 'limited', 'pvt', 'private', 'inc', 'llp', 'llc', 'co', 'company', 'corp', 'corporation',
+}
+_non_word = re.compile(r'[^\w\s]+')
+
+def canonical_name(name: str) -> str:
+    """'Kerala Blasters F.C.' -> 'kerala blasters'"""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = _non_word.sub(' ', text.replace('.', ''))
+    words = text.split()
+    kept = [w for w in words if w not in STOPWORDS]
+    # A name made only of filler words ("The Club") is kept as is
+    return ' '.join(kept or words)
+
+def trigrams(canonical: str) -> Set[str]:
+    padded = f"  {canonical} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """Trigram index over one kind's names; thread-safe"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.names: Dict[int, str] = {}
+        self._grams: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, entry_id: int, name: str):
+        grams = trigrams(canonical_name(name))
+        with self._lock:
+            if entry_id in self.names:
+                return
+            self.names[entry_id] = name
+            self._grams[entry_id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(entry_id)
+
+    def similar(self, name: str, threshold: Optional[float] = None,
+                exclude: Optional[int] = None) -> List[Tuple[int, str, float]]:
+        """(id, name, Jaccard similarity) of indexed names at or above threshold, best first"""
+        threshold = self.threshold if threshold is None else threshold
+        grams = trigrams(canonical_name(name))
+        with self._lock:
+            return self._similar(grams, threshold, exclude)
+
+    def _similar(self, grams: Set[str], threshold: float, exclude: Optional[int]) -> List[Tuple[int, str, float]]:
+        postings = self._postings
+        probe = sorted(grams, key=lambda g: len(postings.get(g, ())))
+        probe = probe[:len(grams) - math.ceil(threshold * len(grams)) + 1]
+        candidates = set()
+        for gram in probe:
+            candidates.update(postings.get(gram, ()))
+        candidates.discard(exclude)
+
+        matches = []
+        for entry_id in candidates:
+            other = self._grams[entry_id]
+            shared = len(grams & other)
+            score = shared / (len(grams) + len(other) - shared)
+            if score >= threshold:
+                matches.append((entry_id, self.names[entry_id], round(score, 3)))
+        matches.sort(key=lambda m: (-m[2], m[0]))
+        return matches
+
+    def clusters(self, threshold: Optional[float] = None) -> List[List[int]]:
+        """Groups of ids linked by similarity (transitively), largest first"""
+        threshold = self.threshold if threshold is None else threshold
+        parent: Dict[int, int] = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        with self._lock:
+            for entry_id, grams in self._grams.items():
+                for other_id, _, _ in self._similar(grams, threshold, entry_id):
+                    a, b = find(entry_id), find(other_id)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+        groups: Dict[int, List[int]] = {}
+        for entry_id in parent:
+            groups.setdefault(find(entry_id), []).append(entry_id)
+        return sorted((sorted(group) for group in groups.values()), key=lambda g: (-len(g), g[0]))
+
+class _SyncedIndex:
+    """A NameIndex kept up to date from the registration store"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.index = NameIndex()
+        self.last_id = 0
+        self.synced_at = 0.0
+        self._sync_lock = threading.Lock()
+
+    def sync(self, force: bool = False):
+        if not force and time.monotonic() - self.synced_at < SYNC_INTERVAL:
+            return
+        with self._sync_lock:
+            if not force and time.monotonic() - self.synced_at < SYNC_INTERVAL:
+                return
+            name_field = NAME_KINDS[self.kind]
+            try:
+                for row in get_registration_store().iter_registrations(after_id=self.last_id, kind=self.kind):
+                    self.index.add(row['id'], row['data'].get(name_field, ''))
+                    self.last_id = row['id']
+            except (RegistrationStoreError, sqlite3.Error) as e:
+                # Matching against a slightly stale index beats failing the request
+                print(f"Name index sync error: {e}")
+            self.synced_at = time.monotonic()
+
+_indexes: Dict[str, _SyncedIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_name_index(kind: str) -> NameIndex:
+    """The up-to-date index of `kind` ('team' or 'sponsor') names"""
+    with _indexes_lock:
+        synced = _indexes.get(kind)
+        if synced is None:
+            synced = _indexes[kind] = _SyncedIndex(kind)
+    synced.sync()
+    return synced.index
+
+def check_new_name(kind: str, entry_id: int, name: str) -> List[Tuple[int, str, float]]:
+    """Index a just-stored registration and return the existing names it resembles"""
+    index = get_name_index(kind)
+    index.add(entry_id, name)
+    return index.similar(name, exclude=entry_id)
@@ -0,0 +1,234 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import image_variants
+
+# Perceptual near-duplicate detection for gallery photos. Each upload gets a
+# 64-bit dHash (brightness gradients of a 9x8 grayscale thumbnail), which
+# stays within a few bits across re-encodes, resizes and burst shots of
+# the same moment.
+#
+# Hashes are kept in a SQLite file and, per process, in a multi-index hash
+# table: the 64 bits are split into CHUNKS 16-bit chunks, each with its own
+# exact-match table. Two hashes within Hamming distance r must agree to
+# within r // CHUNKS bits on at least one chunk (pigeonhole), so a lookup
+# probes every chunk value within that radius and verifies only those
+# candidates. At 100k photos that's a few hundred dict probes, far below a
+# millisecond, instead of 100k popcounts.
+#
+# The default database path is under /tmp, which on Vercel is local to each
+# function instance and lost when it's recycled: there the upload check only
+# sees photos hashed by the same instance, and a photo uploaded twice to
+# different instances goes unflagged. Point PHOTO_HASH_DB_PATH at storage
+# every instance shares where there is one; otherwise run
+# tools/photo_dedupe.py, which hashes the whole gallery, to catch the rest.
+HASH_DB_PATH = os.getenv('PHOTO_HASH_DB_PATH', '/tmp/onam-photo-hashes.db')
+HAMMING_THRESHOLD = int(os.getenv('PHOTO_HASH_THRESHOLD', 8))
+DUPLICATE_POLICY = os.getenv('PHOTO_DUPLICATE_POLICY', 'flag')  # 'flag' or 'reject'
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+SYNC_INTERVAL = 1.0
+
+def enabled() -> bool:
+    return image_variants.PILLOW_AVAILABLE and os.getenv('PHOTO_DEDUP', '1') != '0'
+
+def dhash_image(image) -> int:
+    from PIL import Image, ImageOps
+    image = ImageOps.exif_transpose(image).convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = image.tobytes()
+    value = 0
+    for row in range(0, 72, 9):
+        for col in range(row, row + 8):
+            value = (value << 1) | (pixels[col] < pixels[col + 1])
+    return value
+
+def dhash_file(source) -> int:
+    """dHash of an image file path or file object"""
+    from PIL import Image
+    with Image.open(source) as image:
+        # JPEG draft mode decodes at a fraction of full size
+        image.draft('L', (64, 64))
+        return dhash_image(image)
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def _chunk_masks(radius: int) -> List[int]:
+    masks = []
+    for flips in range(radius + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), flips):
+            masks.append(sum(1 << bit for bit in bits))
+    return masks
+
+class PhotoHashIndex:
+    """Multi-index hash table of pathname -> 64-bit hash; thread-safe"""
+
+    def __init__(self, threshold: int = HAMMING_THRESHOLD):
+        self.threshold = threshold
+        self.hashes: Dict[str, int] = {}
+        # Per chunk: chunk value -> {pathname: full hash}
+        self._tables: List[Dict[int, Dict[str, int]]] = [{} for _ in range(CHUNKS)]
+        self._masks: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def _chunks(value: int) -> List[int]:
+        mask = (1 << CHUNK_BITS) - 1
+        return [(value >> (i * CHUNK_BITS)) & mask for i in range(CHUNKS)]
+
+    def add(self, pathname: str, value: int):
+        with self._lock:
+            if pathname in self.hashes:
+                self._remove(pathname)
+            self.hashes[pathname] = value
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                table.setdefault(chunk, {})[pathname] = value
+
+    def remove(self, pathname: str):
+        with self._lock:
+            self._remove(pathname)
+
+    def _remove(self, pathname: str):
+        value = self.hashes.pop(pathname, None)
+        if value is None:
+            return
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.pop(pathname, None)
+                if not bucket:
+                    del table[chunk]
+
+    def similar(self, value: int, threshold: Optional[int] = None,
+                exclude: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(pathname, Hamming distance) within threshold, closest first"""
+        threshold = self.threshold if threshold is None else threshold
+        radius = threshold // CHUNKS
+        masks = self._masks.get(radius)
+        if masks is None:
+            masks = self._masks[radius] = _chunk_masks(radius)
+        found = {}
+        with self._lock:
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                get = table.get
+                for mask in masks:
+                    bucket = get(chunk ^ mask)
+                    if bucket:
+                        for pathname, other in bucket.items():
+                            distance = (value ^ other).bit_count()
+                            if distance <= threshold:
+                                found[pathname] = distance
+        found.pop(exclude, None)
+        matches = sorted(found.items(), key=lambda m: (m[1], m[0]))
+        return matches
+
+    def keeper_groups(self, order: List[str], threshold: Optional[int] = None) -> List[List[str]]:
+        """
+        [keeper, *duplicates] groups, where every duplicate is within
+        threshold of its keeper itself. Pathnames are taken in `order` (the
+        one to keep first, e.g. oldest); each not yet claimed becomes a
+        keeper and claims the later ones near it. Linking transitively
+        instead would chain a run of gradually changing shots into one
+        group whose ends look nothing alike. Groups without duplicates and
+        pathnames missing from `order` are left out.
+        """
+        rank = {pathname: i for i, pathname in enumerate(order)}
+        claimed: Set[str] = set()
+        groups = []
+        for i, pathname in enumerate(order):
+            value = self.hashes.get(pathname)
+            if value is None or pathname in claimed:
+                continue
+            duplicates = [other for other, _ in self.similar(value, threshold, exclude=pathname)
+                          if rank.get(other, -1) > i and other not in claimed]
+            if duplicates:
+                claimed.update(duplicates)
+                groups.append([pathname] + duplicates)
+        return groups
+
+# --- Persistence ---
+
+_conn = None
+_db_lock = threading.Lock()
+_index: Optional[PhotoHashIndex] = None
+_last_rowid = 0
+_synced_at = 0.0
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(HASH_DB_PATH, timeout=5, isolation_level=None, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS photo_hashes (
+                pathname TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+    return _conn
+
+def get_index() -> PhotoHashIndex:
+    """
+    This process's index, loaded from the hash database on first use and
+    topped up with rows other instances added at most every SYNC_INTERVAL.
+    """
+    global _index, _last_rowid, _synced_at
+    with _db_lock:
+        if _index is None:
+            _index = PhotoHashIndex()
+        if time.monotonic() - _synced_at >= SYNC_INTERVAL:
+            try:
+                rows = _get_conn().execute('SELECT rowid, pathname, hash FROM photo_hashes WHERE rowid > ?',
+                                           (_last_rowid,)).fetchall()
+            except sqlite3.Error as e:
+                print(f"Photo hash sync error: {e}")
+                rows = []
+            for rowid, pathname, value in rows:
+                _index.add(pathname, int(value, 16))
+                _last_rowid = max(_last_rowid, rowid)
+            _synced_at = time.monotonic()
+        return _index
+
+def _still_stored(pathnames: List[str]) -> Set[str]:
+    # Other instances' deletions only reach this process's index on restart,
+    # so matches are confirmed against the database before being reported
+    placeholders = ','.join('?' * len(pathnames))
+    with _db_lock:
+        rows = _get_conn().execute(f'SELECT pathname FROM photo_hashes WHERE pathname IN ({placeholders})',
+                                   pathnames).fetchall()
+    return {row[0] for row in rows}
+
+def find_similar(value: int, exclude: Optional[str] = None) -> List[Tuple[str, int]]:
+    matches = get_index().similar(value, exclude=exclude)
+    if not matches:
+        return matches
+    stored = _still_stored([p for p, _ in matches])
+    for pathname, _ in matches:
+        if pathname not in stored:
+            get_index().remove(pathname)
+    return [m for m in matches if m[0] in stored]
+
+def remember(pathname: str, value: int):
+    with _db_lock:
+        _get_conn().execute('INSERT OR REPLACE INTO photo_hashes VALUES (?, ?, ?)',
+                            (pathname, f"{value:016x}", time.time()))
+    get_index().add(pathname, value)
+
+def forget(pathnames: List[str]):
+    if not pathnames:
+        return
+    with _db_lock:
+        _get_conn().executemany('DELETE FROM photo_hashes WHERE pathname = ?', [(p,) for p in pathnames])
+    index = get_index()
+    for pathname in pathnames:
+        index.remove(pathname)
@@ -0,0 +1,106 @@
+import os
+import secrets
+import time
+from typing import Iterable, Iterator, List
+
+from blob_client import delete_blobs, fetch_blob, iter_blobs, iter_prefixes, put_blob
+
+# Where gallery photos live. Vercel Blob in production; a local directory
+# (GALLERY_STORAGE=local) for self-hosting and offline testing. Both expose
+# the same blob dicts: url, pathname, size, uploadedAt. Original photos are
+# stored under PHOTO_PREFIX/<category>/.
+PHOTO_PREFIX = 'tournament-photos/'
+
+class BlobStorage:
+    def __init__(self, token: str):
+        self.token = token
+
+    def iter_blobs(self, prefix: str) -> Iterator[dict]:
+        return iter_blobs(self.token, prefix)
+
+    def iter_prefixes(self, prefixes: List[str]) -> Iterator[dict]:
+        return iter_prefixes(self.token, prefixes)
+
+    def put(self, pathname: str, chunks: Iterable[bytes], content_type: str, overwrite: bool = True) -> dict:
+        return put_blob(self.token, pathname, chunks, content_type, overwrite)
+
+    def read(self, blob: dict) -> bytes:
+        return fetch_blob(blob['url'])
+
+    def delete(self, blobs: List[dict]):
+        delete_blobs(self.token, [blob['url'] for blob in blobs])
+
+class LocalStorage:
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip('/')
+
+    def _path(self, pathname: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, pathname))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid pathname: {pathname}")
+        return path
+
+    def _blob(self, pathname: str, path: str) -> dict:
+        stat = os.stat(path)
+        return {
+            'url': f"{self.base_url}/{pathname}",
+            'pathname': pathname,
+            'size': stat.st_size,
+            'uploadedAt': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(stat.st_mtime)),
+        }
+
+    def iter_blobs(self, prefix: str) -> Iterator[dict]:
+        top = os.path.join(self.root, os.path.dirname(prefix))
+        for directory, _, files in os.walk(top):
+            for name in files:
+                if name.startswith('.'):
+                    continue  # in-progress temp files
+                path = os.path.join(directory, name)
+                pathname = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if pathname.startswith(prefix):
+                    yield self._blob(pathname, path)
+
+    def iter_prefixes(self, prefixes: List[str]) -> Iterator[dict]:
+        for prefix in prefixes:
+            yield from self.iter_blobs(prefix)
+
+    def put(self, pathname: str, chunks: Iterable[bytes], content_type: str, overwrite: bool = True) -> dict:
+        path = self._path(pathname)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = os.path.join(os.path.dirname(path), f".{secrets.token_hex(8)}.part")
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            if overwrite:
+                os.replace(temp_path, path)
+            else:
+                os.link(temp_path, path)  # FileExistsError if it's already there
+                os.remove(temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return self._blob(pathname, path)
+
+    def read(self, blob: dict) -> bytes:
+        with open(self._path(blob['pathname']), 'rb') as f:
+            return f.read()
+
+    def delete(self, blobs: List[dict]):
+        for blob in blobs:
+            try:
+                os.remove(self._path(blob['pathname']))
+            except FileNotFoundError:
+                pass
+
+def get_storage():
+    """Configured photo storage, or None when nothing is configured"""
+    if os.getenv('GALLERY_STORAGE', 'blob').lower() == 'local':
+        return LocalStorage(
+            os.getenv('GALLERY_LOCAL_DIR', '/tmp/onam-gallery'),
+            os.getenv('GALLERY_LOCAL_URL', '/gallery-files'),
+        )
+    blob_token = os.getenv('BLOB_READ_WRITE_TOKEN')
+    return BlobStorage(blob_token) if blob_token else None
@@ -1,34 +1,27 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import smtplib
-import ssl
-import os
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from datetime import datetime
+import time
+
+from http_core import Endpoint, HTTPError, json_response, make_handler
+from registration_store import DuplicateRegistration, RegistrationStoreError, get_registration_store
+from validation import REGISTRATION_SCHEMAS, first_error
 
 # Import our security utils (will be in same directory)
 try:
-    from security_utils import get_client_id, is_rate_limited, record_request, validate_input
+    from security_utils import get_client_id, is_rate_limited, refund_rate_limit
 except ImportError:
     # Fallback if import fails
     def get_client_id(headers): return "default"
-    def is_rate_limited(client_id, endpoint): return False, ""
-    def record_request(client_id, endpoint, email): return True
-    def validate_input(data, fields): return True, ""
+    def is_rate_limited(client_id, endpoint, now=None): return False, ""
+    def refund_rate_limit(client_id, endpoint, now): pass
 
-def send_email(player_data):
-    """Send email notification to admin"""
-    sender_email = os.getenv('SENDER_EMAIL')
-    smtp_username = os.getenv('SES_SMTP_USERNAME')
-    smtp_password = os.getenv('SES_SMTP_PASSWORD')
-    smtp_host = os.getenv('SES_SMTP_HOST')
-    smtp_port = int(os.getenv('SES_SMTP_PORT', 587))
-    
-    if not all([sender_email, smtp_username, smtp_password, smtp_host]):
-        print("Missing SMTP configuration")
+try:
+    from email_queue import notify
+except ImportError:
+    def notify(subject, body, kind, summary, immediate=False):
+        print("Email queue unavailable")
         return False
-    
+
+def send_email(player_data):
+    """Queue email notification to admin"""
     subject = "🏆 New Player Registration - Onam Tournament 2025"
     body = f"""
     <html>
@@ -42,7 +35,7 @@ def send_email(player_data):
             <li><strong>Contact:</strong> {player_data['contactNumber']}</li>
             <li><strong>Email:</strong> {player_data['email']}</li>
             <li><strong>Position:</strong> {player_data['playingPosition']}</li>
-            <li><strong>Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</li>
+            <li><strong>Time:</strong> {time.strftime('%Y-%m-%d %H:%M:%S')}</li>
         </ul>
         
         <p>Contact the player to confirm registration and payment.</p>
@@ -50,100 +43,59 @@ def send_email(player_data):
     </html>
     """
     
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = subject
-    msg['From'] = sender_email
-    msg['To'] = sender_email  # Send to yourself for now
-    msg.attach(MIMEText(body, 'html'))
-    
-    try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls(context=context)
-            server.login(smtp_username, smtp_password)
-            server.sendmail(sender_email, sender_email, msg.as_string())
-        return True
-    except Exception as e:
-        print(f"Email error: {e}")
-        return False
+    summary = {
+        'Name': player_data['fullName'],
+        'Contact': player_data['contactNumber'],
+        'Email': player_data['email'],
+        'Position': player_data['playingPosition'],
+    }
+    return notify(subject, body, 'player', summary)
 
-class handler(BaseHTTPRequestHandler):
-    def do_POST(self):
+def post(request):
+    # Parse request data (size already checked against max_body)
+    data = request.json()
+    
+    # Validate input (all field errors at once; 'error' keeps the first for the form)
+    with request.phase('validate'):
+        errors = REGISTRATION_SCHEMAS['player'].validate(data)
+    if errors:
+        raise HTTPError(400, first_error(errors), errors=errors)
+    
+    # Count the attempt and check rate limits in one step (invalid forms don't count)
+    with request.phase('rate_limit'):
+        client_id = get_client_id(request.headers)
+        attempted_at = time.time()
+        is_limited, limit_msg = is_rate_limited(client_id, 'register-player', attempted_at)
+    if is_limited:
+        raise HTTPError(429, limit_msg)  # Too Many Requests
+    
+    # Store the registration; the duplicate check is part of the same transaction.
+    # Duplicates don't count against the rate limits.
+    with request.phase('store'):
         try:
-            # Get client identifier for rate limiting
-            client_id = get_client_id(self.headers)
-            
-            # Check rate limits
-            is_limited, limit_msg = is_rate_limited(client_id, 'register-player')
-            if is_limited:
-                self.send_response(429)  # Too Many Requests
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                error_response = json.dumps({'error': limit_msg})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            # Standard headers
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            # Parse request data
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 10000:  # 10KB limit
-                error_response = json.dumps({'error': 'Request too large'})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-                
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-            
-            # Validate input
-            required_fields = ['fullName', 'contactNumber', 'email', 'playingPosition']
-            is_valid, validation_error = validate_input(data, required_fields)
-            if not is_valid:
-                error_response = json.dumps({'error': validation_error})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            # Check if email already registered and record request
-            email = data['email'].strip().lower()
-            if not record_request(client_id, 'register-player', email):
-                error_response = json.dumps({'error': 'This email has already been registered today'})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            # Send notification email
-            if send_email(data):
-                success_response = json.dumps({
-                    'message': 'Registration successful! You will be contacted soon.',
-                    'status': 'success'
-                })
-                self.wfile.write(success_response.encode('utf-8'))
-            else:
-                # Still return success to user, but log the email failure
-                print("Email sending failed, but registration was recorded")
-                success_response = json.dumps({
-                    'message': 'Registration received! You will be contacted soon.',
-                    'status': 'success'
-                })
-                self.wfile.write(success_response.encode('utf-8'))
-                
-        except json.JSONDecodeError:
-            error_response = json.dumps({'error': 'Invalid JSON data'})
-            self.wfile.write(error_response.encode('utf-8'))
-        except Exception as e:
-            print(f"Handler error: {e}")
-            error_response = json.dumps({'error': 'Server error occurred'})
-            self.wfile.write(error_response.encode('utf-8'))
+            registration_id = get_registration_store().register('player', data)
+        except DuplicateRegistration:
+            refund_rate_limit(client_id, 'register-player', attempted_at)
+            raise HTTPError(409, 'This email has already been registered')
+        except RegistrationStoreError as e:
+            # Nowhere to keep it right now: accept it anyway, the email carries the details
+            print(f"Registration not stored: {e}")
+            registration_id = None
     
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+    # Send notification email
+    with request.phase('email'):
+        queued = send_email(data)
+    if registration_id is None and not queued:
+        # Neither stored nor emailed: the registration would be lost
+        refund_rate_limit(client_id, 'register-player', attempted_at)
+        raise HTTPError(503, 'Registration could not be saved. Please try again.')
+    if queued:
+        message = 'Registration successful! You will be contacted soon.'
+    else:
+        # Still return success to user, but log the email failure
+        print("Email sending failed, but registration was recorded")
+        message = 'Registration received! You will be contacted soon.'
+    return json_response({'message': message, 'status': 'success'})
+
+endpoint = Endpoint('register-player', {'POST': post}, max_body=10000)
+handler = make_handler(endpoint)
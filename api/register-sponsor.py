@@ -1,38 +1,35 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import smtplib
-import ssl
-import os
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from datetime import datetime
+import time
+
+from http_core import Endpoint, HTTPError, json_response, make_handler
+from name_index import check_new_name
+from registration_store import DuplicateRegistration, RegistrationStoreError, get_registration_store
+from validation import REGISTRATION_SCHEMAS, first_error
 
 # Import security utils
 try:
-    from security_utils import get_client_id, is_rate_limited, record_request, validate_input
+    from security_utils import get_client_id, is_rate_limited, refund_rate_limit
 except ImportError:
     def get_client_id(headers): return "default"
-    def is_rate_limited(client_id, endpoint): return False, ""
-    def record_request(client_id, endpoint, email): return True
-    def validate_input(data, fields): return True, ""
+    def is_rate_limited(client_id, endpoint, now=None): return False, ""
+    def refund_rate_limit(client_id, endpoint, now): pass
 
-def send_email(sponsor_data):
-    """Send email notification to admin"""
-    sender_email = os.getenv('SENDER_EMAIL')
-    smtp_username = os.getenv('SES_SMTP_USERNAME')
-    smtp_password = os.getenv('SES_SMTP_PASSWORD')
-    smtp_host = os.getenv('SES_SMTP_HOST')
-    smtp_port = int(os.getenv('SES_SMTP_PORT', 587))
-    
-    if not all([sender_email, smtp_username, smtp_password, smtp_host]):
-        print("Missing SMTP configuration")
+try:
+    from email_queue import notify
+except ImportError:
+    def notify(subject, body, kind, summary, immediate=False):
+        print("Email queue unavailable")
         return False
-    
+
+IMMEDIATE_SPONSOR_LEVELS = ('title', 'gold')
+
+def send_email(sponsor_data, similar=()):
+    """Queue email notification to admin"""
     subject = "💼 New Sponsor Registration - Onam Tournament 2025"
     body = f"""
     <html>
     <body>
         <h2>New Sponsor Registration</h2>
+        {f"<p><strong>Possible duplicate of:</strong> {', '.join(similar)}</p>" if similar else ""}
         <p><strong>Tournament:</strong> Onam Special Football Tournament 2025</p>
         
         <h3>Sponsor Details:</h3>
@@ -41,7 +38,7 @@ def send_email(sponsor_data):
             <li><strong>Contact Number:</strong> {sponsor_data['contactNumber']}</li>
             <li><strong>Email:</strong> {sponsor_data['email']}</li>
             <li><strong>Sponsorship Level:</strong> {sponsor_data['sponsorshipLevel'].title()}</li>
-            <li><strong>Registration Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</li>
+            <li><strong>Registration Time:</strong> {time.strftime('%Y-%m-%d %H:%M:%S')}</li>
         </ul>
         
         <p><strong>Priority Action:</strong> Contact sponsor within 24 hours to discuss partnership details and benefits.</p>
@@ -51,119 +48,69 @@ def send_email(sponsor_data):
     </html>
     """
     
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = subject
-    msg['From'] = sender_email
-    msg['To'] = sender_email
-    msg.attach(MIMEText(body, 'html'))
-    
-    try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls(context=context)
-            server.login(smtp_username, smtp_password)
-            server.sendmail(sender_email, sender_email, msg.as_string())
-        return True
-    except Exception as e:
-        print(f"Email error: {e}")
-        return False
+    summary = {
+        'Company Name': sponsor_data['companyName'],
+        'Contact Number': sponsor_data['contactNumber'],
+        'Email': sponsor_data['email'],
+        'Sponsorship Level': sponsor_data['sponsorshipLevel'].title(),
+        'Possible Duplicate Of': ', '.join(similar),
+    }
+    # Top-tier sponsors are worth an email right away, even in digest mode
+    immediate = sponsor_data['sponsorshipLevel'] in IMMEDIATE_SPONSOR_LEVELS
+    return notify(subject, body, 'sponsor', summary, immediate=immediate)
 
-def validate_sponsor_input(data):
-    """Custom validation for sponsor registration"""
-    required_fields = ['contactNumber', 'email', 'companyName', 'sponsorshipLevel']
-    is_valid, error = validate_input(data, required_fields)
-    if not is_valid:
-        return False, error
+def post(request):
+    # Parse request data (size already checked against max_body)
+    data = request.json()
     
-    # Additional sponsor-specific validation
-    company_name = data.get('companyName', '').strip()
-    if len(company_name) < 2:
-        return False, "Company name must be at least 2 characters"
-    if len(company_name) > 100:
-        return False, "Company name too long (max 100 characters)"
+    # Validate input (all field errors at once; 'error' keeps the first for the form)
+    with request.phase('validate'):
+        errors = REGISTRATION_SCHEMAS['sponsor'].validate(data)
+    if errors:
+        raise HTTPError(400, first_error(errors), errors=errors)
+    data = REGISTRATION_SCHEMAS['sponsor'].clean(data)
     
-    # Validate sponsorship level
-    valid_levels = ['title', 'gold', 'silver', 'bronze', 'supporting']
-    sponsorship_level = data.get('sponsorshipLevel', '').lower().strip()
-    if sponsorship_level not in valid_levels:
-        return False, "Invalid sponsorship level"
+    # Count the attempt and check rate limits in one step (invalid forms don't count)
+    with request.phase('rate_limit'):
+        client_id = get_client_id(request.headers)
+        attempted_at = time.time()
+        is_limited, limit_msg = is_rate_limited(client_id, 'register-sponsor', attempted_at)
+    if is_limited:
+        raise HTTPError(429, limit_msg)  # Too Many Requests
     
-    return True, ""
-
-class handler(BaseHTTPRequestHandler):
-    def do_POST(self):
+    # Store the registration; the duplicate check is part of the same transaction.
+    # Duplicates don't count against the rate limits.
+    with request.phase('store'):
         try:
-            # Get client identifier for rate limiting
-            client_id = get_client_id(self.headers)
-            
-            # Check rate limits
-            is_limited, limit_msg = is_rate_limited(client_id, 'register-sponsor')
-            if is_limited:
-                self.send_response(429)
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                error_response = json.dumps({'error': limit_msg})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            # Standard headers
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            # Parse request data
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 10000:  # 10KB limit
-                error_response = json.dumps({'error': 'Request too large'})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-                
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-            
-            # Validate input
-            is_valid, validation_error = validate_sponsor_input(data)
-            if not is_valid:
-                error_response = json.dumps({'error': validation_error})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            # Check if sponsor email already registered and record request
-            sponsor_email = data['email'].strip().lower()
-            if not record_request(client_id, 'register-sponsor', sponsor_email):
-                error_response = json.dumps({'error': 'This sponsor email has already been registered today'})
-                self.wfile.write(error_response.encode('utf-8'))
-                return
-            
-            # Send notification email
-            if send_email(data):
-                success_response = json.dumps({
-                    'message': 'Sponsor registration successful! Our team will contact you within 24 hours.',
-                    'status': 'success'
-                })
-                self.wfile.write(success_response.encode('utf-8'))
-            else:
-                success_response = json.dumps({
-                    'message': 'Sponsor registration received! Our team will contact you soon.',
-                    'status': 'success'
-                })
-                self.wfile.write(success_response.encode('utf-8'))
-                
-        except json.JSONDecodeError:
-            error_response = json.dumps({'error': 'Invalid JSON data'})
-            self.wfile.write(error_response.encode('utf-8'))
-        except Exception as e:
-            print(f"Handler error: {e}")
-            error_response = json.dumps({'error': 'Server error occurred'})
-            self.wfile.write(error_response.encode('utf-8'))
+            registration_id = get_registration_store().register('sponsor', data)
+        except DuplicateRegistration as e:
+            refund_rate_limit(client_id, 'register-sponsor', attempted_at)
+            if e.field == 'name':
+                raise HTTPError(409, 'This company is already registered as a sponsor')
+            raise HTTPError(409, 'This sponsor email has already been registered')
+        except RegistrationStoreError as e:
+            # Nowhere to keep it right now: accept it anyway, the email carries the details
+            print(f"Registration not stored: {e}")
+            registration_id = None
     
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+    # Flag near-duplicate names ("Kerala Blasters FC" / "kerala blasters") for the organizers
+    with request.phase('dedupe'):
+        similar = [] if registration_id is None else \
+            [name for _, name, _ in check_new_name('sponsor', registration_id, data['companyName'])]
+
+    # Send notification email
+    with request.phase('email'):
+        queued = send_email(data, similar)
+    if registration_id is None and not queued:
+        # Neither stored nor emailed: the registration would be lost
+        refund_rate_limit(client_id, 'register-sponsor', attempted_at)
+        raise HTTPError(503, 'Registration could not be saved. Please try again.')
+    if queued:
+        message = 'Sponsor registration successful! Our team will contact you within 24 hours.'
+    else:
+        # Still return success to user, but log the email failure
+        message = 'Sponsor registration received! Our team will contact you soon.'
+    return json_response({'message': message, 'status': 'success'})
+
+endpoint = Endpoint('register-sponsor', {'POST': post}, max_body=10000)
+handler = make_handler(endpoint)
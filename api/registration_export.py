@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Registration exports for organizers. Rows come straight from
+# RegistrationStore.iter_registrations and are encoded into ~64KB chunks as
+# they arrive, so an export of any size streams with constant memory.
+FLUSH_BYTES = 64 * 1024
+FORMATS = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+# Column order per registration type; 'all' uses the union in this order
+COLUMNS = {
+    'player': ['id', 'type', 'createdAt', 'fullName', 'email', 'contactNumber', 'playingPosition'],
+    'team': ['id', 'type', 'createdAt', 'teamName', 'captainName', 'captainEmail', 'captainContact',
+             'teamMembers'],
+    'sponsor': ['id', 'type', 'createdAt', 'companyName', 'email', 'contactNumber', 'sponsorshipLevel'],
+}
+MEMBER_COLUMNS = ['teamId', 'teamName', 'role', 'playerName', 'captainEmail', 'createdAt']
+
+_date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}:\d{2}Z)?$')
+_member_separator = re.compile(r'[\n,;]+')
+# Spreadsheets treat a cell starting with one of these as a formula, so a
+# registrant could plant one (=HYPERLINK(...)) in an organizer's export.
+# CSV cells starting with them get a leading apostrophe; NDJSON is left as is.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+class ExportRequestError(Exception):
+    pass
+
+def columns_for(kind: Optional[str]) -> List[str]:
+    if kind:
+        return COLUMNS[kind]
+    columns = []
+    for kind_columns in COLUMNS.values():
+        columns += [c for c in kind_columns if c not in columns]
+    return columns
+
+def parse_bound(value: Optional[str], end: bool) -> Optional[str]:
+    """Query date (YYYY-MM-DD or full ISO) as a created_at bound; dates are inclusive"""
+    if not value:
+        return None
+    if not _date_pattern.match(value):
+        raise ExportRequestError('Dates must be YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ')
+    if len(value) == 10:
+        return value + ('T23:59:59Z' if end else 'T00:00:00Z')
+    return value
+
+def split_members(members) -> List[str]:
+    """teamMembers is free text (one per line or comma-separated) or a list"""
+    if isinstance(members, list):
+        names = [str(m) for m in members]
+    else:
+        names = _member_separator.split(str(members or ''))
+    return [' '.join(name.split()) for name in names if name.strip()]
+
+def flat_rows(registrations: Iterable[Dict]) -> Iterator[Dict]:
+    """One row per registration"""
+    for registration in registrations:
+        row = dict(registration['data'])
+        row.update(id=registration['id'], type=registration['kind'], createdAt=registration['createdAt'])
+        if isinstance(row.get('teamMembers'), list):
+            row['teamMembers'] = '; '.join(split_members(row['teamMembers']))
+        yield row
+
+def member_rows(registrations: Iterable[Dict]) -> Iterator[Dict]:
+    """One row per player on each team, captain first"""
+    for registration in registrations:
+        data = registration['data']
+        team_id, team_name = registration['id'], data.get('teamName', '')
+        captain_email, created_at = data.get('captainEmail', ''), registration['createdAt']
+        players = [('captain', data['captainName'])] if data.get('captainName') else []
+        players += [('member', name) for name in split_members(data.get('teamMembers'))]
+        for role, name in players:
+            yield {'teamId': team_id, 'teamName': team_name, 'role': role, 'playerName': name,
+                   'captainEmail': captain_email, 'createdAt': created_at}
+
+def _flush_chunks(buffer: io.StringIO, force: bool = False) -> Optional[bytes]:
+    if buffer.tell() < FLUSH_BYTES and not force:
+        return None
+    chunk = buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+def csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def encode_csv(rows: Iterable[Dict], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore', lineterminator='\r\n')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({column: csv_cell(value) for column, value in row.items()})
+        chunk = _flush_chunks(buffer)
+        if chunk:
+            yield chunk
+    yield _flush_chunks(buffer, force=True)
+
+def encode_ndjson(rows: Iterable[Dict]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+        buffer.write('\n')
+        chunk = _flush_chunks(buffer)
+        if chunk:
+            yield chunk
+    yield _flush_chunks(buffer, force=True)
+
+def export(store, fmt: str = 'csv', kind: Optional[str] = None, view: str = 'registrations',
+           since: Optional[str] = None, until: Optional[str] = None,
+           sponsorship_level: Optional[str] = None, playing_position: Optional[str] = None) -> Iterator[bytes]:
+    """Encoded export body as a generator of byte chunks"""
+    if fmt not in FORMATS:
+        raise ExportRequestError('format must be csv or ndjson')
+    if view == 'members':
+        if kind not in (None, 'team'):
+            raise ExportRequestError('The members view only applies to teams')
+        kind, columns, to_rows = 'team', MEMBER_COLUMNS, member_rows
+    elif view == 'registrations':
+        if kind is not None and kind not in COLUMNS:
+            raise ExportRequestError('type must be player, team or sponsor')
+        columns, to_rows = columns_for(kind), flat_rows
+    else:
+        raise ExportRequestError('view must be registrations or members')
+
+    registrations = store.iter_registrations(
+        kind=kind, since=parse_bound(since, end=False), until=parse_bound(until, end=True),
+        sponsorship_level=sponsorship_level, playing_position=playing_position)
+    rows = to_rows(registrations)
+    return encode_csv(rows, columns) if fmt == 'csv' else encode_ndjson(rows)
@@ -0,0 +1,322 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from state_store import StateStore, StateStoreError, get_store
+
+# Durable store for player, team and sponsor registrations. Rows live in a
+# WAL-mode SQLite file with unique indexes on the normalized email and
+# team/company name per registration type, so the duplicate check is an
+# index probe inside the same transaction as the insert.
+#
+# Writes go through a single writer thread that group-commits: requests
+# arriving within BATCH_WINDOW share one transaction (and one fsync), and
+# each caller blocks until its row is committed before the user is told
+# the registration succeeded. SQL strings are module constants, so the
+# connection's statement cache keeps them prepared.
+#
+# The database is a local file, so it is only as durable as the disk it is
+# on and only serves one instance. The /tmp default suits local runs; a
+# self-hosted deployment sets REGISTRATION_DB_PATH to a persistent volume.
+#
+# Serverless instances (Vercel) have no such disk. There, with a Redis
+# state backend (STATE_BACKEND=redis), registrations are kept in the state
+# store instead (StateRegistrationStore; REGISTRATION_BACKEND=state picks
+# it anywhere). With neither, get_registration_store() raises and the
+# register endpoints still accept and email each registration, unstored.
+DEFAULT_DB_PATH = '/tmp/onam-registrations.db'
+DB_PATH = os.getenv('REGISTRATION_DB_PATH', DEFAULT_DB_PATH)
+BATCH_WINDOW = float(os.getenv('REGISTRATION_BATCH_WINDOW', '0.002'))  # seconds
+MAX_BATCH = 256
+WRITE_TIMEOUT = float(os.getenv('REGISTRATION_WRITE_TIMEOUT', 10))  # seconds a caller waits for its commit
+
+# Registration type -> (email field, unique name field or None)
+KINDS = {
+    'player': ('email', None),
+    'team': ('captainEmail', 'teamName'),
+    'sponsor': ('email', 'companyName'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS registrations (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    email TEXT NOT NULL,
+    name_key TEXT,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS registrations_email ON registrations (kind, email);
+CREATE UNIQUE INDEX IF NOT EXISTS registrations_name ON registrations (kind, name_key)
+    WHERE name_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS registrations_created ON registrations (kind, created_at);
+"""
+
+INSERT_SQL = """
+INSERT INTO registrations (kind, email, name_key, data, created_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT DO NOTHING
+"""
+EMAIL_TAKEN_SQL = "SELECT 1 FROM registrations WHERE kind = ? AND email = ?"
+
+# Filters for iter_registrations: keyword -> SQL condition on one parameter.
+# Form values match whatever their case or padding (rows stored before
+# choices were cleaned can still say 'Gold ').
+READ_FILTERS = {
+    'kind': "kind = ?",
+    'since': "created_at >= ?",
+    'until': "created_at <= ?",
+    'sponsorship_level': "lower(trim(json_extract(data, '$.sponsorshipLevel'))) = lower(trim(?))",
+    'playing_position': "lower(trim(json_extract(data, '$.playingPosition'))) = lower(trim(?))",
+}
+READ_BATCH = 500
+
+class RegistrationStoreError(Exception):
+    pass
+
+class DuplicateRegistration(RegistrationStoreError):
+    """`field` is 'email' or 'name', whichever unique index matched"""
+
+    def __init__(self, field: str):
+        super().__init__(f"Duplicate {field}")
+        self.field = field
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def normalize_name(name: str) -> str:
+    return ' '.join(name.split()).casefold()
+
+def registration_keys(kind: str, data: dict) -> Tuple[str, Optional[str]]:
+    """(normalized email, normalized name or None) for a registration"""
+    email_field, name_field = KINDS[kind]
+    name_key = normalize_name(data.get(name_field, '')) if name_field else None
+    return normalize_email(data.get(email_field, '')), name_key or None
+
+class _PendingWrite:
+    __slots__ = ('params', 'done', 'row_id', 'error')
+
+    def __init__(self, params: tuple):
+        self.params = params
+        self.done = threading.Event()
+        self.row_id = None
+        self.error = None
+
+class RegistrationStore:
+    def __init__(self, path: str = DB_PATH, batch_window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        self.path = path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Group commit makes the per-transaction fsync affordable
+        conn.execute('PRAGMA synchronous=FULL')
+        return conn
+
+    def register(self, kind: str, data: dict) -> int:
+        """
+        Store one registration and return its id once committed. Raises
+        DuplicateRegistration if the email or name is already registered
+        for this kind, RegistrationStoreError if the write failed.
+        """
+        email, name_key = registration_keys(kind, data)
+        created_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        pending = _PendingWrite((kind, email, name_key, json.dumps(data), created_at))
+        self._ensure_writer()
+        self._queue.put(pending)
+        if not pending.done.wait(WRITE_TIMEOUT):
+            # A stuck or dead writer mustn't hang the request thread
+            raise RegistrationStoreError('Timed out waiting for the registration writer')
+        if pending.error is not None:
+            raise pending.error
+        return pending.row_id
+
+    def iter_registrations(self, batch_size: int = READ_BATCH, after_id: int = 0, **filters) -> Iterator[Dict]:
+        """
+        Yield stored registrations with id > after_id in id order as
+        {'id', 'kind', 'createdAt', 'data'}, filtered by READ_FILTERS
+        keywords (None means no filter). Rows are fetched in keyset-paginated
+        batches on a private connection, so memory stays flat however many
+        there are and no read transaction is held open between batches.
+        """
+        conditions, params = ['id > ?'], []
+        for name, value in filters.items():
+            if value is not None:
+                conditions.append(READ_FILTERS[name])
+                params.append(value)
+        sql = (f"SELECT id, kind, data, created_at FROM registrations WHERE {' AND '.join(conditions)} "
+               f"ORDER BY id LIMIT {int(batch_size)}")
+        conn = self._connect()
+        try:
+            last_id = after_id
+            while True:
+                rows = conn.execute(sql, [last_id] + params).fetchall()
+                for row_id, kind, data, created_at in rows:
+                    yield {'id': row_id, 'kind': kind, 'createdAt': created_at, 'data': json.loads(data)}
+                if len(rows) < batch_size:
+                    return
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name='registration-writer', daemon=True)
+                self._writer.start()
+
+    def _run_writer(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._commit(conn, batch)
+
+    def _commit(self, conn: sqlite3.Connection, batch):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for pending in batch:
+                cursor = conn.execute(INSERT_SQL, pending.params)
+                if cursor.rowcount == 1:
+                    pending.row_id = cursor.lastrowid
+                else:
+                    kind, email = pending.params[:2]
+                    taken = conn.execute(EMAIL_TAKEN_SQL, (kind, email)).fetchone()
+                    pending.error = DuplicateRegistration('email' if taken else 'name')
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            print(f"Registration store error: {e}")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for pending in batch:
+                pending.row_id = None
+                pending.error = RegistrationStoreError(str(e))
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+def _matches(registration: Dict, filters: Dict[str, Optional[str]]) -> bool:
+    """READ_FILTERS semantics for a registration read outside SQLite"""
+    data = registration['data']
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name == 'kind':
+            ok = registration['kind'] == value
+        elif name == 'since':
+            ok = registration['createdAt'] >= value
+        elif name == 'until':
+            ok = registration['createdAt'] <= value
+        else:
+            field = 'sponsorshipLevel' if name == 'sponsorship_level' else 'playingPosition'
+            ok = str(data.get(field, '')).strip().lower() == value.strip().lower()
+        if not ok:
+            return False
+    return True
+
+class StateRegistrationStore:
+    """
+    Registrations in the shared state store, for deployments without a
+    persistent disk. Ids come from one counter; the email and name keys
+    are claimed with add (SET NX), so duplicates are refused atomically
+    across instances; each row is one key, read back in id order.
+    """
+
+    def __init__(self, store: StateStore, prefix: str = 'registration:'):
+        self.store = store
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return self.prefix + ':'.join(str(part) for part in parts)
+
+    def register(self, kind: str, data: dict) -> int:
+        email, name_key = registration_keys(kind, data)
+        row = json.dumps({'kind': kind, 'createdAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                          'data': data})
+        claims = [self._key('email', kind, email)] + ([self._key('name', kind, name_key)] if name_key else [])
+        try:
+            row_id, _ = self.store.incr(self._key('last-id'), None)
+            claimed = self.store.pipeline([('add', key, row_id, None) for key in claims])
+            if not all(claimed):
+                # Give back whichever key this attempt did get
+                self.store.pipeline([('delete', key) for key, ok in zip(claims, claimed) if ok])
+                raise DuplicateRegistration('email' if not claimed[0] else 'name')
+            try:
+                self.store.set(self._key('row', row_id), row)
+            except StateStoreError:
+                self.store.pipeline([('delete', key) for key in claims])
+                raise
+        except StateStoreError as e:
+            print(f"Registration store error: {e}")
+            raise RegistrationStoreError(str(e))
+        return row_id
+
+    def iter_registrations(self, batch_size: int = READ_BATCH, after_id: int = 0, **filters) -> Iterator[Dict]:
+        """
+        Same contract as RegistrationStore.iter_registrations. Ids of
+        refused duplicates have no row and are skipped, as is a row still
+        being written when the read passes its id.
+        """
+        for name in filters:
+            if name not in READ_FILTERS:
+                raise KeyError(name)
+        try:
+            last_id = int(self.store.get(self._key('last-id'))[0] or 0)
+            for start in range(after_id + 1, last_id + 1, batch_size):
+                ids = range(start, min(start + batch_size, last_id + 1))
+                values = self.store.pipeline([('get', self._key('row', row_id)) for row_id in ids])
+                for row_id, (value, _) in zip(ids, values):
+                    if value is None:
+                        continue
+                    registration = dict(json.loads(value), id=row_id)
+                    if _matches(registration, filters):
+                        yield {'id': row_id, 'kind': registration['kind'],
+                               'createdAt': registration['createdAt'], 'data': registration['data']}
+        except StateStoreError as e:
+            raise RegistrationStoreError(str(e))
+
+_store: Optional[Union[RegistrationStore, StateRegistrationStore]] = None
+_store_lock = threading.Lock()
+
+def registration_backend() -> str:
+    """'sqlite' or 'state' (REGISTRATION_BACKEND, else by deployment)"""
+    backend = os.getenv('REGISTRATION_BACKEND', '').lower()
+    if backend:
+        return backend
+    if os.getenv('VERCEL') and not os.getenv('REGISTRATION_DB_PATH'):
+        return 'state'
+    return 'sqlite'
+
+def get_registration_store() -> Union[RegistrationStore, StateRegistrationStore]:
+    """
+    The process-wide registration store. Raises RegistrationStoreError
+    when there is nowhere durable to keep registrations (serverless without
+    REGISTRATION_DB_PATH or a shared state backend).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if registration_backend() == 'state':
+                if os.getenv('STATE_BACKEND', 'memory').lower() != 'redis':
+                    raise RegistrationStoreError('No durable registration store: set STATE_BACKEND=redis '
+                                                 'or REGISTRATION_DB_PATH')
+                _store = StateRegistrationStore(get_store())
+            else:
+                _store = RegistrationStore()
+        return _store
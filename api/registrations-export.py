@@ -0,0 +1,36 @@
+import time
+
+from admin_auth import require_admin
+from http_core import Endpoint, HTTPError, Response, make_handler
+from registration_export import FORMATS, ExportRequestError, export
+from registration_store import RegistrationStoreError, get_registration_store
+
+def get(request):
+    require_admin(request)
+
+    query = request.query
+    fmt = query.get('format', 'csv')
+    kind = query.get('type')
+    view = query.get('view', 'registrations')
+    try:
+        store = get_registration_store()
+    except RegistrationStoreError as e:
+        raise HTTPError(503, str(e))
+    try:
+        body = export(
+            store, fmt,
+            kind=None if kind in (None, '', 'all') else kind, view=view,
+            since=query.get('from'), until=query.get('to'),
+            sponsorship_level=query.get('level'), playing_position=query.get('position'))
+    except ExportRequestError as e:
+        raise HTTPError(400, str(e))
+
+    # Rows are read and encoded as the response is written (chunked)
+    filename = f"onam-{view if view == 'members' else kind or 'registrations'}-{time.strftime('%Y%m%d')}.{fmt}"
+    return Response(200, body, [('Content-Type', FORMATS[fmt]),
+                                ('Content-Disposition', f'attachment; filename="{filename}"'),
+                                ('Cache-Control', 'no-store')])
+
+endpoint = Endpoint('registrations-export', {'GET': get}, allow_headers='Content-Type, Authorization',
+                    expose_headers='Content-Disposition', error_message='Export failed')
+handler = make_handler(endpoint)
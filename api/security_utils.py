@@ -1,12 +1,23 @@
-import time
 import hashlib
-import re
-from typing import Dict, Tuple
+import math
+import time
+from typing import Optional, Tuple
+
+from state_store import StateStoreError, get_store
 
-# In-memory storage for rate limiting (resets on function restart)
-rate_limit_store = {}
-session_store = {}
-email_store = {}
+# Limits are (max requests, window seconds), enforced as sliding windows.
+# Each counter is kept in fixed buckets one window long, and a request is
+# weighed against this bucket's count plus the previous bucket's count
+# scaled by how much of it still falls inside the window. A fixed window
+# would let a client send the limit at the end of one window and again at
+# the start of the next; the sliding estimate doesn't.
+ENDPOINT_LIMIT = (1, 60)        # 1 per minute per endpoint
+SESSION_LIMIT = (5, 3600)       # 5 registrations per client per hour
+LOGIN_LIMIT = (5, 900)          # 5 failed admin logins per client per 15 minutes
+
+# Counters live in the shared state store (STATE_BACKEND), so limits hold
+# across instances instead of resetting per process. Duplicate emails are
+# caught by the registration store's unique indexes.
 
 def get_client_id(headers) -> str:
     """Create unique client identifier from IP and User-Agent"""
@@ -15,94 +26,116 @@ def get_client_id(headers) -> str:
     client_string = f"{ip}:{user_agent}"
     return hashlib.md5(client_string.encode()).hexdigest()[:16]
 
-def is_rate_limited(client_id: str, endpoint: str) -> Tuple[bool, str]:
+def _buckets(key: str, window: float, now: Optional[float] = None) -> Tuple[str, str, float]:
+    """This bucket's key, the previous bucket's key, and how far into this bucket we are (0-1)"""
+    bucket, offset = divmod(time.time() if now is None else now, window)
+    return f"{key}:{int(bucket)}", f"{key}:{int(bucket) - 1}", offset / window
+
+def _retry_after(previous: int, current: int, limit: int, window: float, elapsed: float) -> int:
+    """Seconds until one more request fits under the sliding-window limit"""
+    room = limit - 1 - current
+    if room >= 0:
+        # Fits in this bucket once enough of the previous one has aged out
+        wait = max(0.0, min(1.0, 1 - room / previous) - elapsed) if previous else 0.0
+    else:
+        # Only in the next bucket, where this one is the part aging out
+        wait = 1 - elapsed + max(0.0, 1 - (limit - 1) / current)
+    return max(1, math.ceil(round(wait * window, 6)))
+
+def _count(value) -> int:
+    return int(value) if value is not None else 0
+
+def _registration_buckets(client_id: str, endpoint: str, now: Optional[float]):
+    return (_buckets(f"rl:{client_id}:{endpoint}", ENDPOINT_LIMIT[1], now),
+            _buckets(f"session:{client_id}", SESSION_LIMIT[1], now))
+
+def _take_back(current: str, session_current: str):
+    try:
+        get_store().pipeline([('incr', current, 2 * ENDPOINT_LIMIT[1], -1),
+                              ('incr', session_current, 2 * SESSION_LIMIT[1], -1)])
+    except StateStoreError as e:
+        print(f"Rate limit store error: {e}")
+
+def is_rate_limited(client_id: str, endpoint: str, now: Optional[float] = None) -> Tuple[bool, str]:
     """
-    Check rate limits:
-    - Max 1 request per minute per endpoint
+    Count a registration attempt and check it against the limits:
+    - Max ENDPOINT_LIMIT requests per endpoint (1 per minute)
     - Max 5 total registrations per session
+    The decision uses the counts returned by the increment itself, so
+    concurrent requests can't all pass before any of them is recorded.
+    Attempts that are turned away are taken back off the counters.
     """
-    now = time.time()
-    
-    # Clean old entries (older than 1 hour)
-    cleanup_old_entries(now)
-    
-    # Check per-endpoint rate limit (1 per minute)
-    endpoint_key = f"{client_id}:{endpoint}"
-    if endpoint_key in rate_limit_store:
-        time_diff = now - rate_limit_store[endpoint_key]
-        if time_diff < 60:  # 1 minute
-            return True, f"Please wait {60 - int(time_diff)} seconds before submitting again"
-    
+    limit, window = ENDPOINT_LIMIT
+    session_limit, session_window = SESSION_LIMIT
+    (current, previous, elapsed), (session_current, session_previous, session_elapsed) = \
+        _registration_buckets(client_id, endpoint, now)
+    try:
+        (count, _), (before, _), (session_count, _), (session_before, _) = get_store().pipeline([
+            ('incr', current, 2 * window),
+            ('get', previous),
+            ('incr', session_current, 2 * session_window),
+            ('get', session_previous),
+        ])
+    except StateStoreError as e:
+        # Fail open: a state backend outage shouldn't block registrations
+        print(f"Rate limit store error: {e}")
+        return False, ""
+    before, session_before = _count(before), _count(session_before)
+    over_endpoint = before * (1 - elapsed) + count > limit
+    over_session = session_before * (1 - session_elapsed) + session_count > session_limit
+    if not (over_endpoint or over_session):
+        return False, ""
+
+    _take_back(current, session_current)
+
+    # Check per-endpoint window counter
+    if over_endpoint:
+        wait = _retry_after(before, count - 1, limit, window, elapsed)
+        return True, f"Please wait {wait} seconds before submitting again"
+
     # Check session limit (5 total registrations)
-    if client_id in session_store:
-        if session_store[client_id]['count'] >= 5:
-            return True, "Maximum 5 registrations allowed per session. Please refresh and try later."
-    
-    return False, ""
-
-def record_request(client_id: str, endpoint: str, email: str) -> bool:
-    """Record successful request"""
-    now = time.time()
-    
-    # Check if email already registered today
-    email_key = email.lower().strip()
-    if email_key in email_store:
-        time_diff = now - email_store[email_key]
-        if time_diff < 86400:  # 24 hours
-            return False
-    
-    # Record request
-    rate_limit_store[f"{client_id}:{endpoint}"] = now
-    email_store[email_key] = now
-    
-    # Update session count
-    if client_id not in session_store:
-        session_store[client_id] = {'count': 0, 'first_request': now}
-    session_store[client_id]['count'] += 1
-    
-    return True
-
-def cleanup_old_entries(now: float):
-    """Clean entries older than 1 hour"""
-    cutoff = now - 3600  # 1 hour
-    
-    # Clean rate limit store
-    to_remove = [k for k, v in rate_limit_store.items() if v < cutoff]
-    for k in to_remove:
-        del rate_limit_store[k]
-    
-    # Clean session store
-    to_remove = [k for k, v in session_store.items() if v['first_request'] < cutoff]
-    for k in to_remove:
-        del session_store[k]
-
-def validate_input(data: dict, required_fields: list) -> Tuple[bool, str]:
-    """Validate input data"""
-    # Check required fields
-    for field in required_fields:
-        if not data.get(field) or not data[field].strip():
-            return False, f"{field} is required"
-    
-    # Validate email format
-    email = data.get('email', '').strip()
-    if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-        return False, "Invalid email format"
-    
-    # Validate phone number (basic)
-    phone = data.get('contactNumber', '').strip()
-    if not re.match(r'^[\d\s\+\-\(\)]{10,15}$', phone):
-        return False, "Invalid phone number format"
-    
-    # Check field lengths
-    if len(data.get('fullName', '')) > 100:
-        return False, "Name too long (max 100 characters)"
-    
-    # Basic XSS prevention
-    dangerous_chars = ['<', '>', 'script', 'javascript:', 'on']
-    for field, value in data.items():
-        if isinstance(value, str):
-            value_lower = value.lower()
-            if any(char in value_lower for char in dangerous_chars):
-                return False, "Invalid characters detected"
-    
-    return True, ""
+    return True, "Maximum 5 registrations allowed per session. Please refresh and try later."
+
+def refund_rate_limit(client_id: str, endpoint: str, now: float):
+    """
+    Take back an attempt that is_rate_limited(client_id, endpoint, now) let
+    through but that wasn't accepted (a duplicate, or neither stored nor
+    emailed), so only accepted registrations count against the limits.
+    `now` must be the same timestamp, so the refund lands in the buckets
+    that were counted.
+    """
+    (current, _, _), (session_current, _, _) = _registration_buckets(client_id, endpoint, now)
+    _take_back(current, session_current)
+
+def is_login_throttled(client_id: str, now: Optional[float] = None) -> Tuple[bool, str]:
+    """
+    Count an admin login attempt and check it against LOGIN_LIMIT. As in
+    is_rate_limited, the decision uses the count returned by the increment,
+    so parallel guesses can't all pass before any of them is recorded.
+    Throttled attempts are taken back off the counter and a successful
+    login clears it, so what it holds is the failed attempts.
+    """
+    limit, window = LOGIN_LIMIT
+    current, previous, elapsed = _buckets(f"login:{client_id}", window, now)
+    try:
+        (count, _), (before, _) = get_store().pipeline([('incr', current, 2 * window),
+                                                        ('get', previous)])
+    except StateStoreError as e:
+        print(f"Rate limit store error: {e}")
+        return False, ""
+    before = _count(before)
+    if before * (1 - elapsed) + count <= limit:
+        return False, ""
+    try:
+        get_store().incr(current, 2 * window, -1)
+    except StateStoreError as e:
+        print(f"Rate limit store error: {e}")
+    wait = _retry_after(before, count - 1, limit, window, elapsed)
+    return True, f"Too many login attempts. Please wait {wait} seconds"
+
+def clear_failed_logins(client_id: str):
+    current, previous, _ = _buckets(f"login:{client_id}", LOGIN_LIMIT[1])
+    try:
+        get_store().pipeline([('delete', current), ('delete', previous)])
+    except StateStoreError as e:
+        print(f"Rate limit store error: {e}")
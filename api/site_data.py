@@ -0,0 +1,26 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+# Site configuration kept in JSON files under api/data (or overridden by
+# path), so changing the gallery categories is a data edit, not a code change.
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CATEGORIES_FILE = os.getenv('GALLERY_CATEGORIES_FILE', os.path.join(DATA_DIR, 'gallery-categories.json'))
+
+def load_data(path: str):
+    """Read a JSON data file (relative paths resolve against api/data)"""
+    with open(os.path.join(DATA_DIR, path), encoding='utf-8') as f:
+        return json.load(f)
+
+@lru_cache(maxsize=None)
+def gallery_categories() -> List[dict]:
+    """[{'value': 'tournament', 'label': 'Tournament', 'tags': [...]}, ...] in display order"""
+    return load_data(CATEGORIES_FILE)['categories']
+
+def category_values() -> List[str]:
+    return [category['value'] for category in gallery_categories()]
+
+@lru_cache(maxsize=None)
+def categories_by_value() -> Dict[str, dict]:
+    return {category['value']: category for category in gallery_categories()}
@@ -0,0 +1,153 @@
+import os
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Authenticated SMTP sessions kept alive across invocations in a warm process
+IDLE_CHECK_SECONDS = 10  # NOOP idle sessions older than this before reuse
+MAX_IDLE_SECONDS = 240   # SES drops idle sessions after a few minutes
+
+_ssl_context = None
+_pools: Dict[Tuple, 'SMTPPool'] = {}
+_pools_lock = threading.Lock()
+
+def _get_ssl_context() -> ssl.SSLContext:
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+class SMTPPool:
+    """Small pool of logged-in SMTP sessions with NOOP health checks"""
+
+    def __init__(self, host: str, port: int, username: str, password: str,
+                 size: int = 2, starttls: bool = True, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls(context=_get_ssl_context())
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_healthy(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self) -> smtplib.SMTP:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            idle_for = now - last_used
+            if idle_for > MAX_IDLE_SECONDS:
+                self._close(server)
+            elif idle_for < IDLE_CHECK_SECONDS or self._is_healthy(server):
+                return server
+            else:
+                self._close(server)
+        return self._connect()
+
+    def _checkin(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in session; broken sessions are discarded"""
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout()
+            yield server
+        except Exception:
+            if server is not None:
+                self._close(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                self._checkin(server)
+            self._slots.release()
+
+    def send_batch(self, messages: List[Tuple[str, List[str], str]]) -> List[Optional[Exception]]:
+        """
+        Send several (from, to, message) tuples over one session.
+        Returns one entry per message: None on success, the exception otherwise.
+        A dropped session is reconnected once and the batch resumed.
+        """
+        results: List[Optional[Exception]] = [None] * len(messages)
+        index = 0
+        reconnected = False
+        while index < len(messages):
+            try:
+                with self.connection() as server:
+                    while index < len(messages):
+                        sender, recipients, body = messages[index]
+                        try:
+                            server.sendmail(sender, recipients, body)
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                                smtplib.SMTPDataError) as e:
+                            # Message-level rejection: the session itself is still usable
+                            results[index] = e
+                        index += 1
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                if reconnected:
+                    for i in range(index, len(messages)):
+                        results[i] = e
+                    break
+                reconnected = True
+        return results
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+def get_pool(host: str, port: int, username: str, password: str) -> SMTPPool:
+    """Return the process-wide pool for these SMTP settings"""
+    key = (host, port, username, password)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPPool(
+                host, port, username, password,
+                size=int(os.getenv('SMTP_POOL_SIZE', 2)),
+                starttls=os.getenv('SES_SMTP_STARTTLS', '1') != '0',
+            )
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,399 @@
+import heapq
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+# Shared state for rate limiting and dedup.
+#
+# Every backend executes a list of operations in one atomic call (one lock,
+# one SQLite transaction or one Redis MULTI/EXEC sent in one round trip):
+#   ('get', key)                -> (value as str or None, seconds left or None)
+#   ('incr', key, ttl[, by])    -> (new count, seconds left); new counters live ttl seconds
+#   ('add', key, value, ttl)    -> True if the key was absent and is now set
+#   ('set', key, value, ttl)    -> None
+#   ('delete', key)             -> None
+# A ttl of None means the key never expires.
+
+MAX_TRACKED_KEYS = 100000
+PURGE_BUDGET = 64  # expired entries dropped per call at most
+
+class StateStoreError(Exception):
+    pass
+
+class ExpiringStore:
+    """
+    Dict with a TTL per key. Expiry times are kept in a min-heap, so cleanup
+    only touches entries that have actually expired and costs O(log n) each.
+    """
+
+    def __init__(self, max_entries: int = MAX_TRACKED_KEYS):
+        self.max_entries = max_entries
+        self._data: Dict[str, list] = {}  # key -> [value, expires_at]
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str, now: float) -> Tuple[Optional[Any], float]:
+        """Return (value, seconds left) or (None, 0) if absent or expired"""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= now:
+            return None, 0.0
+        return entry[0], entry[1] - now
+
+    def set(self, key: str, value: Any, ttl: Optional[float], now: float):
+        expires_at = float('inf') if ttl is None else now + ttl
+        self._data[key] = [value, expires_at]
+        self._push(expires_at, key)
+
+    def incr(self, key: str, ttl: Optional[float], now: float, by: int = 1) -> Tuple[int, float]:
+        """Add `by` to a counter; a new counter lives for ttl seconds"""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= now:
+            self.set(key, by, ttl, now)
+            return by, float('inf') if ttl is None else ttl
+        entry[0] = int(entry[0]) + by  # set() may have stored it as a string
+        return entry[0], entry[1] - now
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def purge(self, now: float, budget: int = PURGE_BUDGET) -> int:
+        """Drop up to `budget` expired entries, earliest first"""
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now and removed < budget:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            # Heap entries go stale when a key is re-set; only the live one counts
+            if entry is not None and entry[1] == expires_at:
+                del self._data[key]
+                removed += 1
+        return removed
+
+    def _push(self, expires_at: float, key: str):
+        heapq.heappush(self._heap, (expires_at, key))
+        if len(self._data) > self.max_entries:
+            self._evict()
+        if len(self._heap) > 2 * len(self._data) + 64:
+            # Too many stale heap entries: rebuild from live data
+            self._heap = [(entry[1], k) for k, entry in self._data.items()]
+            heapq.heapify(self._heap)
+
+    def _evict(self):
+        # Over capacity: drop whichever live entries expire soonest
+        while len(self._data) > self.max_entries and self._heap:
+            expires_at, key = heapq.heappop(self._heap)
+            entry = self._data.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._data[key]
+
+class StateStore:
+    """Base interface; subclasses implement pipeline()"""
+
+    shared = True  # seen by every instance, not just this process
+
+    def pipeline(self, ops: List[tuple]) -> List[Any]:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        return self.pipeline([('get', key)])[0]
+
+    def incr(self, key: str, ttl: Optional[float], by: int = 1) -> Tuple[int, Optional[float]]:
+        return self.pipeline([('incr', key, ttl, by)])[0]
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return self.pipeline([('add', key, value, ttl)])[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.pipeline([('set', key, value, ttl)])
+
+    def delete(self, key: str):
+        self.pipeline([('delete', key)])
+
+class MemoryStore(StateStore):
+    """Process-local store (resets on function restart)"""
+
+    shared = False
+
+    def __init__(self, max_entries: int = MAX_TRACKED_KEYS):
+        self._store = ExpiringStore(max_entries)
+        self._lock = threading.Lock()
+
+    def pipeline(self, ops: List[tuple]) -> List[Any]:
+        results = []
+        with self._lock:
+            now = time.time()
+            self._store.purge(now)
+            for op in ops:
+                kind, key = op[0], op[1]
+                if kind == 'get':
+                    value, remaining = self._store.get(key, now)
+                    if value is None:
+                        results.append((None, None))
+                    else:
+                        results.append((str(value), None if remaining == float('inf') else remaining))
+                elif kind == 'incr':
+                    count, remaining = self._store.incr(key, op[2], now, op[3] if len(op) > 3 else 1)
+                    results.append((count, None if remaining == float('inf') else remaining))
+                elif kind == 'add':
+                    if self._store.get(key, now)[0] is not None:
+                        results.append(False)
+                    else:
+                        self._store.set(key, op[2], op[3], now)
+                        results.append(True)
+                elif kind == 'set':
+                    self._store.set(key, op[2], op[3], now)
+                    results.append(None)
+                elif kind == 'delete':
+                    self._store.delete(key)
+                    results.append(None)
+                else:
+                    raise StateStoreError(f"Unknown operation: {kind}")
+        return results
+
+class SQLiteStore(StateStore):
+    """File-backed store in WAL mode, shared by every process on one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value, expires_at REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS state_expiry ON state (expires_at)')
+            self._local.conn = conn
+        return conn
+
+    def pipeline(self, ops: List[tuple]) -> List[Any]:
+        conn = self._conn()
+        now = time.time()
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'DELETE FROM state WHERE key IN '
+                    '(SELECT key FROM state WHERE expires_at <= ? LIMIT ?)',
+                    (now, PURGE_BUDGET)
+                )
+                for op in ops:
+                    results.append(self._apply(conn, op, now))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            raise StateStoreError(str(e)) from e
+        return results
+
+    @staticmethod
+    def _live(conn, key, now):
+        return conn.execute(
+            'SELECT value, expires_at FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, now)
+        ).fetchone()
+
+    def _apply(self, conn, op, now):
+        kind, key = op[0], op[1]
+        if kind == 'get':
+            row = self._live(conn, key, now)
+            if row is None:
+                return None, None
+            return str(row[0]), None if row[1] is None else row[1] - now
+        if kind == 'incr':
+            by = op[3] if len(op) > 3 else 1
+            row = self._live(conn, key, now)
+            if row is None:
+                expires_at = None if op[2] is None else now + op[2]
+                conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?, ?)', (key, by, expires_at))
+                return by, op[2]
+            conn.execute('UPDATE state SET value = value + ? WHERE key = ?', (by, key))
+            return int(row[0]) + by, None if row[1] is None else row[1] - now
+        if kind in ('add', 'set'):
+            if kind == 'add' and self._live(conn, key, now) is not None:
+                return False
+            expires_at = None if op[3] is None else now + op[3]
+            conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?, ?)', (key, op[2], expires_at))
+            return True if kind == 'add' else None
+        if kind == 'delete':
+            conn.execute('DELETE FROM state WHERE key = ?', (key,))
+            return None
+        raise StateStoreError(f"Unknown operation: {kind}")
+
+class RedisStore(StateStore):
+    """
+    Minimal Redis-protocol (RESP) client. A whole pipeline is one MULTI/EXEC
+    transaction, written in one send and read back together, so a check costs
+    one round trip and no other client's command runs in the middle of it.
+    """
+
+    def __init__(self, url: str, prefix: str = 'onam:', timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.use_tls = parsed.scheme == 'rediss'
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            if self.use_tls:
+                import ssl
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+            setup = []
+            if self.password:
+                setup.append(['AUTH', self.username, self.password] if self.username else ['AUTH', self.password])
+            if self.db:
+                setup.append(['SELECT', str(self.db)])
+            if setup:
+                self._roundtrip(setup)
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[0].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _encode(commands: List[List[Any]]) -> bytes:
+        out = []
+        for command in commands:
+            out.append(b'*%d\r\n' % len(command))
+            for arg in command:
+                data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+                out.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(out)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise StateStoreError('Connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            return StateStoreError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b'*':
+            count = int(payload)
+            return None if count < 0 else [self._read_reply(reader) for _ in range(count)]
+        raise StateStoreError(f"Unexpected reply: {line!r}")
+
+    def _roundtrip(self, commands: List[List[Any]]) -> List[Any]:
+        try:
+            sock, reader = self._connection()
+            sock.sendall(self._encode(commands))
+            replies = [self._read_reply(reader) for _ in commands]
+        except (OSError, StateStoreError) as e:
+            self._drop()
+            raise StateStoreError(str(e)) from e
+        for reply in replies:
+            if isinstance(reply, StateStoreError):
+                raise reply
+        return replies
+
+    def pipeline(self, ops: List[tuple]) -> List[Any]:
+        commands = []
+        for op in ops:
+            kind, key = op[0], self.prefix + op[1]
+            if kind == 'get':
+                commands += [['GET', key], ['PTTL', key]]
+            elif kind == 'incr':
+                # SET NX creates the counter with its TTL; INCRBY keeps the TTL.
+                # Inside the transaction the key can't expire in between, which
+                # would leave INCRBY to recreate it without one.
+                if op[2] is None:
+                    commands.append(['SET', key, 0, 'NX'])
+                else:
+                    commands.append(['SET', key, 0, 'NX', 'PX', int(op[2] * 1000)])
+                commands += [['INCRBY', key, op[3] if len(op) > 3 else 1], ['PTTL', key]]
+            elif kind in ('add', 'set'):
+                command = ['SET', key, op[2]]
+                if op[3] is not None:
+                    command += ['PX', int(op[3] * 1000)]
+                if kind == 'add':
+                    command.append('NX')
+                commands.append(command)
+            elif kind == 'delete':
+                commands.append(['DEL', key])
+            else:
+                raise StateStoreError(f"Unknown operation: {kind}")
+
+        replies = self._roundtrip([['MULTI']] + commands + [['EXEC']])[-1]
+        if replies is None:
+            raise StateStoreError('Transaction aborted')
+        for reply in replies:
+            if isinstance(reply, StateStoreError):
+                raise reply
+        replies = iter(replies)
+        results = []
+        for op in ops:
+            kind = op[0]
+            if kind == 'get':
+                value, pttl = next(replies), next(replies)
+                results.append((value, pttl / 1000 if pttl >= 0 else None))
+            elif kind == 'incr':
+                next(replies)
+                count, pttl = next(replies), next(replies)
+                results.append((count, pttl / 1000 if pttl >= 0 else None))
+            elif kind == 'add':
+                results.append(next(replies) == 'OK')
+            else:
+                next(replies)
+                results.append(None)
+        return results
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def create_store(backend: Optional[str] = None) -> StateStore:
+    """Build a store from STATE_BACKEND (memory, sqlite or redis)"""
+    backend = (backend or os.getenv('STATE_BACKEND', 'memory')).lower()
+    if backend == 'sqlite':
+        return SQLiteStore(os.getenv('STATE_SQLITE_PATH', '/tmp/onam-state.db'))
+    if backend == 'redis':
+        return RedisStore(
+            os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+            prefix=os.getenv('STATE_KEY_PREFIX', 'onam:'),
+        )
+    return MemoryStore()
+
+def get_store() -> StateStore:
+    """Process-wide store, created on first use"""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = create_store()
+    return _default_store
@@ -0,0 +1,64 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+
+from http_core import Endpoint, Request, Response, etag_matches, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Constant or rarely-changing payloads (gallery categories, option lists):
+# serialized once at import, precompressed with gzip and (when the brotli
+# package is installed) brotli, and served with a content-hash ETag so
+# clients revalidate with a 304 instead of re-downloading.
+#
+# The URLs aren't versioned, so browsers keep a copy for max_age and then
+# revalidate; shared caches (the Vercel CDN, purged on every deploy) keep it
+# for s_maxage.
+DEFAULT_MAX_AGE = 3600
+DEFAULT_S_MAXAGE = 86400 * 30
+
+class StaticPayload:
+    def __init__(self, payload, content_type: str = 'application/json',
+                 max_age: int = DEFAULT_MAX_AGE, s_maxage: int = DEFAULT_S_MAXAGE):
+        if isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self.content_type = content_type
+        # Weak: every coding is sent with it, and their bytes differ
+        self.etag = 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.cache_control = f"public, max-age={max_age}, s-maxage={s_maxage}, stale-while-revalidate={max_age}"
+
+        # Preference order for negotiation; a coding that doesn't shrink the
+        # body isn't worth the client's decode
+        self.bodies: Dict[str, bytes] = {}
+        if brotli is not None:
+            self._add('br', brotli.compress(body, quality=11), body)
+        self._add('gzip', gzip.compress(body, compresslevel=9, mtime=0), body)
+        self.bodies['identity'] = body
+
+    def _add(self, coding: str, compressed: bytes, body: bytes):
+        if len(compressed) < len(body):
+            self.bodies[coding] = compressed
+
+    def respond(self, request: Request) -> Response:
+        headers = [('ETag', self.etag), ('Cache-Control', self.cache_control), ('Vary', 'Accept-Encoding')]
+        if etag_matches(request, self.etag):
+            return Response(304, b'', headers)
+        coding = negotiate_encoding(request, self.bodies)
+        headers.append(('Content-Type', self.content_type))
+        if coding != 'identity':
+            headers.append(('Content-Encoding', coding))
+        return Response(200, self.bodies[coding], headers)
+
+def static_endpoint(name: str, payload, **options) -> Endpoint:
+    """GET-only Endpoint serving one StaticPayload"""
+    static = StaticPayload(payload, **options)
+    endpoint = Endpoint(name, {'GET': static.respond}, allow_headers='Content-Type, If-None-Match',
+                        expose_headers='ETag')
+    endpoint.payload = static
+    return endpoint
@@ -0,0 +1,66 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+# Sanitized request traces for offline load replay (tools/replay.py).
+# Enabled by TRAFFIC_CAPTURE_PATH; each request appends one JSON line with
+# the endpoint, timing and body size. The values get_client_id() reads (IP,
+# User-Agent) and the registration email are kept only as salted
+# pseudonyms: the same client or email maps to the same token within one
+# capture, so replay reproduces rate limiting and duplicates, but tokens
+# can't be reversed or linked across captures.
+CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH')
+QUERY_KEYS = ('limit',)  # query parameters worth keeping; cursors etc. are dropped
+
+_salt = os.urandom(16)
+_lock = threading.Lock()
+_file = None
+
+def enabled() -> bool:
+    return bool(CAPTURE_PATH)
+
+def pseudonym(value: str) -> str:
+    return hmac.new(_salt, value.encode('utf-8'), hashlib.sha256).hexdigest()[:12]
+
+def _email_token(data: Optional[dict]) -> Optional[str]:
+    if not isinstance(data, dict):
+        return None
+    email = data.get('email') or data.get('captainEmail')
+    return pseudonym(email.strip().lower()) if isinstance(email, str) and email.strip() else None
+
+def _body_size(headers) -> Optional[int]:
+    try:
+        return int(headers.get('Content-Length'))
+    except (TypeError, ValueError):
+        return None  # chunked or malformed
+
+def record(endpoint: str, request, status: int, duration_ms: float):
+    """Append one sanitized trace line (no-op unless capture is enabled)"""
+    global _file
+    if not CAPTURE_PATH:
+        return
+    headers = request.headers
+    entry = {
+        'ts': round(time.time(), 4),
+        'endpoint': endpoint,
+        'method': request.method,
+        'query': {k: v for k, v in request.query.items() if k in QUERY_KEYS},
+        'ip': pseudonym(headers.get('x-forwarded-for', '').split(',')[0].strip()),
+        'ua': pseudonym(headers.get('user-agent', '')),
+        'body_size': _body_size(headers),
+        'email': _email_token(request.data),
+        'status': status,
+        'duration_ms': round(duration_ms, 3),
+    }
+    line = json.dumps(entry, separators=(',', ':')) + '\n'
+    try:
+        with _lock:
+            if _file is None:
+                _file = open(CAPTURE_PATH, 'a', buffering=1)
+            _file.write(line)
+    except (OSError, ValueError) as e:
+        print(f"Traffic capture error: {e}")
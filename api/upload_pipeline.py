@@ -0,0 +1,372 @@
+import hashlib
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from typing import Dict, Iterator, Optional
+
+import gallery_index
+from http_core import HTTPError
+import image_variants
+import photo_hash
+from photo_storage import PHOTO_PREFIX
+from site_data import category_values
+from state_store import get_store
+
+# Streaming photo uploads. The request body (Request.iter_body) is passed
+# straight through to storage in CHUNK_SIZE pieces while a SHA-256 is
+# computed, so a photo is never held in memory whole and duplicates are
+# caught without a second pass.
+#
+# Resumable uploads are staged in STAGING_DIR on the instance's own disk,
+# so every chunk of one upload has to reach the same instance. That holds
+# for server.py and any single-instance deployment. Behind a load balancer
+# that spreads requests (Vercel), a chunk landing on another instance gets
+# a 409 with offset 0 and the client has to start over; use multipart
+# uploads there.
+CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv('GALLERY_MAX_UPLOAD_BYTES', 15 * 1024 * 1024))
+STAGING_DIR = os.getenv('UPLOAD_STAGING_DIR', '/tmp/onam-uploads')
+MAX_FIELD_BYTES = 4096
+
+ALLOWED_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'image/heic': '.heic',
+}
+EXTENSION_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+                   '.webp': 'image/webp', '.gif': 'image/gif', '.heic': 'image/heic'}
+CATEGORIES = category_values()
+
+_upload_id_pattern = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+_slug_pattern = re.compile(r'[^a-z0-9]+')
+
+class MultipartPart:
+    def __init__(self, name: str, filename: Optional[str], content_type: str, data: Iterator[bytes]):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.data = data
+
+    def read_text(self, limit: int = MAX_FIELD_BYTES) -> str:
+        value = b''
+        for chunk in self.data:
+            value += chunk
+            if len(value) > limit:
+                raise HTTPError(400, f"Field {self.name} too long")
+        return value.decode('utf-8', 'replace')
+
+class MultipartReader:
+    """
+    Incremental multipart/form-data parser. Parts are yielded in order and
+    each part's body is itself an iterator, so file contents stream through.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], boundary: str):
+        self._chunks = chunks
+        self._buffer = b''
+        self._boundary = b'--' + boundary.encode('latin-1')
+        self._delimiter = b'\r\n' + self._boundary
+
+    def _fill(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buffer += chunk
+        return True
+
+    def _read_until(self, marker: bytes, limit: int) -> bytes:
+        while marker not in self._buffer:
+            if len(self._buffer) > limit or not self._fill():
+                raise HTTPError(400, 'Malformed multipart body')
+        head, self._buffer = self._buffer.split(marker, 1)
+        return head
+
+    def _part_body(self) -> Iterator[bytes]:
+        keep = len(self._delimiter) - 1
+        while True:
+            index = self._buffer.find(self._delimiter)
+            if index >= 0:
+                data, self._buffer = self._buffer[:index], self._buffer[index + len(self._delimiter):]
+                if data:
+                    yield data
+                return
+            # Hold back a tail that could be the start of the delimiter
+            if len(self._buffer) > keep:
+                data, self._buffer = self._buffer[:-keep], self._buffer[-keep:]
+                yield data
+            if not self._fill():
+                raise HTTPError(400, 'Unexpected end of upload')
+
+    def parts(self) -> Iterator[MultipartPart]:
+        self._read_until(self._boundary, 64 * 1024)  # preamble
+        while True:
+            while len(self._buffer) < 2 and self._fill():
+                pass
+            if self._buffer.startswith(b'--'):
+                # Closing boundary; read the epilogue so the connection can be reused
+                for _ in self._chunks:
+                    pass
+                return
+            raw_headers = self._read_until(b'\r\n\r\n', 16 * 1024)
+            headers = {}
+            for line in raw_headers.decode('utf-8', 'replace').split('\r\n'):
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    headers[key.strip().lower()] = value.strip()
+
+            disposition = headers.get('content-disposition', '')
+            name = re.search(r'\bname="([^"]*)"', disposition)
+            filename = re.search(r'\bfilename="([^"]*)"', disposition)
+            part = MultipartPart(
+                name.group(1) if name else '',
+                filename.group(1) if filename else None,
+                headers.get('content-type', 'application/octet-stream'),
+                self._part_body(),
+            )
+            yield part
+            for _ in part.data:  # skip whatever the caller didn't consume
+                pass
+
+class HashingStream:
+    """Pass chunks through while hashing and counting them (optionally teeing to a file)"""
+
+    def __init__(self, chunks: Iterator[bytes], tee=None):
+        self._chunks = chunks
+        self._tee = tee
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self.sha256.update(chunk)
+            self.size += len(chunk)
+            if self._tee is not None:
+                self._tee.write(chunk)
+            yield chunk
+
+def slugify(text: str) -> str:
+    return _slug_pattern.sub('-', text.lower()).strip('-')[:60] or 'photo'
+
+def resolve_content_type(filename: str, declared: str) -> str:
+    declared = (declared or '').split(';')[0].strip().lower()
+    if declared in ALLOWED_TYPES:
+        return declared
+    guessed = EXTENSION_TYPES.get(os.path.splitext(filename or '')[1].lower())
+    if guessed is None:
+        raise HTTPError(415, 'Only JPEG, PNG, WebP, GIF and HEIC photos can be uploaded')
+    return guessed
+
+def build_pathname(metadata: Dict[str, str], filename: str, content_type: str) -> str:
+    category = metadata.get('category', 'tournament').strip().lower()
+    if category not in CATEGORIES:
+        category = 'tournament'
+    stem = metadata.get('title', '').strip() or os.path.splitext(os.path.basename(filename or ''))[0]
+    return f"{PHOTO_PREFIX}{category}/{slugify(stem)}-{secrets.token_hex(3)}{ALLOWED_TYPES[content_type]}"
+
+def discard_photo(storage, blob: dict, pathname: str, digest: str):
+    """Undo a stored upload: the blob and its hash entries"""
+    get_store().pipeline([('delete', f"photo-sha256:{digest}"), ('delete', f"photo-path:{pathname}")])
+    photo_hash.forget([pathname])
+    storage.delete([blob])
+
+def check_similar(storage, blob: dict, pathname: str, digest: str, source_path: str):
+    """
+    Perceptual near-duplicate check for a stored photo. Returns the similar
+    photos (flag policy), or removes the upload again and raises a 409
+    (reject policy). The photo's hash is remembered once it's kept.
+    """
+    try:
+        value = photo_hash.dhash_file(source_path)
+        similar = photo_hash.find_similar(value, exclude=pathname)
+    except Exception as e:
+        # Not a decodable image for Pillow (e.g. HEIC) or index trouble: keep the upload
+        print(f"Photo hash error: {e}")
+        return []
+    if similar and photo_hash.DUPLICATE_POLICY == 'reject':
+        discard_photo(storage, blob, pathname, digest)
+        existing, distance = similar[0]
+        raise HTTPError(409, 'A very similar photo has already been uploaded',
+                          existing=existing, distance=distance)
+    photo_hash.remember(pathname, value)
+    return similar
+
+def store_photo(storage, chunks: Iterator[bytes], filename: str,
+                content_type: str, metadata: Dict[str, str],
+                source_path: Optional[str] = None) -> dict:
+    """
+    Stream one photo into storage and register its content hash.
+    A byte-identical photo that is already stored is removed again and
+    reported as a 409 with the existing pathname. When variants are enabled
+    the bytes are also teed to a spool file on disk (unless the caller already
+    has them in source_path) for the resize workers.
+    """
+    content_type = resolve_content_type(filename, content_type)
+    pathname = build_pathname(metadata, filename, content_type)
+    spool = None
+    if source_path is None and (image_variants.enabled() or photo_hash.enabled()):
+        os.makedirs(STAGING_DIR, exist_ok=True)
+        spool = tempfile.NamedTemporaryFile(dir=STAGING_DIR, suffix='.src', delete=False)
+        source_path = spool.name
+
+    try:
+        stream = HashingStream(chunks, spool)
+        blob = storage.put(pathname, iter(stream), content_type)
+        if spool is not None:
+            spool.close()
+        if stream.size == 0:
+            storage.delete([blob])
+            raise HTTPError(400, 'Empty file')
+
+        digest = stream.sha256.hexdigest()
+        store = get_store()
+        if not store.add(f"photo-sha256:{digest}", pathname):
+            existing, _ = store.get(f"photo-sha256:{digest}")
+            storage.delete([blob])
+            raise HTTPError(409, 'This photo has already been uploaded', existing=existing)
+        store.set(f"photo-path:{pathname}", digest)
+
+        similar = []
+        if source_path is not None and photo_hash.enabled():
+            similar = check_similar(storage, blob, pathname, digest, source_path)
+
+        srcset = {}
+        if source_path is not None and image_variants.enabled():
+            try:
+                srcset = image_variants.generate_variants(storage, pathname, source_path)
+            except Exception as e:
+                # The original is stored; missing variants just mean full-size images
+                print(f"Variant generation error: {e}")
+
+        # The photo only appears in the gallery once the manifest lists it
+        record = gallery_index.photo_record(
+            pathname, blob.get('url', ''), stream.size, time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+            srcset, title=metadata.get('title', '').strip(), description=metadata.get('description', '').strip())
+        try:
+            photo_id = gallery_index.record_changes(storage, add=[record]).find(pathname)['id']
+        except Exception as e:
+            print(f"Manifest update error: {e}")
+            discard_photo(storage, blob, pathname, digest)
+            raise HTTPError(503, 'The gallery is busy, please try again')
+    finally:
+        if spool is not None:
+            spool.close()
+            os.remove(spool.name)
+
+    return {
+        'id': photo_id,
+        'url': blob.get('url', ''),
+        'pathname': pathname,
+        'size': stream.size,
+        'sha256': digest,
+        'contentType': content_type,
+        'srcset': srcset,
+        'similar': [{'pathname': p, 'distance': d} for p, d in similar],
+    }
+
+def upload_multipart(storage, chunks: Iterator[bytes], content_type_header: str) -> dict:
+    """Handle a multipart/form-data upload with a `file` part and text fields"""
+    match = re.search(r'boundary="?([^";]+)"?', content_type_header)
+    if not match:
+        raise HTTPError(400, 'Missing multipart boundary')
+
+    metadata: Dict[str, str] = {}
+    result = None
+    for part in MultipartReader(chunks, match.group(1)).parts():
+        if part.filename is None:
+            metadata[part.name] = part.read_text()
+        elif result is None:
+            # Fields sent after the file can't affect its pathname anymore
+            result = store_photo(storage, part.data, part.filename, part.content_type, metadata)
+    if result is None:
+        raise HTTPError(400, 'No file provided')
+    result.update({
+        'title': metadata.get('title', ''),
+        'description': metadata.get('description', ''),
+        'category': result['pathname'][len(PHOTO_PREFIX):].split('/', 1)[0],
+    })
+    return result
+
+def _staging_paths(upload_id: str):
+    if not _upload_id_pattern.match(upload_id or ''):
+        raise HTTPError(400, 'Invalid Upload-Id')
+    base = os.path.join(STAGING_DIR, upload_id)
+    return base + '.part', base + '.json'
+
+def upload_offset(upload_id: str) -> int:
+    """Bytes received so far for a resumable upload (0 if unknown)"""
+    data_path, _ = _staging_paths(upload_id)
+    try:
+        return os.path.getsize(data_path)
+    except FileNotFoundError:
+        return 0
+
+def _iter_file(path: str) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def _discard_staging(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def upload_chunk(storage, chunks: Iterator[bytes], headers, metadata: Dict[str, str]) -> dict:
+    """
+    Resumable upload: each request appends the bytes at Upload-Offset to a
+    staging file on disk. A mismatched offset gets a 409 carrying the offset
+    to resume from. Once Upload-Length bytes are staged, the file is streamed
+    into storage like a normal upload.
+    """
+    upload_id = headers.get('Upload-Id') or secrets.token_urlsafe(12)
+    data_path, meta_path = _staging_paths(upload_id)
+    try:
+        total = int(headers.get('Upload-Length', ''))
+        offset = int(headers.get('Upload-Offset', 0))
+    except ValueError:
+        raise HTTPError(400, 'Upload-Length and Upload-Offset must be numbers')
+    if total <= 0 or total > MAX_UPLOAD_BYTES:
+        raise HTTPError(413, 'Upload too large')
+
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    current = upload_offset(upload_id)
+    if offset != current:
+        raise HTTPError(409, 'Upload offset mismatch', uploadId=upload_id, offset=current)
+    if current == 0:
+        with open(meta_path, 'w') as f:
+            json.dump(metadata, f)
+
+    with open(data_path, 'ab') as f:
+        for chunk in chunks:
+            current += len(chunk)
+            if current > total:
+                f.truncate(offset)
+                raise HTTPError(413, 'Upload exceeds Upload-Length')
+            f.write(chunk)
+
+    if current < total:
+        return {'uploadId': upload_id, 'offset': current, 'complete': False}
+
+    try:
+        with open(meta_path) as f:
+            metadata = {**json.load(f), **metadata}
+    except (OSError, ValueError):
+        pass
+    try:
+        filename = metadata.get('filename', 'photo')
+        result = store_photo(storage, _iter_file(data_path), filename,
+                             metadata.get('contentType', ''), metadata, source_path=data_path)
+    except HTTPError:
+        _discard_staging(data_path, meta_path)
+        raise
+    # Other failures keep the staged file so the client can retry the final call
+    _discard_staging(data_path, meta_path)
+    result.update({'uploadId': upload_id, 'offset': current, 'complete': True})
+    return result
@@ -0,0 +1,157 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Declarative input schemas. A Schema compiles its fields once at import into
+# flat tuples of precompiled checks, so validating a request is a single pass
+# over the fields that reports every error at once ({field: message}); an
+# empty dict means the data is valid.
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_PATTERN = r'^[\d\s\+\-\(\)]{10,15}$'
+
+# Markup and script injection. Every string field is joined and scanned
+# once: plain substring tests for the common tokens ('javascript:' contains
+# 'script'), and a regex for event handlers only when there's an '=' at all.
+# Handlers are matched as attributes (onload=) rather than any "on"
+# substring, which rejected ordinary names like "Onam" or "Simon".
+EVENT_HANDLER = re.compile(r'\bon[a-z]+\s*=')
+FORBIDDEN_MESSAGE = "Invalid characters detected"
+
+def contains_forbidden(text: str) -> bool:
+    text = text.lower()
+    return ('<' in text or '>' in text or 'script' in text
+            or ('=' in text and EVENT_HANDLER.search(text) is not None))
+
+Check = Tuple[int, str]
+
+class Field:
+    """
+    One input field. Limits are (value, message) pairs so each schema keeps
+    its own wording; `words` rejects values containing any listed word and
+    `choices` compares case-insensitively (Schema.clean stores the lowercase
+    value).
+    """
+
+    def __init__(self, name: str, required: bool = False,
+                 pattern: Optional[Tuple[str, str]] = None,
+                 min_length: Optional[Check] = None, max_length: Optional[Check] = None,
+                 choices: Optional[Tuple[Sequence[str], str]] = None,
+                 words: Optional[Tuple[Sequence[str], str]] = None):
+        self.name = name
+        self.required = required
+        self.pattern = pattern
+        self.min_length = min_length
+        self.max_length = max_length
+        self.choices = choices
+        self.words = words
+
+    def compile(self) -> tuple:
+        """Flatten into the tuple Schema.validate unpacks (None = no check)"""
+        return (
+            self.name,
+            f"{self.name} is required" if self.required else None,
+            self.min_length or (None, None),
+            self.max_length or (None, None),
+            (re.compile(self.pattern[0]).match, self.pattern[1]) if self.pattern else (None, None),
+            (frozenset(c.lower() for c in self.choices[0]), self.choices[1]) if self.choices else (None, None),
+            (re.compile('|'.join(map(re.escape, self.words[0]))).search, self.words[1]) if self.words else (None, None),
+        )
+
+class Schema:
+    def __init__(self, fields: Iterable[Field]):
+        self.fields = list(fields)
+        self._compiled = [field.compile() for field in self.fields]
+
+    def validate(self, data: dict) -> Dict[str, str]:
+        """All field errors for one record ({} when valid)"""
+        if not isinstance(data, dict):
+            return {'': 'Invalid data'}
+        errors = {}
+        get = data.get
+        for name, required, (min_len, min_msg), (max_len, max_msg), (match, match_msg), \
+                (choices, choice_msg), (words, words_msg) in self._compiled:
+            value = get(name)
+            if value is None or not isinstance(value, str):
+                if value is not None:
+                    errors[name] = f"{name} must be text"
+                elif required:
+                    errors[name] = required
+                continue
+            value = value.strip()
+            if not value:
+                if required:
+                    errors[name] = required
+            elif min_len is not None and len(value) < min_len:
+                errors[name] = min_msg
+            elif max_len is not None and len(value) > max_len:
+                errors[name] = max_msg
+            elif match is not None and match(value) is None:
+                errors[name] = match_msg
+            elif choices is not None and value.lower() not in choices:
+                errors[name] = choice_msg
+            elif words is not None and words(value.lower()) is not None:
+                errors[name] = words_msg
+
+        # One scan over every string field, including ones the schema doesn't
+        # list; only on a hit do we look for the offending field
+        strings = [value for value in data.values() if isinstance(value, str)]
+        if contains_forbidden('\x00'.join(strings)):
+            for name, value in data.items():
+                if name not in errors and isinstance(value, str) and contains_forbidden(value):
+                    errors[name] = FORBIDDEN_MESSAGE
+        return errors
+
+    def clean(self, data: dict) -> dict:
+        """
+        Copy of valid data with choice fields stripped and lowercased, so
+        what's stored matches the choices exactly ('Gold ' becomes 'gold')
+        """
+        cleaned = dict(data)
+        for field in self.fields:
+            if field.choices and isinstance(cleaned.get(field.name), str):
+                cleaned[field.name] = cleaned[field.name].strip().lower()
+        return cleaned
+
+    def validate_many(self, records: Iterable[dict]) -> List[Tuple[int, Dict[str, str]]]:
+        """Batch mode for imports: (index, errors) for each invalid record"""
+        validate = self.validate
+        results = []
+        for index, record in enumerate(records):
+            errors = validate(record)
+            if errors:
+                results.append((index, errors))
+        return results
+
+def first_error(errors: Dict[str, str]) -> str:
+    """The message to show when a client only displays one"""
+    return next(iter(errors.values()), '')
+
+_email = (EMAIL_PATTERN, "Invalid email format")
+_phone = (PHONE_PATTERN, "Invalid phone number format")
+
+REGISTRATION_SCHEMAS = {
+    'player': Schema([
+        Field('fullName', required=True, max_length=(100, "Name too long (max 100 characters)")),
+        Field('contactNumber', required=True, pattern=_phone),
+        Field('email', required=True, pattern=_email),
+        Field('playingPosition', required=True),
+    ]),
+    'team': Schema([
+        Field('teamName', required=True,
+              min_length=(3, "Team name must be at least 3 characters"),
+              max_length=(50, "Team name too long (max 50 characters)"),
+              words=(['test', 'fake', 'spam', 'bot'], "Please use a proper team name")),
+        Field('captainName', required=True),
+        Field('captainContact', required=True, pattern=_phone),
+        Field('captainEmail', required=True, pattern=_email),
+    ]),
+    'sponsor': Schema([
+        Field('companyName', required=True,
+              min_length=(2, "Company name must be at least 2 characters"),
+              max_length=(100, "Company name too long (max 100 characters)")),
+        Field('contactNumber', required=True, pattern=_phone),
+        Field('email', required=True, pattern=_email),
+        Field('sponsorshipLevel', required=True,
+              choices=(['title', 'gold', 'silver', 'bronze', 'supporting'], "Invalid sponsorship level")),
+    ]),
+}
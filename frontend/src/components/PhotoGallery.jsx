@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Button } from './ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from './ui/card';
 import { Input } from './ui/input';
@@ -23,6 +23,9 @@ const response = await fetch(API_ENDPOINTS.ADMIN_LOGIN, {
   body: JSON.stringify({ password: adminPassword })
 });
 
+// Grid is 1/2/3/4 columns at the Tailwind md/lg/xl breakpoints
+const GRID_IMAGE_SIZES = '(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw';
+
 const PhotoGallery = () => {
   const [photos, setPhotos] = useState([]);
   const [isAdmin, setIsAdmin] = useState(false);
@@ -42,20 +45,40 @@ const PhotoGallery = () => {
     file: null
   });
 
-  const categories = [
-    { value: 'all', label: 'All Photos' },
+  // Defaults until /api/gallery-categories (api/data/gallery-categories.json) loads
+  const [galleryCategories, setGalleryCategories] = useState([
     { value: 'tournament', label: 'Tournament' },
     { value: 'practice', label: 'Practice Sessions' },
     { value: 'venue', label: 'Venue' },
     { value: 'awards', label: 'Awards Ceremony' },
     { value: 'team', label: 'Team Photos' }
-  ];
+  ]);
+  const categories = [{ value: 'all', label: 'All Photos' }, ...galleryCategories];
+
+  const fetchCategories = async () => {
+    try {
+      const response = await fetch('/api/gallery-categories');
+      if (response.ok) {
+        const result = await response.json();
+        if (result.categories && result.categories.length) {
+          setGalleryCategories(result.categories);
+        }
+      }
+    } catch (error) {
+      console.error('Failed to fetch categories:', error);
+    }
+  };
 
   // Fetch photos from Vercel Blob storage
   const fetchPhotos = async () => {
     setFetchingPhotos(true);
     try {
-      const response = await fetch('/api/gallery-photos');
+      // Category and search filtering happen server-side, so only matches are downloaded
+      const params = new URLSearchParams();
+      if (selectedCategory !== 'all') params.set('category', selectedCategory);
+      if (searchTerm.trim()) params.set('q', searchTerm.trim());
+      const query = params.toString();
+      const response = await fetch(query ? `/api/gallery-photos?${query}` : '/api/gallery-photos');
       const result = await response.json();
       
       if (response.ok) {
@@ -151,10 +174,11 @@ const PhotoGallery = () => {
     
     try {
       const formData = new FormData();
-      formData.append('file', uploadForm.file);
       formData.append('title', uploadForm.title.trim());
       formData.append('description', uploadForm.description.trim());
       formData.append('category', uploadForm.category);
+      // File goes last: the server streams it and names it from the fields above
+      formData.append('file', uploadForm.file);
 
       const response = await fetch('/api/gallery-upload', {
         method: 'POST',
@@ -167,7 +191,9 @@ const PhotoGallery = () => {
       const result = await response.json();
 
       if (response.ok) {
-        alert('Photo uploaded successfully!');
+        alert(result.similar && result.similar.length
+          ? 'Photo uploaded. Note: it looks very similar to a photo already in the gallery.'
+          : 'Photo uploaded successfully!');
         
         // Reset form
         setUploadForm({
@@ -221,13 +247,18 @@ const PhotoGallery = () => {
       });
 
       const result = await response.json();
+      // The overall status can be a success while this photo wasn't deleted
+      const outcome = (result.results || []).find(r => r.pathname === photo.pathname);
 
-      if (response.ok) {
+      if (response.ok && outcome && outcome.status === 'deleted') {
         alert('Photo deleted successfully!');
         // Remove photo from local state
         setPhotos(prev => prev.filter(p => p.id !== photo.id));
+      } else if (outcome && outcome.status === 'not_found') {
+        alert('This photo was already deleted.');
+        setPhotos(prev => prev.filter(p => p.id !== photo.id));
       } else {
-        alert(result.error || 'Delete failed');
+        alert((outcome && outcome.error) || result.error || 'Delete failed');
       }
     } catch (error) {
       console.error('Delete error:', error);
@@ -239,19 +270,23 @@ const PhotoGallery = () => {
 
   // Load photos on component mount
   useEffect(() => {
+    fetchCategories();
     fetchPhotos();
   }, []);
 
-  // Filter photos based on search and category
-  const filteredPhotos = photos.filter(photo => {
-    const matchesSearch = photo.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         photo.description.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         (photo.tags && photo.tags.some(tag => tag.includes(searchTerm.toLowerCase())));
-    
-    const matchesCategory = selectedCategory === 'all' || photo.category === selectedCategory;
-    
-    return matchesSearch && matchesCategory;
-  });
+  // Refetch when the filters change, waiting for a pause in typing
+  const filtersMounted = useRef(false);
+  useEffect(() => {
+    if (!filtersMounted.current) {
+      filtersMounted.current = true;
+      return;
+    }
+    const timer = setTimeout(fetchPhotos, 300);
+    return () => clearTimeout(timer);
+  }, [selectedCategory, searchTerm]);
+
+  // The server already applied the search and category filters
+  const filteredPhotos = photos;
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-green-50 to-blue-50 p-4">
@@ -471,13 +506,21 @@ const PhotoGallery = () => {
               >
                 <Card className="overflow-hidden hover:shadow-lg transition-shadow">
                   <div className="relative group">
-                    <img
-                      src={photo.url}
-                      alt={photo.title}
-                      className="w-full h-48 object-cover cursor-pointer"
-                      onClick={() => setSelectedPhoto(photo)}
-                      loading="lazy"
-                    />
+                    <picture>
+                      {photo.srcset?.avif && (
+                        <source type="image/avif" srcSet={photo.srcset.avif} sizes={GRID_IMAGE_SIZES} />
+                      )}
+                      {photo.srcset?.webp && (
+                        <source type="image/webp" srcSet={photo.srcset.webp} sizes={GRID_IMAGE_SIZES} />
+                      )}
+                      <img
+                        src={photo.url}
+                        alt={photo.title}
+                        className="w-full h-48 object-cover cursor-pointer"
+                        onClick={() => setSelectedPhoto(photo)}
+                        loading="lazy"
+                      />
+                    </picture>
                     <div className="absolute inset-0 bg-black bg-opacity-0 group-hover:bg-opacity-50 transition-all duration-300 flex items-center justify-center">
                       <div className="opacity-0 group-hover:opacity-100 transition-opacity flex gap-2">
                         <Button
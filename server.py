@@ -0,0 +1,248 @@
+"""
+Self-hosted server for the API (on-prem kiosk, local development).
+
+Mounts every endpoint in api/ under /api/<name> in one process, either as a
+multi-threaded HTTP server or as an ASGI app, using the same Endpoint
+objects the serverless functions are built from:
+
+    python server.py --port 8000 --static frontend/dist
+    uvicorn server:app --workers 1
+
+Locally stored gallery photos (GALLERY_STORAGE=local) are served from
+GALLERY_LOCAL_URL, and --static serves a built frontend with index.html as
+the fallback for client-side routes.
+"""
+import argparse
+import asyncio
+import importlib.util
+import mimetypes
+import os
+import sys
+from http.client import HTTPMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+sys.path.insert(0, API_DIR)
+
+from http_core import Endpoint, Request, Response, handle_request, json_response, write_response  # noqa: E402
+
+def load_endpoints(api_dir: str = API_DIR) -> Dict[str, Endpoint]:
+    """Import each api/<name>.py that defines an endpoint, keyed by name"""
+    endpoints = {}
+    for filename in sorted(os.listdir(api_dir)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.py' or name.startswith('_'):
+            continue
+        spec = importlib.util.spec_from_file_location(f"api_{name.replace('-', '_')}", os.path.join(api_dir, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        endpoint = getattr(getattr(module, 'handler', None), 'endpoint', None)
+        if isinstance(endpoint, Endpoint):
+            endpoints[name] = endpoint
+    return endpoints
+
+def static_mounts(static_dir: Optional[str] = None) -> List[Tuple[str, str, bool]]:
+    """(url prefix, directory, spa fallback) for files served next to the API"""
+    mounts = []
+    if os.getenv('GALLERY_STORAGE') == 'local':
+        url = os.getenv('GALLERY_LOCAL_URL', '/gallery-files').rstrip('/') + '/'
+        mounts.append((url, os.getenv('GALLERY_LOCAL_DIR', '/tmp/onam-gallery'), False))
+    if static_dir:
+        mounts.append(('/', static_dir, True))
+    return mounts
+
+def resolve_endpoint(endpoints: Dict[str, Endpoint], path: str) -> Optional[Endpoint]:
+    if not path.startswith('/api/'):
+        return None
+    return endpoints.get(path[len('/api/'):].strip('/'))
+
+def _iter_file(path: str, chunk_size: int = 65536):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def static_response(mounts: List[Tuple[str, str, bool]], path: str) -> Optional[Response]:
+    for prefix, directory, spa in mounts:
+        if not path.startswith(prefix):
+            continue
+        root = os.path.realpath(directory)
+        target = os.path.realpath(os.path.join(root, unquote(path[len(prefix):])))
+        if target != root and not target.startswith(root + os.sep):
+            return json_response({'error': 'Not found'}, 404)
+        if not os.path.isfile(target) and spa:
+            target = os.path.join(root, 'index.html')
+        if not os.path.isfile(target):
+            return json_response({'error': 'Not found'}, 404)
+        content_type = mimetypes.guess_type(target)[0] or 'application/octet-stream'
+        return Response(200, _iter_file(target), [('Content-Type', content_type),
+                                                  ('Content-Length', str(os.path.getsize(target)))])
+    return None
+
+# --- Threaded HTTP server ---
+
+def make_server(host: str, port: int, endpoints: Dict[str, Endpoint],
+                mounts: Optional[List[Tuple[str, str, bool]]] = None) -> ThreadingHTTPServer:
+    mounts = mounts or []
+
+    class Router(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive between kiosk and server
+        disable_nagle_algorithm = True  # see http_core.make_handler
+
+        def _handle(self):
+            path = urlparse(self.path).path
+            endpoint = resolve_endpoint(endpoints, path)
+            if endpoint is not None:
+                handle_request(self, endpoint)
+                return
+            response = static_response(mounts, path) if self.command in ('GET', 'HEAD') else None
+            if response is None:
+                response = json_response({'error': 'Not found'}, 404)
+            write_response(self, response, head_only=self.command == 'HEAD')
+            if self.headers.get('Content-Length', '0') != '0' or 'Transfer-Encoding' in self.headers:
+                self.close_connection = True
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+    server = ThreadingHTTPServer((host, port), Router)
+    server.daemon_threads = True
+    return server
+
+# --- ASGI ---
+
+class _ASGIBody:
+    """
+    Blocking file-like view of an ASGI request body, read from a worker
+    thread. Bodies without a Content-Length are re-framed as chunked so
+    endpoints see the same wire format as under BaseHTTPRequestHandler.
+    """
+
+    def __init__(self, receive, loop, chunked: bool):
+        self._receive = receive
+        self._loop = loop
+        self._chunked = chunked
+        self._buffer = b''
+        self._done = False
+
+    def _fill(self) -> bool:
+        if self._done:
+            return False
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message['type'] == 'http.disconnect':
+            self._done = True
+            return False
+        data = message.get('body', b'')
+        more = message.get('more_body', False)
+        if self._chunked:
+            data = (b'%x\r\n%s\r\n' % (len(data), data) if data else b'') + (b'' if more else b'0\r\n\r\n')
+        self._buffer += data
+        self._done = not more
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, limit: int = -1) -> bytes:
+        while b'\n' not in self._buffer and (limit < 0 or len(self._buffer) < limit) and self._fill():
+            pass
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        if limit >= 0:
+            end = min(end, limit)
+        data, self._buffer = self._buffer[:end], self._buffer[end:]
+        return data
+
+def create_asgi_app(endpoints: Dict[str, Endpoint], mounts: Optional[List[Tuple[str, str, bool]]] = None):
+    mounts = mounts or []
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        loop = asyncio.get_running_loop()
+        method = scope['method']
+        headers = HTTPMessage()
+        for name, value in scope['headers']:
+            headers[name.decode('latin-1')] = value.decode('latin-1')
+        chunked = 'Content-Length' not in headers and method in ('POST', 'PUT', 'PATCH', 'DELETE')
+        del headers['Transfer-Encoding']
+        if chunked:
+            headers['Transfer-Encoding'] = 'chunked'
+
+        target = scope.get('raw_path', scope['path'].encode()).decode('latin-1')
+        if scope.get('query_string'):
+            target += '?' + scope['query_string'].decode('latin-1')
+        endpoint = resolve_endpoint(endpoints, scope['path'])
+        if endpoint is not None:
+            body = _ASGIBody(receive, loop, chunked)
+            request = Request(method, target, headers, body, scope.get('client'))
+            # Endpoints block (storage, SMTP, SQLite), so they run on the default executor
+            response = await loop.run_in_executor(None, endpoint.dispatch, request)
+        else:
+            response = static_response(mounts, scope['path']) if method in ('GET', 'HEAD') else None
+            if response is None:
+                response = json_response({'error': 'Not found'}, 404)
+
+        body = response.body
+        raw_headers = [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in response.headers]
+        if isinstance(body, (bytes, bytearray)) and not any(k == b'content-length' for k, _ in raw_headers):
+            raw_headers.append((b'content-length', str(len(body)).encode()))
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': raw_headers})
+        if method == 'HEAD':
+            body = b''
+        if isinstance(body, (bytes, bytearray)):
+            await send({'type': 'http.response.body', 'body': bytes(body)})
+            return
+        chunks = iter(body)
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    return app
+
+class _LazyASGI:
+    """`server:app` for ASGI servers; endpoints load on first request"""
+
+    def __init__(self):
+        self._app = None
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            self._app = create_asgi_app(load_endpoints(), static_mounts(os.getenv('STATIC_DIR')))
+        await self._app(scope, receive, send)
+
+app = _LazyASGI()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--static', default=os.getenv('STATIC_DIR'), help='built frontend to serve at /')
+    args = parser.parse_args()
+
+    endpoints = load_endpoints()
+    server = make_server(args.host, args.port, endpoints, static_mounts(args.static))
+    print(f"Serving {', '.join(sorted(endpoints))} on http://{args.host}:{args.port}/api/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
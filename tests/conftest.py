@@ -0,0 +1,93 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Keep test state out of the real spool/database files, as tools/bench.py does
+_scratch = tempfile.mkdtemp(prefix='onam-tests-')
+os.environ.update({
+    'STATE_BACKEND': 'memory',
+    'REGISTRATION_DB_PATH': os.path.join(_scratch, 'registrations.db'),
+    'EMAIL_SPOOL_PATH': os.path.join(_scratch, 'spool.db'),
+    'PHOTO_HASH_DB_PATH': os.path.join(_scratch, 'photo-hashes.db'),
+})
+for _name in ('SES_SMTP_HOST', 'BLOB_READ_WRITE_TOKEN', 'GALLERY_STORAGE', 'TRAFFIC_CAPTURE_PATH'):
+    os.environ.pop(_name, None)
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import state_store  # noqa: E402
+from resp_stub import RESPStub  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    """Every test starts with an empty process-local state store"""
+    store = state_store.MemoryStore()
+    monkeypatch.setattr(state_store, '_default_store', store)
+    return store
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def store(request, tmp_path, monkeypatch):
+    """Each state backend in turn (Redis via tools/resp_stub), installed as the default store"""
+    if request.param == 'redis':
+        with RESPStub() as stub:
+            store = state_store.RedisStore(stub.url)
+            monkeypatch.setattr(state_store, '_default_store', store)
+            yield store
+        return
+    if request.param == 'sqlite':
+        store = state_store.SQLiteStore(str(tmp_path / 'state.db'))
+    else:
+        store = state_store.MemoryStore()
+    monkeypatch.setattr(state_store, '_default_store', store)
+    yield store
+
+@pytest.fixture
+def load_endpoint():
+    """Import api/<name>.py (file names aren't valid module names)"""
+    def load(name: str):
+        path = os.path.join(ROOT, 'api', f"{name}.py")
+        spec = importlib.util.spec_from_file_location(f"endpoint_{name.replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+@pytest.fixture
+def registrations(tmp_path, monkeypatch):
+    """An empty registration store, installed as the one endpoints use"""
+    import registration_store
+    store = registration_store.RegistrationStore(str(tmp_path / 'registrations.db'))
+    monkeypatch.setattr(registration_store, '_store', store)
+    return store
+
+@pytest.fixture
+def call():
+    """Dispatch a request to an endpoint: call(endpoint, method, target, body=None, headers=None)"""
+    import io
+    import json
+    from http_core import Request
+
+    def call(endpoint, method: str = 'GET', target: str = '/', body=None, headers=None):
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+        body = body or b''
+        headers = dict(headers or {}, **{'Content-Length': str(len(body))})
+        return endpoint.dispatch(Request(method, target, headers, io.BytesIO(body), ('127.0.0.1', 0)))
+    return call
+
+@pytest.fixture
+def gallery_storage(tmp_path, monkeypatch):
+    """Empty local photo storage with no cached manifest or listing (variants and hashing off)"""
+    import gallery_index
+    import gallery_manifest
+    from photo_storage import LocalStorage
+    monkeypatch.setenv('GALLERY_VARIANTS', '0')
+    monkeypatch.setenv('PHOTO_DEDUP', '0')
+    monkeypatch.setattr(gallery_manifest, '_cached', None)
+    monkeypatch.setattr(gallery_index, '_cache', None)
+    return LocalStorage(str(tmp_path / 'gallery'), '/gallery-files')
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+import pytest
+
+import admin_auth
+from http_core import HTTPError
+
+NOW = 1_700_000_000
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    """Known signing keys and an empty verified-token cache"""
+    monkeypatch.setattr(admin_auth, 'SIGNING_KID', 'k1')
+    monkeypatch.setattr(admin_auth, 'KEYS', {'k1': b'first secret'})
+    monkeypatch.setattr(admin_auth, '_verified', OrderedDict())
+
+def rotate(monkeypatch, keys):
+    monkeypatch.setattr(admin_auth, 'SIGNING_KID', next(iter(keys)))
+    monkeypatch.setattr(admin_auth, 'KEYS', keys)
+    monkeypatch.setattr(admin_auth, '_verified', OrderedDict())
+
+def test_issued_token_verifies(monkeypatch):
+    token, expires = admin_auth.issue_token(ttl=60, now=NOW)
+    assert expires == NOW + 60
+    assert token.startswith('v1.k1.')
+    assert admin_auth.verify_token(token, now=NOW) == expires
+
+def test_load_keys(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN_KEYS', 'new:s2, old:s1,broken')
+    assert admin_auth._load_keys() == ('new', {'new': b's2', 'old': b's1'})
+    monkeypatch.delenv('ADMIN_TOKEN_KEYS')
+    kid, keys = admin_auth._load_keys()
+    assert kid == 'pw' and list(keys) == ['pw']
+
+def test_key_rotation(monkeypatch):
+    old_token, _ = admin_auth.issue_token(ttl=60, now=NOW)
+    # New key signs, old key still verifies
+    rotate(monkeypatch, {'k2': b'second secret', 'k1': b'first secret'})
+    new_token, _ = admin_auth.issue_token(ttl=60, now=NOW)
+    assert new_token.startswith('v1.k2.')
+    assert admin_auth.verify_token(old_token, now=NOW)
+    assert admin_auth.verify_token(new_token, now=NOW)
+    # Once the old key is dropped, its tokens stop verifying
+    rotate(monkeypatch, {'k2': b'second secret'})
+    with pytest.raises(admin_auth.InvalidToken, match='unknown key'):
+        admin_auth.verify_token(old_token, now=NOW)
+    assert admin_auth.verify_token(new_token, now=NOW)
+
+def test_expired_token_is_rejected_even_when_cached():
+    token, expires = admin_auth.issue_token(ttl=60, now=NOW)
+    assert admin_auth.verify_token(token, now=NOW)
+    assert token in admin_auth._verified
+    with pytest.raises(admin_auth.InvalidToken, match='expired'):
+        admin_auth.verify_token(token, now=expires)
+    assert token not in admin_auth._verified
+
+def tampered(token):
+    version, kid, expires, signature = token.split('.')
+    return [
+        f"{version}.{kid}.{int(expires) + 3600}.{signature}",   # extended expiry
+        f"{version}.{kid}.+{expires}.{signature}",             # same expiry, different spelling
+        f"{version}.{kid}.{expires}.{signature[:-1]}{'B' if signature.endswith('A') else 'A'}",
+        f"{version}.{kid}.{expires}.{signature}é",
+        f"v2.{kid}.{expires}.{signature}",
+        f"{version}.other.{expires}.{signature}",
+        f"{version}.{kid}.{expires}",
+        'not a token',
+        '',
+    ]
+
+@pytest.mark.parametrize('index', range(9))
+def test_tampered_token_is_rejected(index):
+    token, _ = admin_auth.issue_token(ttl=60, now=NOW)
+    with pytest.raises(admin_auth.InvalidToken):
+        admin_auth.verify_token(tampered(token)[index], now=NOW)
+
+class FakeRequest:
+    def __init__(self, authorization=None):
+        self.headers = {'Authorization': authorization} if authorization is not None else {}
+
+@pytest.mark.parametrize('authorization', [
+    None, 'Basic abc', 'Bearer ', 'Bearer v1.k1.1.sig', 'Bearer v1.k1.9999999999.sigñature',
+])
+def test_require_admin_rejects_with_401(authorization):
+    with pytest.raises(HTTPError) as excinfo:
+        admin_auth.require_admin(FakeRequest(authorization))
+    assert excinfo.value.status == 401
+
+def test_require_admin_accepts_a_valid_token():
+    token, _ = admin_auth.issue_token()
+    admin_auth.require_admin(FakeRequest(f"Bearer {token}"))
+
+def test_check_password(monkeypatch):
+    monkeypatch.setenv('ADMIN_PASSWORD', 'sécret')
+    assert admin_auth.check_password('sécret')
+    assert not admin_auth.check_password('secret')
+    assert not admin_auth.check_password(None)
+    assert not admin_auth.check_password(['sécret'])
+
+def test_login_issues_a_token_and_throttles_failures(monkeypatch, load_endpoint, call):
+    monkeypatch.setenv('ADMIN_PASSWORD', 'right')
+    login = load_endpoint('admin-login').endpoint
+    response = call(login, 'POST', '/', {'password': 'right'})
+    assert response.status == 200
+    for _ in range(5):
+        assert call(login, 'POST', '/', {'password': 'wrong'}).status == 401
+    # Even the right password waits out the throttle
+    assert call(login, 'POST', '/', {'password': 'right'}).status == 429
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+import email_queue
+import smtp_pool
+from smtp_stub import SMTPStub
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    """A fresh spool with SMTP settings and no background worker"""
+    monkeypatch.setattr(email_queue, 'SPOOL_PATH', str(tmp_path / 'spool.db'))
+    monkeypatch.setattr(email_queue, '_conn', None)
+    monkeypatch.setattr(email_queue, 'ensure_worker', lambda: None)
+    for name, value in {'SENDER_EMAIL': 'admin@example.com', 'SES_SMTP_USERNAME': 'user',
+                        'SES_SMTP_PASSWORD': 'secret', 'SES_SMTP_HOST': '127.0.0.1',
+                        'SES_SMTP_STARTTLS': '0'}.items():
+        monkeypatch.setenv(name, value)
+    yield email_queue
+    email_queue._get_conn().close()
+
+class FailingPool:
+    def send_batch(self, messages):
+        return [OSError('connection refused')] * len(messages)
+
+def outbox(spool):
+    return spool._get_conn().execute('SELECT status, attempts, next_attempt FROM outbox').fetchall()
+
+def test_spooled_mail_is_delivered(spool, monkeypatch):
+    with SMTPStub() as stub:
+        monkeypatch.setenv('SES_SMTP_PORT', str(stub.address[1]))
+        assert spool.enqueue_email('One', '<p>1</p>')
+        assert spool.enqueue_email('Two', '<p>2</p>')
+        assert spool.pending_count() == 2
+        assert spool.drain() == (2, 0)
+    assert stub.messages == 2
+    assert spool.pending_count() == 0
+
+def test_nothing_is_spooled_without_smtp_settings(spool, monkeypatch):
+    monkeypatch.delenv('SES_SMTP_HOST')
+    assert not spool.enqueue_email('One', '<p>1</p>')
+    assert spool.pending_count() == 0
+
+def test_a_claimed_message_is_not_claimed_again(spool, monkeypatch):
+    spool.enqueue_email('One', '<p>1</p>')
+    now = time.time()
+    assert len(spool._claim_due(now, 10)) == 1
+    # Another process sharing the spool file
+    monkeypatch.setattr(email_queue, '_conn', None)
+    assert spool._claim_due(now, 10) == []
+    assert spool.pending_count() == 1
+    # ...until the lease of a worker that never finished runs out
+    assert len(spool._claim_due(now + spool.SEND_LEASE, 10)) == 1
+
+def test_failures_back_off_then_give_up(spool, monkeypatch):
+    monkeypatch.setattr(smtp_pool, 'get_pool', lambda *args: FailingPool())
+    monkeypatch.setattr(email_queue, 'MAX_ATTEMPTS', 3)
+    spool.enqueue_email('One', '<p>1</p>')
+
+    before = time.time()
+    assert spool.drain() == (0, 1)
+    [(status, attempts, next_attempt)] = outbox(spool)
+    assert (status, attempts) == ('pending', 1)
+    assert before + spool.BACKOFF_BASE * 0.8 <= next_attempt <= time.time() + spool.BACKOFF_BASE * 1.2
+    assert spool.drain() == (0, 0)  # not due yet
+
+    spool._get_conn().execute('UPDATE outbox SET next_attempt = 0')
+    assert spool.drain() == (0, 1)
+    [(status, attempts, next_attempt)] = outbox(spool)
+    assert (status, attempts) == ('pending', 2)
+    assert next_attempt >= before + spool.BACKOFF_BASE * 2 * 0.8
+
+    spool._get_conn().execute('UPDATE outbox SET next_attempt = 0')
+    assert spool.drain() == (0, 1)
+    assert outbox(spool)[0][:2] == ('failed', 3)
+    assert spool.pending_count() == 0
+
+def test_digest_collects_until_full(spool, monkeypatch):
+    monkeypatch.setattr(email_queue, 'DIGEST_INTERVAL', 3600)
+    monkeypatch.setattr(email_queue, 'DIGEST_MAX_ITEMS', 3)
+    for name in ('Arjun', 'Biju'):
+        assert spool.notify(f"New player {name}", '<p>full</p>', 'player', {'Name': name})
+    assert spool.flush_digest() == 0
+    assert spool.pending_count() == 0
+
+    spool.notify('New team', '<p>full</p>', 'team', {'Team': '<Kochi>'})
+    assert spool.flush_digest() == 3
+    [(subject, body)] = spool._get_conn().execute('SELECT subject, body FROM outbox').fetchall()
+    assert subject.startswith('📋 3 New Registrations') and '2 players, 1 teams' in subject
+    assert 'Arjun' in body and '&lt;Kochi&gt;' in body
+    assert spool._digest_due() is None
+
+def test_digest_flushes_when_overdue_or_forced(spool, monkeypatch):
+    monkeypatch.setattr(email_queue, 'DIGEST_INTERVAL', 3600)
+    spool.notify('New player', '<p>full</p>', 'player', {'Name': 'Arjun'})
+    assert spool._digest_due() == pytest.approx(time.time() + 3600, abs=5)
+    assert spool.flush_digest() == 0
+    assert spool.flush_digest(force=True) == 1
+
+    spool.notify('New player', '<p>full</p>', 'player', {'Name': 'Biju'})
+    spool._get_conn().execute('UPDATE digest SET created_at = created_at - 3600')
+    assert spool.flush_digest() == 1
+    assert spool.pending_count() == 2
+
+def test_immediate_notifications_skip_the_digest(spool, monkeypatch):
+    monkeypatch.setattr(email_queue, 'DIGEST_INTERVAL', 3600)
+    spool.notify('Gold sponsor', '<p>full</p>', 'sponsor', {'Company': 'Malabar'}, immediate=True)
+    assert spool.pending_count() == 1
+    assert spool._digest_due() is None
@@ -0,0 +1,69 @@
+import pytest
+
+import gallery_manifest
+from admin_auth import issue_token
+from gallery_bulk import BulkRequestError, bulk_delete, resolve_targets
+from photo_storage import PHOTO_PREFIX
+
+AWARDS = f"{PHOTO_PREFIX}awards/"
+MATCHES = f"{PHOTO_PREFIX}matches/"
+
+@pytest.fixture
+def storage(gallery_storage):
+    for pathname in (f"{AWARDS}cup.jpg", f"{AWARDS}medal.jpg", f"{MATCHES}kickoff.jpg"):
+        gallery_storage.put(pathname, iter([b'photo']), 'image/jpeg')
+    return gallery_storage
+
+@pytest.fixture
+def delete(storage, load_endpoint, call, monkeypatch):
+    module = load_endpoint('gallery-delete')
+    monkeypatch.setattr(module, 'get_storage', lambda: storage)
+    headers = {'Authorization': f"Bearer {issue_token()[0]}"}
+    return lambda body: call(module.endpoint, 'DELETE', '/api/gallery-delete', body, headers)
+
+def stored(storage):
+    return sorted(blob['pathname'] for blob in storage.iter_blobs(PHOTO_PREFIX))
+
+def test_targets_by_category_prefix_and_pathnames(storage):
+    assert sorted(resolve_targets(storage, {'category': 'Awards'})) == [f"{AWARDS}cup.jpg", f"{AWARDS}medal.jpg"]
+    assert list(resolve_targets(storage, {'prefix': MATCHES})) == [f"{MATCHES}kickoff.jpg"]
+    targets = resolve_targets(storage, {'pathnames': [f"{AWARDS}cup.jpg", f"{AWARDS}gone.jpg"]})
+    assert targets[f"{AWARDS}cup.jpg"]['pathname'] == f"{AWARDS}cup.jpg"
+    assert targets[f"{AWARDS}gone.jpg"] is None
+
+@pytest.mark.parametrize('data', [{'category': 'nope'}, {'prefix': 'elsewhere/'}, {}, {'pathnames': []}])
+def test_bad_targets(storage, data):
+    with pytest.raises(BulkRequestError):
+        resolve_targets(storage, data)
+
+def test_bulk_delete_removes_photos_from_storage_and_manifest(storage):
+    results = bulk_delete(storage, resolve_targets(storage, {'category': 'awards'}))
+    assert results == [{'pathname': f"{AWARDS}cup.jpg", 'status': 'deleted'},
+                       {'pathname': f"{AWARDS}medal.jpg", 'status': 'deleted'}]
+    assert stored(storage) == [f"{MATCHES}kickoff.jpg"]
+    assert list(gallery_manifest.read(storage).photos) == [f"{MATCHES}kickoff.jpg"]
+
+def test_deleting_a_photo_succeeds(delete, storage):
+    response = delete({'pathname': f"{AWARDS}cup.jpg"})
+    assert response.status == 200
+    assert f"{AWARDS}cup.jpg" not in stored(storage)
+
+def test_deleting_an_unknown_photo_is_not_a_success(delete, storage):
+    response = delete({'pathname': f"{AWARDS}gone.jpg"})
+    assert response.status == 404
+    assert b'"status": "not_found"' in response.body
+    assert b'"error": "Photo not found"' in response.body
+    assert len(stored(storage)) == 3
+
+def test_partly_unknown_request_is_partial(delete, storage):
+    response = delete({'pathnames': [f"{AWARDS}cup.jpg", f"{AWARDS}gone.jpg"]})
+    assert response.status == 207
+    assert b'"status": "partial"' in response.body
+    assert b'"deleted": 1' in response.body
+
+def test_delete_requires_an_admin_token(storage, load_endpoint, call):
+    module = load_endpoint('gallery-delete')
+    response = call(module.endpoint, 'DELETE', '/', {'pathname': f"{AWARDS}cup.jpg"},
+                    {'Authorization': 'Bearer v1.pw.1.forged'})
+    assert response.status == 401
+    assert len(stored(storage)) == 3
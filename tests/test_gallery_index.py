@@ -0,0 +1,23 @@
+import pytest
+
+import gallery_index
+from gallery_index import GalleryListing
+
+@pytest.fixture
+def cached(monkeypatch):
+    listing = GalleryListing([], manifest_version=5)
+    monkeypatch.setattr(gallery_index, '_cache', listing)
+    return listing
+
+def test_slow_refresh_does_not_replace_a_newer_listing(cached, monkeypatch):
+    # The refresh read version 3, then an upload published 5 before it finished
+    monkeypatch.setattr(gallery_index, 'load_listing', lambda storage: GalleryListing([], manifest_version=3))
+    gallery_index._refresh_in_background(None)
+    assert gallery_index._cache is cached
+    assert not gallery_index._refreshing
+
+def test_refresh_installs_a_newer_listing(cached, monkeypatch):
+    newer = GalleryListing([], manifest_version=6)
+    monkeypatch.setattr(gallery_index, 'load_listing', lambda storage: newer)
+    gallery_index._refresh_in_background(None)
+    assert gallery_index._cache is newer
@@ -0,0 +1,85 @@
+import pytest
+
+import blob_client
+import gallery_manifest
+import state_store
+from blob_stub import BlobStub
+from photo_storage import BlobStorage
+
+def photo(name: str) -> dict:
+    return {'pathname': f"tournament-photos/tournament/{name}.jpg", 'title': name}
+
+@pytest.fixture
+def stub(monkeypatch):
+    with BlobStub() as stub:
+        monkeypatch.setattr(blob_client, 'BLOB_API_URL', stub.url)
+        monkeypatch.setattr(gallery_manifest, '_cached', None)
+        yield stub
+
+@pytest.fixture
+def storage(stub):
+    return BlobStorage('test-token')
+
+def new_instance(monkeypatch, store=None):
+    """Forget this process's manifest and state, as a different instance would"""
+    monkeypatch.setattr(gallery_manifest, '_cached', None)
+    monkeypatch.setattr(state_store, '_default_store', store or state_store.MemoryStore())
+
+def stored_versions(stub) -> list:
+    return [p for p in stub.pathnames if p.startswith(gallery_manifest.MANIFEST_PREFIX)]
+
+def test_write_and_read_back(storage, stub, monkeypatch):
+    written = gallery_manifest.update(storage, add=[photo('a'), photo('b')], bootstrap=lambda: [photo('seed')])
+    assert written.version == 2
+    assert stored_versions(stub) == [gallery_manifest.manifest_pathname(2)]
+
+    new_instance(monkeypatch)
+    manifest = gallery_manifest.read(storage)
+    assert manifest.version == 2
+    assert sorted(manifest.photos) == sorted(p['pathname'] for p in [photo('seed'), photo('a'), photo('b')])
+    assert manifest.photos[photo('seed')['pathname']]['id'] == 1
+    assert manifest.photos == written.photos
+
+def test_ids_and_tombstones_survive_a_round_trip(storage, monkeypatch):
+    gallery_manifest.update(storage, add=[photo('a'), photo('b')], bootstrap=lambda: [])
+    gallery_manifest.update(storage, remove=[photo('a')['pathname']])
+    new_instance(monkeypatch)
+    manifest = gallery_manifest.read(storage)
+    assert list(manifest.photos) == [photo('b')['pathname']]
+    assert manifest.photos[photo('b')['pathname']]['id'] == 2
+    assert manifest.deleted == [{'id': 1, 'pathname': photo('a')['pathname'], 'version': 3}]
+
+def test_instances_without_a_shared_store_see_each_others_versions(storage, monkeypatch):
+    gallery_manifest.update(storage, add=[photo('a')], bootstrap=lambda: [])
+    first = state_store.get_store()
+    assert gallery_manifest.read(storage).version == 2
+
+    new_instance(monkeypatch)
+    assert gallery_manifest.update(storage, add=[photo('b')]).version == 3
+
+    # Back on the first instance: its pointer still says 2, storage says 3
+    new_instance(monkeypatch, first)
+    manifest = gallery_manifest.read(storage)
+    assert manifest.version == 3
+    assert gallery_manifest.update(storage, add=[photo('c')]).version == 4
+    assert len(gallery_manifest.read(storage).photos) == 3
+
+def test_stale_shared_pointer_does_not_overwrite(storage, stub, tmp_path, monkeypatch):
+    shared = state_store.SQLiteStore(str(tmp_path / 'state.db'))
+    new_instance(monkeypatch, shared)
+    gallery_manifest.update(storage, add=[photo('a')], bootstrap=lambda: [])
+    stale = shared.get(gallery_manifest.POINTER_KEY)[0]
+
+    gallery_manifest.update(storage, add=[photo('b')])
+    shared.set(gallery_manifest.POINTER_KEY, stale)  # a writer that published but couldn't move it
+    new_instance(monkeypatch, shared)
+    manifest = gallery_manifest.update(storage, add=[photo('c')])
+    assert manifest.version == 4
+    assert sorted(manifest.photos) == sorted(photo(n)['pathname'] for n in 'abc')
+
+def test_existing_version_is_not_overwritten(storage):
+    pathname = gallery_manifest.manifest_pathname(7)
+    storage.put(pathname, iter([b'first']), 'application/gzip', overwrite=False)
+    with pytest.raises(blob_client.BlobAPIError):
+        storage.put(pathname, iter([b'second']), 'application/gzip', overwrite=False)
+    assert storage.read({'url': f"{blob_client.BLOB_API_URL}/files/{pathname}"}) == b'first'
@@ -0,0 +1,59 @@
+import pytest
+
+from gallery_index import GalleryListing, photo_record
+from gallery_search import PhotoIndex, SearchRequestError, parse_filters
+
+def photo(pathname, date, title='', description='', category=None):
+    return photo_record(pathname, f"https://blob.example/{pathname}", 1000, f"{date}T10:00:00Z",
+                        title=title, description=description, category=category)
+
+@pytest.fixture
+def index():
+    photos = [
+        photo('tournament-photos/awards/best-goal.jpg', '2025-09-01', description='Golden boot ceremony'),
+        photo('tournament-photos/matches/final-kick-off.jpg', '2025-09-03', title='Final Kick-off',
+              description='Kochi Strikers against Malabar United', category='matches'),
+        photo('tournament-photos/matches/semi-final.jpg', '2025-09-02', category='matches'),
+        photo('tournament-photos/team/kochi-strikers.jpg', '2025-08-30', title='Kochi Strikers', category='team'),
+    ]
+    return PhotoIndex(GalleryListing(sorted(photos, key=lambda p: p['pathname'])))
+
+def titles(result):
+    return [p['title'] for p in result.photos]
+
+def test_query_prefixes_title_words(index):
+    assert titles(index.search(query='kic')) == ['Final Kick-off']
+    assert titles(index.search(query='FINAL')) == ['Final Kick-off', 'Semi Final']
+    assert titles(index.search(query='final semi')) == ['Semi Final']
+
+def test_query_matches_description_and_tag_words(index):
+    assert titles(index.search(query='golden')) == ['Best Goal']
+    assert titles(index.search(query='malabar')) == ['Final Kick-off']
+    # Title for one photo, description for the other
+    assert titles(index.search(query='strikers')) == ['Final Kick-off', 'Kochi Strikers']
+    # Category tags: awards photos are tagged 'trophy', team photos 'squad'
+    assert titles(index.search(query='troph')) == ['Best Goal']
+    assert titles(index.search(query='squad')) == ['Kochi Strikers']
+
+@pytest.mark.parametrize('query', ['!!!', '-', '… ?'])
+def test_query_without_words_matches_nothing(index, query):
+    assert titles(index.search(query=query)) == []
+    assert titles(index.search(category='matches', query=query)) == []
+
+def test_filters_combine(index):
+    assert titles(index.search(category='matches')) == ['Final Kick-off', 'Semi Final']
+    assert titles(index.search(category='matches', end='2025-09-02')) == ['Semi Final']
+    assert titles(index.search(start='2025-09-01', end='2025-09-02')) == ['Best Goal', 'Semi Final']
+    assert titles(index.search(category='matches', query='kochi')) == ['Final Kick-off']
+    assert titles(index.search(category='awards', query='kochi')) == []
+
+def test_results_are_cached_per_query(index):
+    assert index.search(query='final') is index.search(query='final')
+
+def test_parse_filters():
+    categories = ['awards', 'matches', 'team']
+    assert parse_filters({'category': 'All', 'q': '  ', 'from': '2025-09-01'}, categories) == {
+        'category': None, 'tag': None, 'start': '2025-09-01', 'end': None, 'query': None}
+    for query in ({'category': 'misc'}, {'from': '1/9/2025'}, {'from': '2025-09-02', 'to': '2025-09-01'}):
+        with pytest.raises(SearchRequestError):
+            parse_filters(query, categories)
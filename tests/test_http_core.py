@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+from http_core import Endpoint, HTTPError, Request, json_response
+
+def request(body: bytes, **headers) -> Request:
+    headers = {name.replace('_', '-'): value for name, value in headers.items()}
+    return Request('POST', '/api/test', headers, io.BytesIO(body))
+
+def chunked(*pieces: bytes) -> bytes:
+    return b''.join(b'%x\r\n%s\r\n' % (len(p), p) for p in pieces) + b'0\r\n\r\n'
+
+def test_iter_body_streams_content_length_bodies():
+    req = request(b'x' * 10, Content_Length='10')
+    assert list(req.iter_body(chunk_size=4)) == [b'xxxx', b'xxxx', b'xx']
+    assert req.body_consumed
+
+def test_iter_body_streams_chunked_bodies():
+    req = request(chunked(b'hello ', b'world'), Transfer_Encoding='chunked')
+    assert b''.join(req.iter_body(chunk_size=4)) == b'hello world'
+    assert req.body_consumed
+
+@pytest.mark.parametrize('body, headers, status', [
+    (b'', {'Content_Length': 'abc'}, 400),
+    (b'', {'Content_Length': '-1'}, 400),
+    (b'x' * 11, {'Content_Length': '11'}, 413),
+    (chunked(b'x' * 6, b'x' * 6), {'Transfer_Encoding': 'chunked'}, 413),
+    (b'zz\r\n', {'Transfer_Encoding': 'chunked'}, 400),
+    (b'xxx', {'Content_Length': '5'}, 400),
+])
+def test_iter_body_errors(body, headers, status):
+    with pytest.raises(HTTPError) as error:
+        b''.join(request(body, **headers).iter_body(max_bytes=10))
+    assert error.value.status == status
+
+def test_bad_content_length_is_a_400_not_a_500():
+    def post(req):
+        return json_response({'size': len(b''.join(req.iter_body()))})
+
+    endpoint = Endpoint('test', {'POST': post}, max_body=None)
+    assert endpoint.dispatch(request(b'', Content_Length='12x')).status == 400
+    assert endpoint.dispatch(request(b'', Content_Length='-1')).status == 400
+    assert endpoint.dispatch(request(b'abc', Content_Length='3')).status == 200
+
+def test_negative_content_length_is_rejected_before_reading():
+    class Unreadable(io.BytesIO):
+        def read(self, size=-1):
+            raise AssertionError(f"read({size})")
+
+    def post(req):
+        return json_response(req.json())
+
+    endpoint = Endpoint('test', {'POST': post})
+    req = Request('POST', '/api/test', {'Content-Length': '-1'}, Unreadable())
+    assert endpoint.dispatch(req).status == 400
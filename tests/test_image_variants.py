@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+import image_variants  # noqa: E402
+
+GPS_IFD = 0x8825
+ORIENTATION = 0x0112
+
+def render(path, width=320):
+    [(fmt, data)] = image_variants.render_width(str(path), width, ['webp'])
+    assert fmt == 'webp'
+    return Image.open(io.BytesIO(data))
+
+def test_variants_carry_no_exif(tmp_path):
+    exif = Image.Exif()
+    exif[0x010f] = 'PhoneMaker'
+    exif[0x0131] = 'Camera 1.0'
+    exif.get_ifd(GPS_IFD).update({1: 'N', 2: (9.0, 58.0, 0.0), 3: 'E', 4: (76.0, 16.0, 0.0)})
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (800, 600), 'green').save(path, exif=exif)
+    assert Image.open(path).getexif().get_ifd(GPS_IFD)
+
+    variant = render(path)
+    assert variant.size == (320, 240)
+    assert 'exif' not in variant.info
+    assert not variant.getexif()
+    assert not variant.getexif().get_ifd(GPS_IFD)
+
+def test_orientation_is_applied_before_exif_is_dropped(tmp_path):
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6  # rotate 90° clockwise to display
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (400, 200), 'green').save(path, exif=exif)
+    assert image_variants.source_width(str(path)) == 200
+    variant = render(path)
+    assert variant.size == (200, 400)
+    assert not variant.getexif()
+
+def test_palette_transparency_is_kept(tmp_path):
+    image = Image.new('P', (64, 64), 0)
+    image.putpalette([255, 0, 0] + [0, 0, 255] * 255)
+    image.paste(1, (0, 0, 32, 64))
+    path = tmp_path / 'logo.png'
+    image.save(path, transparency=0)
+
+    variant = render(path).convert('RGBA')
+    assert variant.getpixel((48, 32))[3] == 0
+    assert variant.getpixel((16, 32))[3] == 255
+
+def test_opaque_palette_images_become_rgb(tmp_path):
+    path = tmp_path / 'logo.gif'
+    Image.new('RGB', (64, 64), 'red').convert('P').save(path)
+    assert render(path).mode == 'RGB'
+
+def test_variant_pathnames_round_trip():
+    pathname = f"{image_variants.PHOTO_PREFIX}awards/final-whistle-1a2b.jpg"
+    variant = image_variants.variant_pathname(pathname, 640, 'webp')
+    assert variant == f"{image_variants.VARIANT_PREFIX}awards/final-whistle-1a2b-640w.webp"
+    assert image_variants.parse_variant(variant) == ('awards/final-whistle-1a2b', 640, 'webp')
+    assert variant in image_variants.variant_pathnames(pathname)
@@ -0,0 +1,82 @@
+import io
+import random
+
+import pytest
+
+import instrumentation
+from http_core import Endpoint, HTTPError, Request, json_response
+from instrumentation import BUCKET_COUNT, EXPORT_BUCKETS, MAX_MICROS, Histogram, bucket_bounds, bucket_index
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Empty metrics for each test"""
+    monkeypatch.setattr(instrumentation, '_histograms', {})
+    monkeypatch.setattr(instrumentation, '_status_counts', {})
+
+def test_buckets_cover_every_value_once():
+    assert bucket_index(MAX_MICROS) == BUCKET_COUNT - 1
+    assert bucket_index(MAX_MICROS * 10) == BUCKET_COUNT - 1
+    assert bucket_index(-5) == 0
+    previous_high = 0
+    for index in range(BUCKET_COUNT):
+        low, high = bucket_bounds(index)
+        assert low == previous_high and high > low
+        assert bucket_index(low) == index and bucket_index(high - 1) == index
+        # Log-linear: a bucket is at most 1/8 of its lower bound wide
+        assert high - low <= max(1, low // 8)
+        previous_high = high
+
+def test_quantiles_are_within_the_bucket_error():
+    rng = random.Random(5)
+    values = sorted(rng.lognormvariate(-5, 1.5) for _ in range(20000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    assert histogram.count == len(values)
+    assert histogram.sum == pytest.approx(sum(values))
+    for q in (0.5, 0.9, 0.99):
+        exact = values[round(q * len(values)) - 1]
+        assert histogram.quantile(q) == pytest.approx(exact, rel=0.07)
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_cumulative_counts_per_export_bound():
+    histogram = Histogram()
+    for seconds in (0.0001, 0.0004, 0.002, 0.02, 0.3, 20.0):
+        histogram.record(seconds)
+    assert histogram.cumulative() == [2, 2, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 5]
+    assert len(histogram.cumulative()) == len(EXPORT_BUCKETS)
+
+def test_dispatch_records_phases_and_status():
+    def get(request):
+        with request.phase('validate'):
+            pass
+        if request.query.get('fail'):
+            raise HTTPError(400, 'bad')
+        return json_response({})
+
+    endpoint = Endpoint('probe', {'GET': get})
+
+    def call(target):
+        return endpoint.dispatch(Request('GET', target, {}, io.BytesIO(b''), ('127.0.0.1', 0)))
+
+    response = call('/')
+    timing = dict(response.headers)['Server-Timing']
+    assert timing.startswith('validate;dur=') and ', app;dur=' in timing
+    call('/?fail=1')
+    text = instrumentation.render_prometheus()
+    assert 'onam_request_duration_seconds_count{endpoint="probe",phase="total"} 2' in text
+    assert 'onam_request_duration_seconds_count{endpoint="probe",phase="validate"} 2' in text
+    assert 'onam_request_duration_seconds_bucket{endpoint="probe",phase="total",le="+Inf"} 2' in text
+    assert 'onam_requests_total{endpoint="probe",status="200"} 1' in text
+    assert 'onam_requests_total{endpoint="probe",status="400"} 1' in text
+
+def test_sampled_requests_go_to_the_profile_hook(monkeypatch):
+    profiles = []
+    monkeypatch.setattr(instrumentation, 'PROFILE_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(instrumentation, '_profile_hook', lambda name, profile: profiles.append(name))
+    assert instrumentation.should_profile()
+    assert instrumentation.profiled('probe', lambda x: x * 2, 21) == 42
+    # A failing hook doesn't fail the request
+    instrumentation.set_profile_hook(lambda name, profile: 1 / 0)
+    assert instrumentation.profiled('probe', lambda: 'ok') == 'ok'
+    assert profiles == ['probe']
@@ -0,0 +1,89 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import json_stream
+from http_core import Request
+from json_stream import BodyCache, compress, encode_json, json_stream_response
+from photo_storage import PHOTO_PREFIX
+
+def request(accept_encoding=''):
+    return Request('GET', '/', {'Accept-Encoding': accept_encoding}, io.BytesIO(b''), ('127.0.0.1', 0))
+
+def body_of(response) -> bytes:
+    return response.body if isinstance(response.body, bytes) else b''.join(response.body)
+
+def decode(body: bytes, coding: str):
+    if coding == 'gzip':
+        body = gzip.decompress(body)
+    elif coding == 'br':
+        body = json_stream.brotli.decompress(body)
+    return json.loads(body)
+
+ITEMS = [{'id': i, 'title': f"Photo {i} — ഓണം"} for i in range(5000)]
+
+@pytest.mark.parametrize('fields, items', [({}, []), ({'total': 0}, []), ({'total': 1}, ITEMS[:1]),
+                                           ({'total': 5000, 'next': None}, ITEMS)])
+def test_encode_json_matches_json_dumps(fields, items):
+    chunks = list(encode_json(fields, 'photos', iter(items)))
+    assert json.loads(b''.join(chunks)) == {**fields, 'photos': items}
+    # Chunks are flushed at about FLUSH_BYTES, not held until the end
+    assert all(len(chunk) < 2 * json_stream.FLUSH_BYTES for chunk in chunks)
+
+@pytest.mark.parametrize('coding', json_stream.CODINGS)
+def test_compress_round_trips(coding):
+    assert decode(b''.join(compress(encode_json({}, 'photos', ITEMS), coding)), coding) == {'photos': ITEMS}
+
+def test_body_cache_evicts_least_recently_used_by_size():
+    cache = BodyCache(max_bytes=10)
+    cache.put(('a', 'gzip'), b'1234')
+    cache.put(('b', 'gzip'), b'1234')
+    assert cache.get(('a', 'gzip')) == b'1234'
+    cache.put(('c', 'gzip'), b'1234')
+    assert cache.get(('b', 'gzip')) is None
+    assert cache.size == 8
+    cache.put(('c', 'gzip'), b'12')
+    assert cache.size == 6
+    cache.clear()
+    assert cache.size == 0 and cache.get(('a', 'gzip')) is None
+
+@pytest.mark.parametrize('accept, coding', [('', 'identity'), ('gzip, deflate', 'gzip'), ('gzip;q=0', 'identity')])
+def test_response_is_negotiated_then_cached_per_coding(accept, coding):
+    cache = BodyCache()
+    first = json_stream_response(request(accept), {'total': 3}, 'photos', ITEMS[:3], cache_key='v1', cache=cache)
+    assert ('Content-Encoding', coding) in first.headers or coding == 'identity'
+    assert ('Vary', 'Accept-Encoding') in first.headers
+    body = body_of(first)
+    assert decode(body, coding) == {'total': 3, 'photos': ITEMS[:3]}
+    # The second response is the cached bytes, without touching the items
+    second = json_stream_response(request(accept), {}, 'photos', None, cache_key='v1', cache=cache)
+    assert second.body == body
+    assert cache.size == len(body)
+
+def test_large_bodies_are_not_cached(monkeypatch):
+    monkeypatch.setattr(json_stream, 'CACHE_ENTRY_BYTES', 1000)
+    cache = BodyCache()
+    body_of(json_stream_response(request(), {}, 'photos', ITEMS, cache_key='v1', cache=cache))
+    assert cache.get(('v1', 'identity')) is None and cache.size == 0
+
+@pytest.fixture
+def photos(gallery_storage, load_endpoint, call, monkeypatch):
+    for name in ('cup.jpg', 'medal.jpg'):
+        gallery_storage.put(f"{PHOTO_PREFIX}awards/{name}", iter([b'photo']), 'image/jpeg')
+    json_stream._cache.clear()
+    module = load_endpoint('gallery-photos')
+    monkeypatch.setattr(module, 'get_storage', lambda: gallery_storage)
+    return lambda headers: call(module.endpoint, 'GET', '/api/gallery-photos', headers=headers)
+
+def test_gallery_etag_is_weak_and_revalidates_across_codings(photos):
+    plain = photos({})
+    compressed = photos({'Accept-Encoding': 'gzip'})
+    etag = dict(plain.headers)['ETag']
+    # One validator for every coding of the same JSON, so it mustn't be strong
+    assert etag.startswith('W/"') and dict(compressed.headers)['ETag'] == etag
+    assert decode(body_of(compressed), 'gzip') == json.loads(body_of(plain))
+    assert photos({'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status == 304
+    assert photos({'If-None-Match': etag.removeprefix('W/')}).status == 304
+    assert photos({'If-None-Match': 'W/"other"'}).status == 200
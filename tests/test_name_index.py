@@ -0,0 +1,73 @@
+import json
+import random
+
+import pytest
+
+import name_index
+from admin_auth import issue_token
+from name_index import NameIndex, canonical_name, trigrams
+
+@pytest.mark.parametrize('name, expected', [
+    ('Kerala Blasters F.C.', 'kerala blasters'),
+    ('  KERALA   blasters ', 'kerala blasters'),
+    ('Thiruvananthapuram Café Pvt. Ltd', 'thiruvananthapuram cafe'),
+    ('The Club', 'the club'),
+])
+def test_canonical_name(name, expected):
+    assert canonical_name(name) == expected
+
+def jaccard(a, b):
+    a, b = trigrams(canonical_name(a)), trigrams(canonical_name(b))
+    return len(a & b) / len(a | b)
+
+def test_similar_matches_a_linear_scan():
+    rng = random.Random(3)
+    words = ['kerala', 'kochi', 'malabar', 'blasters', 'strikers', 'united', 'royals', 'tuskers', 'periyar']
+    names = {i: ' '.join(rng.sample(words, rng.randint(1, 3))) for i in range(1, 400)}
+    index = NameIndex()
+    for entry_id, name in names.items():
+        index.add(entry_id, name)
+    for query in ('Kochi Strikers FC', 'malabar united', 'Royals', 'Tuskers of Periyar'):
+        for threshold in (0.4, 0.6, 0.9):
+            expected = sorted(((i, n, round(jaccard(query, n), 3)) for i, n in names.items()
+                               if jaccard(query, n) >= threshold), key=lambda m: (-m[2], m[0]))
+            assert index.similar(query, threshold) == expected
+
+def test_clusters_and_exclude():
+    index = NameIndex()
+    for entry_id, name in enumerate(['Kerala Blasters FC', 'Kochi Strikers', 'kerala blasters',
+                                     'Malabar United', 'Kerala Blasters Club'], start=1):
+        index.add(entry_id, name)
+    index.add(1, 'Something else')  # ids are only indexed once
+    assert index.clusters() == [[1, 3, 5]]
+    assert [m[0] for m in index.similar('Kerala Blasters', exclude=3)] == [1, 5]
+    assert index.clusters(threshold=1.0) == [[1, 3, 5]]
+    assert len(index) == 5
+
+@pytest.fixture
+def indexes(registrations, monkeypatch):
+    monkeypatch.setattr(name_index, '_indexes', {})
+    return registrations
+
+def test_index_syncs_from_the_registration_store(indexes):
+    first = indexes.register('team', {'teamName': 'Kerala Blasters FC', 'captainEmail': 'a@example.com'})
+    assert [m[1] for m in name_index.get_name_index('team').similar('kerala blasters')] == ['Kerala Blasters FC']
+    # Another instance's registration shows up after the next sync
+    second = indexes.register('team', {'teamName': 'Kerala Blasters', 'captainEmail': 'b@example.com'})
+    name_index._indexes['team'].sync(force=True)
+    assert name_index.check_new_name('team', second, 'Kerala Blasters') == [(first, 'Kerala Blasters FC', 1.0)]
+    assert name_index.get_name_index('sponsor').similar('kerala blasters') == []
+
+def test_name_duplicates_endpoint(indexes, load_endpoint, call):
+    indexes.register('sponsor', {'companyName': 'Malabar Traders Pvt Ltd', 'email': 'a@example.com'})
+    indexes.register('sponsor', {'companyName': 'Malabar Traders', 'email': 'b@example.com'})
+    indexes.register('team', {'teamName': 'Malabar Traders XI', 'captainEmail': 'c@example.com'})
+    endpoint = load_endpoint('name-duplicates').endpoint
+    headers = {'Authorization': f"Bearer {issue_token()[0]}"}
+    assert call(endpoint, 'GET', '/api/name-duplicates').status == 401
+    assert call(endpoint, 'GET', '/api/name-duplicates?type=player', headers=headers).status == 400
+    assert call(endpoint, 'GET', '/api/name-duplicates?threshold=2', headers=headers).status == 400
+    response = call(endpoint, 'GET', '/api/name-duplicates?type=sponsor', headers=headers)
+    clusters = json.loads(response.body)['clusters']
+    assert [(c['type'], c['canonical'], len(c['registrations'])) for c in clusters] == [
+        ('sponsor', 'malabar traders', 2)]
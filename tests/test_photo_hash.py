@@ -0,0 +1,94 @@
+import io
+import random
+
+import pytest
+
+import photo_hash
+from photo_hash import PhotoHashIndex, hamming
+
+def flip(value: int, *bits: int) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+def brute_force(hashes, value, threshold, exclude=None):
+    return sorted(((p, hamming(value, v)) for p, v in hashes.items()
+                   if p != exclude and hamming(value, v) <= threshold), key=lambda m: (m[1], m[0]))
+
+def test_similar_matches_a_linear_scan():
+    rng = random.Random(7)
+    index = PhotoHashIndex(threshold=8)
+    base = [rng.getrandbits(64) for _ in range(50)]
+    hashes = {}
+    for i in range(2000):
+        value = flip(base[i % 50], *rng.sample(range(64), rng.randrange(12)))
+        hashes[f"p{i}"] = value
+        index.add(f"p{i}", value)
+    for probe in base[:10] + [rng.getrandbits(64) for _ in range(10)]:
+        for threshold in (3, 8, 11):
+            assert index.similar(probe, threshold) == brute_force(hashes, probe, threshold)
+
+def test_add_replaces_and_remove_forgets():
+    index = PhotoHashIndex(threshold=4)
+    index.add('a', 0)
+    index.add('a', 2 ** 64 - 1)
+    assert index.similar(0) == []
+    assert index.similar(2 ** 64 - 1) == [('a', 0)]
+    index.remove('a')
+    index.remove('missing')
+    assert len(index) == 0 and index.similar(2 ** 64 - 1) == []
+    assert all(not table for table in index._tables)
+
+def test_keeper_groups_only_claim_photos_near_the_keeper():
+    index = PhotoHashIndex(threshold=4)
+    # A chain: each step is 3 bits from the last, the ends 9 bits apart
+    index.add('a', 0)
+    index.add('b', flip(0, 0, 1, 2))
+    index.add('c', flip(0, 0, 1, 2, 3, 4, 5))
+    index.add('d', flip(0, 0, 1, 2, 3, 4, 5, 6, 7, 8))
+    index.add('far', 2 ** 64 - 1)
+    assert index.keeper_groups(['a', 'b', 'c', 'd', 'far']) == [['a', 'b'], ['c', 'd']]
+    # The order decides which photo is kept
+    assert index.keeper_groups(['d', 'c', 'b', 'a']) == [['d', 'c'], ['b', 'a']]
+    # Pathnames outside the order are neither kept nor claimed
+    assert index.keeper_groups(['b', 'c']) == [['b', 'c']]
+
+@pytest.fixture
+def hash_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(photo_hash, 'HASH_DB_PATH', str(tmp_path / 'hashes.db'))
+    monkeypatch.setattr(photo_hash, '_conn', None)
+    monkeypatch.setattr(photo_hash, '_index', None)
+    monkeypatch.setattr(photo_hash, '_last_rowid', 0)
+    monkeypatch.setattr(photo_hash, '_synced_at', 0.0)
+
+def test_remember_find_and_forget(hash_db):
+    photo_hash.remember('gallery/a.jpg', 0)
+    photo_hash.remember('gallery/b.jpg', flip(0, 5))
+    assert photo_hash.find_similar(flip(0, 9)) == [('gallery/a.jpg', 1), ('gallery/b.jpg', 2)]
+    assert photo_hash.find_similar(0, exclude='gallery/a.jpg') == [('gallery/b.jpg', 1)]
+    photo_hash.forget(['gallery/a.jpg'])
+    assert photo_hash.find_similar(0) == [('gallery/b.jpg', 1)]
+
+def test_rows_deleted_elsewhere_are_not_reported(hash_db):
+    photo_hash.remember('gallery/a.jpg', 0)
+    # Another instance deleted the photo; this process's index still has it
+    photo_hash._get_conn().execute('DELETE FROM photo_hashes')
+    assert photo_hash.find_similar(0) == []
+    assert len(photo_hash.get_index()) == 0
+
+def jpeg(image, **options) -> io.BytesIO:
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', **options)
+    buffer.seek(0)
+    return buffer
+
+def test_dhash_survives_reencoding_and_resizing():
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (640, 480), 'white')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 640, 80):
+        draw.rectangle((i, i // 2, i + 40, 480), fill=(i // 3, 90, 200 - i // 4))
+    original = photo_hash.dhash_file(jpeg(image, quality=95))
+    assert hamming(original, photo_hash.dhash_file(jpeg(image, quality=40))) <= 4
+    assert hamming(original, photo_hash.dhash_file(jpeg(image.resize((320, 240))))) <= 4
+    assert hamming(original, photo_hash.dhash_file(jpeg(image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))) > 16
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+
+import pytest
+
+from registration_export import ExportRequestError, export
+from registration_store import RegistrationStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = RegistrationStore(str(tmp_path / 'registrations.db'))
+    store.register('player', {'fullName': 'Arjun', 'email': 'arjun@example.com', 'contactNumber': '9847012345',
+                              'playingPosition': 'Midfielder'})
+    store.register('player', {'fullName': 'Biju', 'email': 'biju@example.com', 'contactNumber': '9847012346',
+                              'playingPosition': 'goalkeeper'})
+    store.register('team', {'teamName': 'Kochi Strikers', 'captainName': 'Rahul', 'captainEmail': 'rahul@example.com',
+                            'captainContact': '9847012347', 'teamMembers': 'Anil, Deepak\nFaisal'})
+    store.register('sponsor', {'companyName': 'Malabar Traders', 'email': 'm@example.com',
+                               'contactNumber': '04842123456', 'sponsorshipLevel': 'gold'})
+    # Stored before sponsorship levels were cleaned
+    store.register('sponsor', {'companyName': 'Periyar Foods', 'email': 'p@example.com',
+                               'contactNumber': '04842123457', 'sponsorshipLevel': 'Gold '})
+    store.register('sponsor', {'companyName': 'Vembanad Boats', 'email': 'v@example.com',
+                               'contactNumber': '04842123458', 'sponsorshipLevel': 'silver'})
+    return store
+
+def ndjson(store, **options) -> list:
+    body = b''.join(export(store, 'ndjson', **options))
+    return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+def names(rows) -> list:
+    return [row.get('fullName') or row.get('teamName') or row.get('companyName') for row in rows]
+
+@pytest.mark.parametrize('level', ['gold', 'Gold', ' GOLD'])
+def test_sponsorship_level_filter_ignores_case(store, level):
+    rows = ndjson(store, kind='sponsor', sponsorship_level=level)
+    assert names(rows) == ['Malabar Traders', 'Periyar Foods']
+
+@pytest.mark.parametrize('position, expected', [('midfielder', ['Arjun']), ('GOALKEEPER', ['Biju']),
+                                                 ('defender', [])])
+def test_playing_position_filter_ignores_case(store, position, expected):
+    assert names(ndjson(store, kind='player', playing_position=position)) == expected
+
+def test_kind_and_date_filters(store):
+    assert names(ndjson(store, kind='team')) == ['Kochi Strikers']
+    assert len(ndjson(store)) == 6
+    assert ndjson(store, since='2000-01-01', until='2999-12-31') == ndjson(store)
+    assert ndjson(store, until='2000-01-01') == []
+
+def test_csv_columns_and_rows(store):
+    body = b''.join(export(store, 'csv', kind='sponsor', sponsorship_level='silver')).decode('utf-8')
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert list(rows[0]) == ['id', 'type', 'createdAt', 'companyName', 'email', 'contactNumber', 'sponsorshipLevel']
+    assert [(row['type'], row['companyName']) for row in rows] == [('sponsor', 'Vembanad Boats')]
+
+def test_members_view_lists_captain_first(store):
+    rows = ndjson(store, view='members')
+    assert [(row['role'], row['playerName']) for row in rows] == [
+        ('captain', 'Rahul'), ('member', 'Anil'), ('member', 'Deepak'), ('member', 'Faisal')]
+
+@pytest.mark.parametrize('options', [
+    {'fmt': 'xml'},
+    {'kind': 'coach'},
+    {'view': 'members', 'kind': 'player'},
+    {'view': 'summary'},
+    {'since': '01/09/2025'},
+])
+def test_invalid_requests(store, options):
+    with pytest.raises(ExportRequestError):
+        export(store, options.pop('fmt', 'csv'), **options)
+
+def test_csv_neutralizes_formulas_but_ndjson_keeps_values(tmp_path):
+    store = RegistrationStore(str(tmp_path / 'registrations.db'))
+    store.register('sponsor', {'companyName': '=HYPERLINK("http://evil.example","x")', 'email': 'e@example.com',
+                               'contactNumber': '+914842123456', 'sponsorshipLevel': '@gold'})
+    store.register('sponsor', {'companyName': '-1+2', 'email': 's@example.com',
+                               'contactNumber': '\t04842123456', 'sponsorshipLevel': 'silver'})
+    body = b''.join(export(store, 'csv', kind='sponsor')).decode('utf-8')
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [(row['companyName'], row['contactNumber'], row['sponsorshipLevel']) for row in rows] == [
+        ('\'=HYPERLINK("http://evil.example","x")', "'+914842123456", "'@gold"),
+        ("'-1+2", "'\t04842123456", 'silver'),
+    ]
+    assert names(ndjson(store)) == ['=HYPERLINK("http://evil.example","x")', '-1+2']
@@ -0,0 +1,95 @@
+import pytest
+
+import registration_store
+from registration_store import (DuplicateRegistration, RegistrationStore, RegistrationStoreError,
+                                StateRegistrationStore, get_registration_store)
+
+PLAYER = {'fullName': 'Arjun', 'email': 'Arjun@Example.com', 'contactNumber': '9847012345',
+          'playingPosition': 'Midfielder'}
+TEAM = {'teamName': 'Kochi  Strikers', 'captainName': 'Rahul', 'captainEmail': 'rahul@example.com',
+        'captainContact': '9847012347'}
+
+@pytest.fixture
+def state_registrations(store):
+    return StateRegistrationStore(store)
+
+@pytest.fixture(params=['sqlite', 'state'])
+def any_store(request, tmp_path, store):
+    if request.param == 'state':
+        return StateRegistrationStore(store)
+    return RegistrationStore(str(tmp_path / 'registrations.db'))
+
+def test_register_and_read_back(any_store):
+    first = any_store.register('player', PLAYER)
+    second = any_store.register('team', TEAM)
+    assert second > first
+    rows = list(any_store.iter_registrations())
+    assert [(row['id'], row['kind'], row['data']) for row in rows] == [(first, 'player', PLAYER), (second, 'team', TEAM)]
+    assert rows[0]['createdAt'].endswith('Z')
+    assert [row['id'] for row in any_store.iter_registrations(after_id=first)] == [second]
+    assert [row['id'] for row in any_store.iter_registrations(kind='team', batch_size=1)] == [second]
+    assert [row['id'] for row in any_store.iter_registrations(playing_position=' midfielder')] == [first]
+    assert list(any_store.iter_registrations(since='2999-01-01T00:00:00Z')) == []
+
+def test_duplicates_are_refused(any_store):
+    any_store.register('team', TEAM)
+    with pytest.raises(DuplicateRegistration) as error:
+        any_store.register('team', dict(TEAM, captainEmail=' RAHUL@example.com'))
+    assert error.value.field == 'email'
+    with pytest.raises(DuplicateRegistration) as error:
+        any_store.register('team', dict(TEAM, teamName='kochi strikers', captainEmail='other@example.com'))
+    assert error.value.field == 'name'
+    # The refused attempt's email wasn't kept
+    any_store.register('team', dict(TEAM, teamName='Thrissur Tuskers', captainEmail='other@example.com'))
+    # Uniqueness is per registration type
+    any_store.register('player', dict(PLAYER, email='rahul@example.com'))
+    assert len(list(any_store.iter_registrations())) == 3
+
+def test_state_store_outage_is_a_store_error(state_registrations, monkeypatch):
+    from state_store import StateStoreError
+
+    def down(ops):
+        raise StateStoreError('down')
+
+    monkeypatch.setattr(state_registrations.store, 'pipeline', down)
+    with pytest.raises(RegistrationStoreError):
+        state_registrations.register('player', PLAYER)
+    with pytest.raises(RegistrationStoreError):
+        list(state_registrations.iter_registrations())
+
+def test_stuck_writer_times_out(tmp_path, monkeypatch):
+    store = RegistrationStore(str(tmp_path / 'registrations.db'))
+    monkeypatch.setattr(store, '_ensure_writer', lambda: None)  # no writer ever commits
+    monkeypatch.setattr(registration_store, 'WRITE_TIMEOUT', 0.05)
+    with pytest.raises(RegistrationStoreError):
+        store.register('player', PLAYER)
+
+@pytest.fixture
+def vercel(monkeypatch):
+    monkeypatch.setattr(registration_store, '_store', None)
+    monkeypatch.setenv('VERCEL', '1')
+    monkeypatch.delenv('REGISTRATION_DB_PATH')
+
+def test_vercel_keeps_registrations_in_redis(vercel, store, monkeypatch):
+    monkeypatch.setenv('STATE_BACKEND', 'redis')
+    assert isinstance(get_registration_store(), StateRegistrationStore)
+
+def test_vercel_without_a_durable_store(vercel):
+    with pytest.raises(RegistrationStoreError):
+        get_registration_store()
+
+def test_unstored_registrations_are_still_accepted_by_email(vercel, load_endpoint, call, monkeypatch):
+    player = load_endpoint('register-player')
+    sent = []
+    monkeypatch.setattr(player, 'notify', lambda *args, **kwargs: sent.append(args[0]) or True)
+    form = dict(PLAYER, email='arjun@example.com')
+    assert call(player.endpoint, 'POST', '/', form).status == 200
+    assert len(sent) == 1
+
+    # Neither stored nor emailed is an error, and doesn't use up the rate limit
+    monkeypatch.setattr(player, 'notify', lambda *args, **kwargs: False)
+    other = load_endpoint('register-team')
+    monkeypatch.setattr(other, 'notify', lambda *args, **kwargs: False)
+    assert call(other.endpoint, 'POST', '/', TEAM).status == 503
+    monkeypatch.setattr(other, 'notify', lambda *args, **kwargs: True)
+    assert call(other.endpoint, 'POST', '/', TEAM).status == 200
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+import security_utils
+from state_store import StateStoreError
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Bucket arithmetic on a controllable clock (counter TTLs still use real time)"""
+    clock = Clock(time.time() // 3600 * 3600)  # the start of a bucket for every window
+    monkeypatch.setattr(security_utils, 'time', clock)
+    return clock
+
+def test_second_submission_in_the_window_is_limited(store, clock):
+    assert security_utils.is_rate_limited('c1', 'register-player') == (False, '')
+    clock.now += 30
+    assert security_utils.is_rate_limited('c1', 'register-player') == (True, 'Please wait 90 seconds before submitting again')
+    # Other clients and other endpoints have their own counters
+    assert security_utils.is_rate_limited('c2', 'register-player') == (False, '')
+    assert security_utils.is_rate_limited('c1', 'register-team') == (False, '')
+
+def test_window_slides_across_bucket_boundaries(store, clock):
+    limit, window = security_utils.ENDPOINT_LIMIT
+    clock.now += window - 1
+    assert not security_utils.is_rate_limited('c1', 'register-player')[0]
+    # A fixed window would allow this one, two seconds later
+    clock.now += 2
+    limited, message = security_utils.is_rate_limited('c1', 'register-player')
+    assert limited
+    assert message == f"Please wait {window - 1} seconds before submitting again"
+    clock.now += window - 2
+    assert security_utils.is_rate_limited('c1', 'register-player')[0]
+    clock.now += 1
+    assert not security_utils.is_rate_limited('c1', 'register-player')[0]
+
+def test_turned_away_attempts_are_not_counted(store, clock):
+    security_utils.is_rate_limited('c1', 'register-player')
+    for _ in range(5):
+        assert security_utils.is_rate_limited('c1', 'register-player')[0]
+    window = security_utils.ENDPOINT_LIMIT[1]
+    assert store.get(security_utils._buckets('rl:c1:register-player', window)[0])[0] == '1'
+    assert store.get(security_utils._buckets('session:c1', security_utils.SESSION_LIMIT[1])[0])[0] == '1'
+
+def test_session_limit_spans_endpoints(store, clock):
+    limit = security_utils.SESSION_LIMIT[0]
+    for i in range(limit):
+        assert security_utils.is_rate_limited('c1', f"endpoint-{i}") == (False, '')
+    limited, message = security_utils.is_rate_limited('c1', 'endpoint-new')
+    assert limited
+    assert message.startswith('Maximum 5 registrations')
+
+def test_concurrent_submissions_let_one_through(store, clock):
+    results = []
+    barrier = threading.Barrier(16)
+
+    def submit():
+        barrier.wait()
+        results.append(security_utils.is_rate_limited('c1', 'register-player')[0])
+
+    threads = [threading.Thread(target=submit) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(False) == 1
+
+def test_store_outage_fails_open(monkeypatch):
+    class Broken:
+        def pipeline(self, ops):
+            raise StateStoreError('down')
+
+    monkeypatch.setattr(security_utils, 'get_store', lambda: Broken())
+    assert security_utils.is_rate_limited('c1', 'register-player') == (False, '')
+
+def test_login_throttle_slides_and_clears(store, clock):
+    limit, window = security_utils.LOGIN_LIMIT
+    for _ in range(limit):
+        assert security_utils.is_login_throttled('c1') == (False, '')
+    assert security_utils.is_login_throttled('c1') == (True, f"Too many login attempts. Please wait {window + window // limit} seconds")
+    # Throttled attempts aren't counted
+    assert store.get(security_utils._buckets('login:c1', window)[0])[0] == str(limit)
+    # Half a window into the next bucket, half of those failures still count
+    clock.now += window * 1.5
+    for _ in range(limit // 2):
+        assert security_utils.is_login_throttled('c1') == (False, '')
+    assert security_utils.is_login_throttled('c1')[0]
+    security_utils.clear_failed_logins('c1')
+    assert security_utils.is_login_throttled('c1') == (False, '')
+
+def test_concurrent_login_attempts_stop_at_the_limit(store, clock):
+    results = []
+    barrier = threading.Barrier(16)
+
+    def attempt():
+        barrier.wait()
+        results.append(security_utils.is_login_throttled('c1')[0])
+
+    threads = [threading.Thread(target=attempt) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(False) == security_utils.LOGIN_LIMIT[0]
+
+@pytest.mark.parametrize('previous, current, limit, elapsed, expected', [
+    (0, 1, 1, 0.0, 120),    # a full bucket only ages out at the end of the next one
+    (1, 0, 1, 0.25, 45),    # the previous bucket's request ages out at the end of this one
+    (3, 1, 3, 0.5, 10),     # 3 * (1 - t) + 1 + 1 <= 3 from t = 2/3
+])
+def test_retry_after(previous, current, limit, elapsed, expected):
+    assert security_utils._retry_after(previous, current, limit, 60, elapsed) == expected
+
+def test_only_accepted_registrations_count(store, registrations, load_endpoint, call):
+    player = load_endpoint('register-player').endpoint
+    form = {'fullName': 'Arjun Kumar', 'contactNumber': '9847012345', 'email': 'arjun@example.com',
+            'playingPosition': 'midfielder'}
+    registrations.register('player', form)
+    # A duplicate is turned away by the store and doesn't use up the window...
+    assert call(player, 'POST', '/', form).status == 409
+    assert call(player, 'POST', '/', {**form, 'email': 'not-an-email'}).status == 400
+    # ...so a corrected submission goes straight through
+    assert call(player, 'POST', '/', {**form, 'email': 'arjun.k@example.com'}).status == 200
+    assert call(player, 'POST', '/', {**form, 'email': 'third@example.com'}).status == 429
+
+def test_refund_lands_in_the_counted_bucket(store, clock):
+    window = security_utils.ENDPOINT_LIMIT[1]
+    attempted_at = clock.now + window - 0.5
+    assert not security_utils.is_rate_limited('c1', 'register-player', attempted_at)[0]
+    clock.now += window  # the request finished in the next bucket
+    security_utils.refund_rate_limit('c1', 'register-player', attempted_at)
+    assert not security_utils.is_rate_limited('c1', 'register-player')[0]
+    current, previous, _ = security_utils._buckets('rl:c1:register-player', window)
+    assert (store.get(current)[0], store.get(previous)[0]) == ('1', '0')
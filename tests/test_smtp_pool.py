@@ -0,0 +1,79 @@
+import smtplib
+
+import pytest
+
+from smtp_pool import SMTPPool
+from smtp_stub import SMTPStub
+
+MESSAGE = ('admin@example.com', ['admin@example.com'], 'Subject: hi\r\n\r\nhello\r\n')
+
+@pytest.fixture
+def stub():
+    with SMTPStub() as stub:
+        yield stub
+
+def pool_for(stub, **options) -> SMTPPool:
+    host, port = stub.address
+    return SMTPPool(host, port, 'user', 'secret', starttls=False, **options)
+
+def test_batches_share_one_session(stub):
+    pool = pool_for(stub)
+    assert pool.send_batch([MESSAGE] * 3) == [None, None, None]
+    assert pool.send_batch([MESSAGE] * 2) == [None, None]
+    pool.close()
+    assert (stub.connections, stub.messages) == (1, 5)
+
+def test_sessions_idle_past_the_limit_are_replaced(stub, monkeypatch):
+    import smtp_pool
+    pool = pool_for(stub)
+    pool.send_batch([MESSAGE])
+    monkeypatch.setattr(smtp_pool, 'MAX_IDLE_SECONDS', -1)
+    pool.send_batch([MESSAGE])
+    assert stub.connections == 2
+
+def test_idle_sessions_are_health_checked(stub, monkeypatch):
+    import smtp_pool
+    pool = pool_for(stub)
+    pool.send_batch([MESSAGE])
+    monkeypatch.setattr(smtp_pool, 'IDLE_CHECK_SECONDS', -1)
+    pool.send_batch([MESSAGE])
+    assert (stub.connections, stub.noops) == (1, 1)
+
+def test_rejected_message_does_not_fail_the_batch(stub, monkeypatch):
+    pool = pool_for(stub)
+    calls = []
+    sendmail = smtplib.SMTP.sendmail
+
+    def flaky(self, *args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise smtplib.SMTPDataError(554, b'Message rejected')
+        return sendmail(self, *args)
+
+    monkeypatch.setattr(smtplib.SMTP, 'sendmail', flaky)
+    results = pool.send_batch([MESSAGE] * 3)
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], smtplib.SMTPDataError)
+    assert (stub.connections, stub.messages) == (1, 2)
+
+def test_dropped_session_is_reconnected_once(stub, monkeypatch):
+    pool = pool_for(stub)
+    sendmail = smtplib.SMTP.sendmail
+    dropped = []
+
+    def drop_once(self, *args):
+        if not dropped:
+            dropped.append(True)
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return sendmail(self, *args)
+
+    monkeypatch.setattr(smtplib.SMTP, 'sendmail', drop_once)
+    assert pool.send_batch([MESSAGE] * 2) == [None, None]
+    assert (stub.connections, stub.messages) == (2, 2)
+
+def test_unreachable_server_fails_every_message():
+    with SMTPStub() as stub:
+        host, port = stub.address
+    pool = SMTPPool(host, port, 'user', 'secret', starttls=False, timeout=2)
+    results = pool.send_batch([MESSAGE] * 2)
+    assert all(isinstance(error, OSError) for error in results)
@@ -0,0 +1,37 @@
+import time
+
+def test_counter_counts_within_its_ttl(store):
+    assert store.incr('c', 60)[0] == 1
+    count, remaining = store.incr('c', 60)
+    assert count == 2
+    assert 0 < remaining <= 60
+
+def test_counter_restarts_after_expiry(store):
+    store.incr('c', 0.05)
+    store.incr('c', 0.05)
+    time.sleep(0.1)
+    assert store.incr('c', 0.05)[0] == 1
+
+def test_counter_always_keeps_a_ttl(store):
+    # Counters expiring mid-increment must come back with a TTL, not as a
+    # permanent key (which would rate limit a client forever)
+    for _ in range(200):
+        count, remaining = store.incr('c', 0.002)
+        assert remaining is not None
+    time.sleep(0.01)
+    assert store.get('c') == (None, None)
+
+def test_pipeline_results_line_up(store):
+    results = store.pipeline([
+        ('add', 'lock', 'a', 10),
+        ('add', 'lock', 'b', 10),
+        ('incr', 'n', None),
+        ('get', 'lock'),
+        ('set', 'k', 'v', None),
+        ('delete', 'lock'),
+        ('get', 'lock'),
+    ])
+    assert results[:3] == [True, False, (1, None)]
+    assert results[3][0] == 'a' and 0 < results[3][1] <= 10
+    assert results[4:] == [None, None, (None, None)]
+    assert store.get('k') == ('v', None)
@@ -0,0 +1,56 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import static_payload
+from http_core import Request
+from static_payload import StaticPayload
+
+PAYLOAD = {'categories': [{'value': f"category-{i}", 'label': f"Category {i}"} for i in range(50)]}
+
+def get(target, headers=None):
+    return target.respond(Request('GET', '/', headers or {}, io.BytesIO(b''), ('127.0.0.1', 0)))
+
+@pytest.mark.parametrize('accept, coding', [('', 'identity'), ('gzip', 'gzip'), ('gzip;q=0, identity', 'identity'),
+                                           ('*', 'br' if static_payload.brotli else 'gzip')])
+def test_serves_the_negotiated_precompressed_body(accept, coding):
+    payload = StaticPayload(PAYLOAD)
+    response = get(payload, {'Accept-Encoding': accept})
+    headers = dict(response.headers)
+    assert headers.get('Content-Encoding', 'identity') == coding
+    assert headers['Vary'] == 'Accept-Encoding'
+    body = response.body
+    if coding == 'gzip':
+        body = gzip.decompress(body)
+    elif coding == 'br':
+        body = static_payload.brotli.decompress(body)
+    assert json.loads(body) == PAYLOAD
+
+def test_etag_is_weak_and_revalidates_any_coding():
+    payload = StaticPayload(PAYLOAD)
+    etags = {dict(get(payload, {'Accept-Encoding': accept}).headers)['ETag'] for accept in ('', 'gzip', 'br')}
+    assert etags == {payload.etag} and payload.etag.startswith('W/"')
+    response = get(payload, {'If-None-Match': f'"other", {payload.etag}', 'Accept-Encoding': 'gzip'})
+    assert (response.status, response.body) == (304, b'')
+    assert ('Cache-Control', payload.cache_control) in response.headers
+    # The ETag follows the content
+    assert StaticPayload({'categories': []}).etag != payload.etag
+    assert StaticPayload(dict(PAYLOAD)).etag == payload.etag
+
+def test_codings_that_dont_shrink_the_body_are_skipped():
+    payload = StaticPayload(b'{}')
+    assert list(payload.bodies) == ['identity']
+    assert 'Content-Encoding' not in dict(get(payload, {'Accept-Encoding': 'gzip, br'}).headers)
+
+def test_cache_control():
+    payload = StaticPayload(PAYLOAD, max_age=60, s_maxage=600)
+    assert payload.cache_control == 'public, max-age=60, s-maxage=600, stale-while-revalidate=60'
+
+def test_static_endpoint(load_endpoint, call):
+    endpoint = load_endpoint('gallery-categories').endpoint
+    response = call(endpoint, 'GET', '/api/gallery-categories')
+    assert response.status == 200
+    assert response.body == endpoint.payload.bodies['identity']
+    assert call(endpoint, 'POST', '/api/gallery-categories').status == 405
@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+
+import traffic_capture
+from http_core import Endpoint, Request, json_response
+
+@pytest.fixture
+def capture(tmp_path, monkeypatch):
+    """Capture enabled into a fresh file; returns a reader for its lines"""
+    path = tmp_path / 'traffic.jsonl'
+    monkeypatch.setattr(traffic_capture, 'CAPTURE_PATH', str(path))
+    monkeypatch.setattr(traffic_capture, '_file', None)
+    yield lambda: [json.loads(line) for line in path.read_text().splitlines()]
+    if traffic_capture._file is not None:
+        traffic_capture._file.close()
+
+def post(request):
+    request.json()
+    return json_response({'success': True})
+
+ENDPOINT = Endpoint('register-player', {'POST': post})
+
+def send(body: dict, ip='203.0.113.7', target='/api/register-player?limit=5&cursor=abc', chunked=False):
+    raw = json.dumps(body).encode()
+    headers = {'x-forwarded-for': f"{ip}, 10.0.0.1", 'user-agent': 'Mozilla/5.0'}
+    if chunked:
+        headers['Transfer-Encoding'] = 'chunked'
+        raw = f"{len(raw):x}\r\n".encode() + raw + b'\r\n0\r\n\r\n'
+    else:
+        headers['Content-Length'] = str(len(raw))
+    return ENDPOINT.dispatch(Request('POST', target, headers, io.BytesIO(raw), ('127.0.0.1', 0)))
+
+def test_disabled_without_a_path():
+    assert not traffic_capture.enabled()
+
+def test_records_pseudonymized_traces(capture):
+    send({'email': 'Arjun@Example.com ', 'fullName': 'Arjun'})
+    send({'captainEmail': 'arjun@example.com'}, ip='198.51.100.2', chunked=True)
+    send({'fullName': 'no email'})
+    first, second, third = capture()
+    assert first['endpoint'] == 'register-player' and first['method'] == 'POST'
+    assert first['status'] == 200 and first['duration_ms'] >= 0
+    # Only whitelisted query parameters are kept
+    assert first['query'] == {'limit': '5'}
+    assert first['body_size'] > 0 and second['body_size'] is None
+    # The same email or client maps to the same token; different clients don't
+    assert first['email'] == second['email'] and third['email'] is None
+    assert first['ua'] == second['ua'] and first['ip'] != second['ip']
+    assert first['ip'] == traffic_capture.pseudonym('203.0.113.7')
+
+def test_no_raw_identifiers_reach_the_file(capture, tmp_path):
+    send({'email': 'arjun@example.com', 'fullName': 'Arjun Kumar'})
+    text = (tmp_path / 'traffic.jsonl').read_text()
+    for raw in ('arjun', 'Arjun', '203.0.113.7', 'Mozilla'):
+        assert raw not in text
+
+def test_write_errors_dont_fail_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_capture, 'CAPTURE_PATH', str(tmp_path / 'missing' / 'traffic.jsonl'))
+    monkeypatch.setattr(traffic_capture, '_file', None)
+    assert send({'email': 'arjun@example.com'}).status == 200
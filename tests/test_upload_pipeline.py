@@ -0,0 +1,51 @@
+import pytest
+
+import gallery_manifest
+from http_core import HTTPError
+from photo_storage import PHOTO_PREFIX
+from upload_pipeline import upload_multipart
+
+BOUNDARY = 'test-boundary'
+
+def multipart(fields: dict, filename: str, data: bytes) -> bytes:
+    parts = [f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+             for name, value in fields.items()]
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b'\r\n')
+    return b''.join(parts) + f'--{BOUNDARY}--\r\n'.encode()
+
+def pieces(body: bytes, size: int = 7):
+    return iter([body[i:i + size] for i in range(0, len(body), size)])
+
+@pytest.fixture
+def storage(gallery_storage):
+    return gallery_storage
+
+def test_upload_is_stored_and_listed(storage):
+    body = multipart({'title': 'Final Whistle', 'category': 'awards'}, 'IMG_1.jpg', b'\xff\xd8photo-bytes')
+    result = upload_multipart(storage, pieces(body), f'multipart/form-data; boundary={BOUNDARY}')
+    assert result['pathname'].startswith(f"{PHOTO_PREFIX}awards/final-whistle-")
+    assert result['category'] == 'awards'
+    assert result['size'] == len(b'\xff\xd8photo-bytes')
+    assert result['id'] == 1
+    assert storage.read(result) == b'\xff\xd8photo-bytes'
+    assert gallery_manifest.read(storage).photos[result['pathname']]['id'] == 1
+
+def test_identical_upload_is_rejected(storage):
+    body = multipart({}, 'a.jpg', b'same bytes')
+    first = upload_multipart(storage, pieces(body), f'multipart/form-data; boundary={BOUNDARY}')
+    with pytest.raises(HTTPError) as error:
+        upload_multipart(storage, pieces(body), f'multipart/form-data; boundary={BOUNDARY}')
+    assert error.value.status == 409
+    assert error.value.extra == {'existing': first['pathname']}
+    assert [b['pathname'] for b in storage.iter_blobs(PHOTO_PREFIX)] == [first['pathname']]
+
+@pytest.mark.parametrize('body, content_type, status', [
+    (multipart({}, 'notes.txt', b'x'), 'multipart/form-data', 400),
+    (multipart({'title': 'x'}, 'notes.txt', b'x').replace(b'filename="notes.txt"', b''), None, 400),
+    (multipart({}, 'empty.jpg', b''), None, 400),
+])
+def test_bad_uploads(storage, body, content_type, status):
+    with pytest.raises(HTTPError) as error:
+        upload_multipart(storage, pieces(body), content_type or f'multipart/form-data; boundary={BOUNDARY}')
+    assert error.value.status == status
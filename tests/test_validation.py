@@ -0,0 +1,73 @@
+import pytest
+
+from validation import FORBIDDEN_MESSAGE, REGISTRATION_SCHEMAS, first_error
+
+VALID = {
+    'player': {'fullName': 'Arjun Kumar', 'contactNumber': '+91 98470 12345',
+               'email': 'arjun@example.com', 'playingPosition': 'midfielder'},
+    'team': {'teamName': 'Kochi Strikers', 'captainName': 'Rahul Nair', 'captainContact': '9847012345',
+             'captainEmail': 'rahul@example.com', 'teamMembers': 'Anil, Biju, Deepak'},
+    'sponsor': {'companyName': 'Malabar Traders', 'contactNumber': '04842 123456',
+                'email': 'partners@malabar.example.com', 'sponsorshipLevel': 'gold'},
+}
+
+@pytest.mark.parametrize('kind', sorted(VALID))
+def test_valid_registrations_pass(kind):
+    assert REGISTRATION_SCHEMAS[kind].validate(VALID[kind]) == {}
+
+def test_every_error_is_reported_at_once():
+    errors = REGISTRATION_SCHEMAS['player'].validate({'fullName': 'x' * 101, 'email': 'not-an-email',
+                                                      'contactNumber': 12345})
+    assert errors == {
+        'fullName': 'Name too long (max 100 characters)',
+        'contactNumber': 'contactNumber must be text',
+        'email': 'Invalid email format',
+        'playingPosition': 'playingPosition is required',
+    }
+    assert first_error(errors) == 'Name too long (max 100 characters)'
+
+@pytest.mark.parametrize('field, value, message', [
+    ('teamName', 'ab', 'Team name must be at least 3 characters'),
+    ('teamName', 'Spam United', 'Please use a proper team name'),
+    ('teamName', '   ', 'teamName is required'),
+    ('captainContact', '12-34', 'Invalid phone number format'),
+    ('captainName', '<b>Rahul</b>', FORBIDDEN_MESSAGE),
+    ('teamMembers', 'Anil onclick=alert(1)', FORBIDDEN_MESSAGE),
+])
+def test_team_field_errors(field, value, message):
+    assert REGISTRATION_SCHEMAS['team'].validate(dict(VALID['team'], **{field: value})) == {field: message}
+
+def test_names_that_merely_contain_on_are_allowed():
+    assert REGISTRATION_SCHEMAS['player'].validate(dict(VALID['player'], fullName='Simon Onam')) == {}
+
+def test_non_dict_input():
+    assert REGISTRATION_SCHEMAS['sponsor'].validate(['gold']) == {'': 'Invalid data'}
+
+@pytest.mark.parametrize('level', ['Gold', ' GOLD ', 'gold'])
+def test_sponsorship_level_is_case_insensitive_and_cleaned(level):
+    schema = REGISTRATION_SCHEMAS['sponsor']
+    data = dict(VALID['sponsor'], sponsorshipLevel=level)
+    assert schema.validate(data) == {}
+    cleaned = schema.clean(data)
+    assert cleaned['sponsorshipLevel'] == 'gold'
+    assert cleaned['companyName'] == 'Malabar Traders'
+    assert data['sponsorshipLevel'] == level  # the input isn't modified
+
+def test_unknown_sponsorship_level():
+    errors = REGISTRATION_SCHEMAS['sponsor'].validate(dict(VALID['sponsor'], sponsorshipLevel='platinum'))
+    assert errors == {'sponsorshipLevel': 'Invalid sponsorship level'}
+
+def test_validate_many_reports_invalid_records_by_index():
+    records = [VALID['player'], dict(VALID['player'], email='bad'), {}]
+    results = REGISTRATION_SCHEMAS['player'].validate_many(records)
+    assert [index for index, _ in results] == [1, 2]
+    assert results[0][1] == {'email': 'Invalid email format'}
+
+@pytest.mark.parametrize('level, immediate', [('Gold', True), (' TITLE', True), ('Silver', False)])
+def test_top_sponsors_are_emailed_immediately_whatever_the_case(load_endpoint, monkeypatch, level, immediate):
+    sponsor = load_endpoint('register-sponsor')
+    sent = []
+    monkeypatch.setattr(sponsor, 'notify', lambda *args, immediate=False: sent.append(immediate) or True)
+    data = REGISTRATION_SCHEMAS['sponsor'].clean(dict(VALID['sponsor'], sponsorshipLevel=level))
+    assert sponsor.send_email(data)
+    assert sent == [immediate]
@@ -0,0 +1,553 @@
+"""
+In-process benchmark suite for the API hot paths.
+
+Drives the endpoint handler classes through fake sockets and times the
+helpers behind them: client ids, rate-limit checks as the state store
+grows, input validation, gallery listing JSON and notification MIME
+construction. Gallery handlers run against tools/blob_stub on loopback.
+Results are written to / compared with a JSON baseline:
+
+    python tools/bench.py --save                 # record tools/bench_baseline.json
+    python tools/bench.py                        # compare, exit 1 on regression
+    python tools/bench.py --filter rate_limit --quick
+    python tools/bench.py --filter import --import-report
+"""
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(TOOLS_DIR, '..', 'api')
+DEFAULT_BASELINE = os.path.join(TOOLS_DIR, 'bench_baseline.json')
+
+# Keep benchmark state out of the real spool/database files
+_scratch = tempfile.mkdtemp(prefix='onam-bench-')
+os.environ.update({
+    'STATE_BACKEND': 'memory',
+    'REGISTRATION_DB_PATH': os.path.join(_scratch, 'registrations.db'),
+    'EMAIL_SPOOL_PATH': os.path.join(_scratch, 'spool.db'),
+    'PHOTO_HASH_DB_PATH': os.path.join(_scratch, 'photo-hashes.db'),
+    'UPLOAD_STAGING_DIR': os.path.join(_scratch, 'uploads'),
+    # Time the upload path itself, not Pillow re-encoding
+    'GALLERY_VARIANTS': '0',
+    'PHOTO_DEDUP': '0',
+})
+for _name in ('SES_SMTP_HOST', 'BLOB_READ_WRITE_TOKEN', 'GALLERY_STORAGE'):
+    os.environ.pop(_name, None)
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, TOOLS_DIR)
+
+import state_store  # noqa: E402
+from email_queue import build_message  # noqa: E402
+from gallery_index import GalleryListing, photo_from_blob  # noqa: E402
+from security_utils import ENDPOINT_LIMIT, SESSION_LIMIT, _buckets, get_client_id, is_rate_limited  # noqa: E402
+from validation import REGISTRATION_SCHEMAS  # noqa: E402
+
+def load_endpoint(name: str):
+    """Import api/<name>.py (file names aren't valid module names)"""
+    spec = importlib.util.spec_from_file_location(f"bench_{name.replace('-', '_')}", os.path.join(API_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class FakeSocket:
+    """Just enough of a socket for BaseHTTPRequestHandler: one request in, bytes out"""
+
+    def __init__(self, request: bytes):
+        self._in = io.BytesIO(request)
+        self._out = io.BytesIO()
+
+    def makefile(self, mode, *args, **kwargs):
+        return self._in if 'r' in mode else self._out
+
+    def sendall(self, data: bytes):
+        self._out.write(data)
+
+    def setsockopt(self, *args):
+        pass  # handlers set TCP_NODELAY
+
+    def response(self) -> bytes:
+        return self._out.getvalue()
+
+class _FakeServer:
+    pass
+
+def drive(handler_class, method: str, path: str, body: bytes = b'', headers: Optional[dict] = None) -> bytes:
+    """Run one request through a handler class; returns the raw response"""
+    lines = [f"{method} {path} HTTP/1.1", "Host: bench"]
+    lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+    if body:
+        lines.append(f"Content-Length: {len(body)}")
+    sock = FakeSocket(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    handler_class(sock, ('127.0.0.1', 0), _FakeServer())
+    return sock.response()
+
+# --- Benchmarks ---
+#
+# Each benchmark is a setup function returning the operation to time. The
+# runner calibrates the loop count so one repeat takes ~MIN_REPEAT_SECONDS.
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+QUICK_SKIP = set()
+
+def benchmark(name: str, slow: bool = False):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        if slow:
+            QUICK_SKIP.add(name)
+        return setup
+    return register
+
+HEADERS = {'X-Forwarded-For': '203.0.113.7', 'User-Agent': 'Mozilla/5.0 (bench)'}
+
+@benchmark('client_id')
+def bench_client_id():
+    return lambda: get_client_id(HEADERS)
+
+def _rate_limit_setup(clients: int):
+    # Fill a dedicated store with one endpoint counter and one session
+    # counter per client, then probe random existing clients
+    store = state_store.MemoryStore(max_entries=clients * 2 + 1000)
+    batch = []
+    for i in range(clients):
+        batch += [('set', _buckets(f"rl:c{i:07d}:register-player", ENDPOINT_LIMIT[1])[0], '1', 2 * ENDPOINT_LIMIT[1]),
+                  ('set', _buckets(f"session:c{i:07d}", SESSION_LIMIT[1])[0], '1', 2 * SESSION_LIMIT[1])]
+        if len(batch) >= 2000:
+            store.pipeline(batch)
+            batch = []
+    if batch:
+        store.pipeline(batch)
+    state_store._default_store = store
+    probes = [f"c{(i * 7919) % clients:07d}" for i in range(1024)]
+    counter = iter(range(1 << 62))
+    return lambda: is_rate_limited(probes[next(counter) & 1023], 'register-player')
+
+for _clients, _slow in ((1_000, False), (100_000, False), (1_000_000, True)):
+    benchmark(f"rate_limit[{_clients}]", slow=_slow)(lambda n=_clients: _rate_limit_setup(n))
+
+VALID = {
+    'player': {'fullName': 'Arjun Kumar', 'contactNumber': '+91 98470 12345',
+               'email': 'arjun@example.com', 'playingPosition': 'midfielder'},
+    'team': {'teamName': 'Kochi Strikers', 'captainName': 'Rahul Nair', 'captainContact': '9847012345',
+             'captainEmail': 'rahul@example.com', 'teamMembers': 'Anil, Biju, Deepak, Faisal, Girish, Hari'},
+    'sponsor': {'companyName': 'Malabar Traders', 'contactNumber': '04842 123456',
+                'email': 'partners@malabar.example.com', 'sponsorshipLevel': 'gold'},
+}
+
+for _kind in VALID:
+    benchmark(f"validate[{_kind}]")(lambda kind=_kind: (lambda: REGISTRATION_SCHEMAS[kind].validate(VALID[kind])))
+
+def _listing(count: int) -> GalleryListing:
+    categories = ['tournament', 'practice', 'venue', 'awards', 'team']
+    blobs = [{
+        'url': f"https://blob.example.com/tournament-photos/{categories[i % 5]}/photo-{i:06d}.jpg",
+        'pathname': f"tournament-photos/{categories[i % 5]}/photo-{i:06d}.jpg",
+        'size': 2_000_000 + i,
+        'uploadedAt': '2025-08-30T10:00:00.000Z',
+    } for i in range(count)]
+    return GalleryListing([photo_from_blob(blob, i) for i, blob in enumerate(blobs)])
+
+for _count, _slow in ((10, False), (1_000, False), (10_000, False), (100_000, True)):
+    def _serialize(count=_count):
+        listing = _listing(count)
+        payload = {'photos': listing.photos, 'total': count, 'nextCursor': None, 'hasMore': False}
+        return lambda: json.dumps(payload)
+
+    def _parse(count=_count):
+        listing = _listing(count)
+        body = json.dumps({'photos': listing.photos, 'total': count, 'nextCursor': None, 'hasMore': False})
+        return lambda: json.loads(body)
+
+    benchmark(f"gallery_json_dumps[{_count}]", slow=_slow)(_serialize)
+    benchmark(f"gallery_json_loads[{_count}]", slow=_slow)(_parse)
+
+def _stream_setup(count: int, coding: str):
+    # Full streamed gallery body (encode + compress), as sent on a cache miss
+    from json_stream import compress, encode_json
+    photos = _listing(count).photos
+    return lambda: sum(len(chunk) for chunk in compress(encode_json({'total': count}, 'photos', photos), coding))
+
+for _coding in ('identity', 'gzip'):
+    benchmark(f"gallery_stream[{_coding}:10000]")(lambda coding=_coding: _stream_setup(10_000, coding))
+
+def _manifest_setup(count: int, decode: bool):
+    from gallery_manifest import Manifest
+    manifest = Manifest().apply(_listing(count).photos)
+    if decode:
+        data = manifest.encode()
+        return lambda: Manifest.decode(data)
+    return manifest.encode
+
+benchmark('gallery_manifest_encode[10000]')(lambda: _manifest_setup(10_000, False))
+benchmark('gallery_manifest_decode[10000]')(lambda: _manifest_setup(10_000, True))
+
+def _search_setup(count: int):
+    # Uncached query: category posting list narrowed by a title prefix
+    from gallery_search import PhotoIndex
+    index = PhotoIndex(_listing(count))
+
+    def run():
+        index._cache.clear()
+        return index.search(category='awards', query='photo 00')
+    return run
+
+for _count, _slow in ((10_000, False), (100_000, True)):
+    benchmark(f"gallery_search[{_count}]", slow=_slow)(lambda n=_count: _search_setup(n))
+
+def _photo_hash_setup(count: int):
+    # Random 64-bit hashes; probes are existing hashes with a few bits
+    # flipped, so every lookup finds (at least) its source photo
+    import random
+    from photo_hash import PhotoHashIndex
+    rng = random.Random(22)
+    index = PhotoHashIndex()
+    values = [rng.getrandbits(64) for _ in range(count)]
+    for i, value in enumerate(values):
+        index.add(f"tournament-photos/tournament/photo-{i:06d}.jpg", value)
+    probes = [values[rng.randrange(count)] ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+              for _ in range(1024)]
+    counter = iter(range(1 << 62))
+    return lambda: index.similar(probes[next(counter) & 1023])
+
+for _count in (10_000, 100_000):
+    benchmark(f"photo_hash_lookup[{_count}]")(lambda n=_count: _photo_hash_setup(n))
+
+@benchmark('instrumentation[observe]')
+def bench_observe():
+    # Per-request metrics cost: four timed phases, histograms and Server-Timing
+    import instrumentation
+
+    def run():
+        timings = []
+        for phase in ('rate_limit', 'parse', 'validate', 'store'):
+            with instrumentation.PhaseTimer(timings, phase):
+                pass
+        instrumentation.observe('bench', 200, 0.0042, timings)
+        return instrumentation.server_timing(0.0042, timings)
+    return run
+
+@benchmark('mime[player]')
+def bench_mime():
+    # send_email() renders the body and hands it to the queue; time that
+    # plus the MIME construction the worker does for it
+    module = load_endpoint('register-player')
+    module.notify = lambda subject, body, *args, **kwargs: build_message('admin@example.com', subject, body).as_string()
+    return lambda: module.send_email(VALID['player'])
+
+@benchmark('handler[gallery-categories]')
+def bench_categories():
+    handler_class = load_endpoint('gallery-categories').handler
+    return lambda: drive(handler_class, 'GET', '/api/gallery-categories')
+
+@benchmark('handler[register-player:preflight]')
+def bench_preflight():
+    handler_class = load_endpoint('register-player').handler
+    return lambda: drive(handler_class, 'OPTIONS', '/api/register-player')
+
+@benchmark('handler[register-player:invalid]')
+def bench_register_invalid():
+    handler_class = load_endpoint('register-player').handler
+    state_store._default_store = state_store.MemoryStore()
+    body = json.dumps({'fullName': 'Arjun Kumar', 'email': 'not-an-email'}).encode()
+    return lambda: drive(handler_class, 'POST', '/api/register-player', body, HEADERS)
+
+@benchmark('handler[register-player:success]')
+def bench_register_success():
+    # Full path: rate limit check, validation, durable insert, email enqueue.
+    # Each request uses a new client and email so none is limited or a duplicate.
+    module = load_endpoint('register-player')
+    module.notify = lambda subject, body, *args, **kwargs: True
+    state_store._default_store = state_store.MemoryStore(max_entries=10_000_000)
+    counter = iter(range(1 << 62))
+
+    def run():
+        i = next(counter)
+        body = json.dumps(dict(VALID['player'], email=f"player{i}@example.com")).encode()
+        return drive(module.handler, 'POST', '/api/register-player', body,
+                     {'X-Forwarded-For': f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 'User-Agent': f"bench-{i}"})
+    return run
+
+def _register_setup(kind: str, unique: Callable[[int], dict]):
+    # Like register-player:success; team and sponsor also run the name index
+    module = load_endpoint(f"register-{kind}")
+    module.notify = lambda subject, body, *args, **kwargs: True
+    state_store._default_store = state_store.MemoryStore(max_entries=10_000_000)
+    counter = iter(range(1 << 62))
+
+    def run():
+        i = next(counter)
+        body = json.dumps(dict(VALID[kind], **unique(i))).encode()
+        return drive(module.handler, 'POST', f"/api/register-{kind}", body,
+                     {'X-Forwarded-For': f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 'User-Agent': f"bench-{i}"})
+    return run
+
+benchmark('handler[register-team:success]')(lambda: _register_setup(
+    'team', lambda i: {'teamName': f"Bench Team {i}", 'captainEmail': f"captain{i}@example.com"}))
+benchmark('handler[register-sponsor:success]')(lambda: _register_setup(
+    'sponsor', lambda i: {'companyName': f"Bench Traders {i}", 'email': f"sponsor{i}@example.com",
+                          'sponsorshipLevel': 'silver'}))
+
+def _login_setup(password: str):
+    # A new client per request, so failures never reach the login throttle
+    module = load_endpoint('admin-login')
+    state_store._default_store = state_store.MemoryStore(max_entries=10_000_000)
+    body = json.dumps({'password': password}).encode()
+    counter = iter(range(1 << 62))
+    return lambda: drive(module.handler, 'POST', '/api/admin-login', body,
+                         {'X-Forwarded-For': '203.0.113.7', 'User-Agent': f"bench-{next(counter)}"})
+
+benchmark('handler[admin-login:success]')(lambda: _login_setup(os.getenv('ADMIN_PASSWORD', 'admin123')))
+benchmark('handler[admin-login:wrong]')(lambda: _login_setup('not-the-password'))
+
+GALLERY_PHOTOS = 1000
+_blob_stub = None
+
+def _gallery_setup():
+    """A blob stub seeded with GALLERY_PHOTOS photos and the API pointed at it, with no cached gallery"""
+    global _blob_stub
+    import blob_client
+    import gallery_index
+    import gallery_manifest
+    from blob_stub import BlobStub
+    if _blob_stub is not None:
+        _blob_stub.stop()
+    _blob_stub = BlobStub().start()
+    _blob_stub.seed(GALLERY_PHOTOS)
+    blob_client.BLOB_API_URL = _blob_stub.url
+    os.environ['BLOB_READ_WRITE_TOKEN'] = 'bench-token'
+    state_store._default_store = state_store.MemoryStore()
+    gallery_manifest._cached = None
+    gallery_index.invalidate()
+    return _blob_stub
+
+def _admin_headers() -> dict:
+    from admin_auth import issue_token
+    return {'Authorization': f"Bearer {issue_token()[0]}"}
+
+def _gallery_photos_setup(mode: str):
+    import gallery_index
+    import gallery_manifest
+    import json_stream
+    _gallery_setup()
+    handler_class = load_endpoint('gallery-photos').handler
+    path = '/api/gallery-photos?limit=50'
+    headers = {'Accept-Encoding': 'gzip'}
+    response = drive(handler_class, 'GET', path, headers=headers)  # builds the manifest
+    etag = next(line.split(b': ', 1)[1].decode() for line in response.split(b'\r\n')
+                if line.lower().startswith(b'etag:'))
+
+    if mode == 'cold':
+        # A fresh instance: read the manifest from storage and encode the page
+        def run():
+            gallery_manifest._cached = None
+            gallery_index.invalidate()
+            json_stream._cache.clear()
+            return drive(handler_class, 'GET', path, headers=headers)
+        return run
+    if mode == '304':
+        return lambda: drive(handler_class, 'GET', path, headers=dict(headers, **{'If-None-Match': etag}))
+    return lambda: drive(handler_class, 'GET', path, headers=headers)
+
+for _mode in ('cold', 'warm', '304'):
+    benchmark(f"handler[gallery-photos:{_mode}]")(lambda mode=_mode: _gallery_photos_setup(mode))
+
+@benchmark('handler[gallery-upload]')
+def bench_upload():
+    # One small photo per request (distinct bytes, so none is a duplicate):
+    # multipart parse, streamed blob PUT and a manifest version
+    _gallery_setup()
+    handler_class = load_endpoint('gallery-upload').handler
+    headers = dict(_admin_headers(), **{'Content-Type': 'multipart/form-data; boundary=bench'})
+    counter = iter(range(1 << 62))
+
+    def run():
+        i = next(counter)
+        body = (b'--bench\r\nContent-Disposition: form-data; name="category"\r\n\r\npractice\r\n'
+                b'--bench\r\nContent-Disposition: form-data; name="file"; filename="IMG_%d.jpg"\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' % i + b'\xff\xd8' + os.urandom(16) * 256 + b'\r\n--bench--\r\n')
+        return drive(handler_class, 'POST', '/api/gallery-upload', body, headers)
+    return run
+
+@benchmark('handler[gallery-delete]')
+def bench_delete():
+    # Delete one photo per request; it is put back in the stub (no HTTP) first
+    stub = _gallery_setup()
+    handler_class = load_endpoint('gallery-delete').handler
+    headers = dict(_admin_headers(), **{'Content-Type': 'application/json'})
+    pathname = 'tournament-photos/practice/bench-delete.jpg'
+    body = json.dumps({'pathname': pathname}).encode()
+    drive(load_endpoint('gallery-photos').handler, 'GET', '/api/gallery-photos')  # builds the manifest
+
+    def run():
+        stub.add(pathname, size=1024)
+        return drive(handler_class, 'DELETE', '/api/gallery-delete', body, headers)
+    return run
+
+# --- Cold start ---
+#
+# import[<endpoint>] loads one endpoint module in a fresh interpreter, as a
+# serverless cold start does, and times it. Run under -X importtime, so
+# --import-report can break the time down by module.
+
+IMPORT_ENDPOINTS = ('register-player', 'admin-login', 'gallery-categories', 'gallery-photos',
+                    'gallery-upload', 'metrics')
+IMPORT_MARKER = '-- endpoint import --'
+_IMPORT_SCRIPT = f"""
+import importlib.util, sys, time
+sys.path.insert(0, sys.argv[1])
+sys.stderr.write({IMPORT_MARKER!r} + '\\n')
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('endpoint', f'{{sys.argv[1]}}/{{sys.argv[2]}}.py')
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(time.perf_counter() - start)
+"""
+
+def parse_importtime(text: str) -> List[Tuple[int, int, int, str]]:
+    """(self us, cumulative us, nesting depth, module) per -X importtime line"""
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, module.strip()))
+    return entries
+
+def cold_import(name: str) -> Tuple[float, List[Tuple[int, int, int, str]]]:
+    """(seconds to load api/<name>.py, imports it triggered)"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _IMPORT_SCRIPT, API_DIR, name],
+                          capture_output=True, text=True, check=True)
+    return float(proc.stdout.split()[-1]), parse_importtime(proc.stderr.split(IMPORT_MARKER, 1)[1])
+
+def measure_import(name: str, repeats: int) -> dict:
+    samples = [cold_import(name)[0] for _ in range(repeats)]
+    return {'ns_per_op': round(statistics.median(samples) * 1e9, 1),
+            'best_ns': round(min(samples) * 1e9, 1), 'loops': 1}
+
+def import_report(name: str, top: int = 8):
+    seconds, entries = cold_import(name)
+    print(f"\n{name}: {seconds * 1000:.1f} ms to load, {len(entries)} modules imported")
+    # Depth 0 is what the endpoint and its api/ helpers import directly
+    for self_us, cumulative_us, _, module in sorted((e for e in entries if e[2] == 0), key=lambda e: -e[1])[:top]:
+        print(f"  {module:<36}{cumulative_us / 1000:>9.2f} ms")
+
+IMPORT_BENCHMARKS = {f"import[{name}]": name for name in IMPORT_ENDPOINTS}
+
+# --- Runner ---
+
+MIN_REPEAT_SECONDS = 0.2
+
+def _time(operation: Callable[[], object], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        operation()
+    return time.perf_counter() - start
+
+def measure(operation: Callable[[], object], repeats: int) -> dict:
+    """Median and best time per operation over `repeats` calibrated loops"""
+    # Like timeit: collector pauses land on random samples and swamp the
+    # difference we're looking for
+    gc.collect()
+    gc.disable()
+    try:
+        loops, elapsed = 1, _time(operation, 1)
+        while elapsed < MIN_REPEAT_SECONDS / 4:
+            loops *= 4
+            elapsed = _time(operation, loops)
+        loops = max(1, round(loops * MIN_REPEAT_SECONDS / elapsed))
+
+        samples = [_time(operation, loops) / loops for _ in range(repeats)]
+    finally:
+        gc.enable()
+    return {'ns_per_op': round(statistics.median(samples) * 1e9, 1),
+            'best_ns': round(min(samples) * 1e9, 1), 'loops': loops}
+
+def run(names: List[str], repeats: int) -> Dict[str, dict]:
+    results = {}
+    for name in names:
+        # Handlers log every request and the email path prints; keep the table readable
+        if name in IMPORT_BENCHMARKS:
+            results[name] = measure_import(IMPORT_BENCHMARKS[name], repeats)
+        else:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                operation = BENCHMARKS[name]()
+                results[name] = measure(operation, repeats)
+        print(f"{name:<40}{format_ns(results[name]['ns_per_op']):>14}", flush=True)
+    return results
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Names of benchmarks slower than baseline by more than `tolerance`"""
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline':>14}{'now':>14}{'ratio':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<40}{'-':>14}{format_ns(result['ns_per_op']):>14}{'new':>8}")
+            continue
+        ratio = result['ns_per_op'] / before['ns_per_op']
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<40}{format_ns(before['ns_per_op']):>14}{format_ns(result['ns_per_op']):>14}{ratio:>7.2f}x{flag}")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='skip the 1M-client and 100k-photo cases')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before failing (0.25 = 25%%)')
+    parser.add_argument('--import-report', action='store_true', help='per-module cold import breakdown')
+    args = parser.parse_args()
+
+    names = [n for n in list(BENCHMARKS) + list(IMPORT_BENCHMARKS)
+             if args.filter in n and not (args.quick and n in QUICK_SKIP)]
+    results = run(names, args.repeats)
+    if args.import_report:
+        for name in names:
+            if name in IMPORT_BENCHMARKS:
+                import_report(IMPORT_BENCHMARKS[name])
+
+    if args.save:
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                existing = json.load(f).get('results', {})
+        existing.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': f"{platform.system()} {platform.machine()}",
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'results': dict(sorted(existing.items())),
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
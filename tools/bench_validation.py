@@ -0,0 +1,107 @@
+"""
+Micro-benchmark for registration input validation.
+
+Times the previous validate_input/validate_team_input/validate_sponsor_input
+chain (kept here verbatim as the baseline) against the compiled schemas in
+api/validation.py, per request and in batch mode.
+
+    python tools/bench_validation.py --iterations 50000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from validation import REGISTRATION_SCHEMAS  # noqa: E402
+
+SAMPLES = {
+    'player': {'fullName': 'Arjun Kumar', 'contactNumber': '+91 98470 12345',
+               'email': 'arjun.kumar@example.com', 'playingPosition': 'midfielder'},
+    # The old team check read `email` and `contactNumber`, so the team
+    # sample carries them too for the baseline to pass
+    'team': {'teamName': 'Kochi Strikers', 'captainName': 'Rahul Nair', 'captainContact': '9847012345',
+             'captainEmail': 'rahul@example.com', 'email': 'rahul@example.com', 'contactNumber': '9847012345',
+             'teamMembers': 'Anil, Biju, Deepak, Faisal, Girish, Hari, Jithin, Kiran, Manu, Nikhil, Pranav'},
+    'sponsor': {'companyName': 'Malabar Traders', 'contactNumber': '04842 123456',
+                'email': 'partners@malabar.example.com', 'sponsorshipLevel': 'gold'},
+}
+
+# --- Baseline: the pre-schema implementation ---
+
+def legacy_validate_input(data, required_fields):
+    for field in required_fields:
+        if not data.get(field) or not data[field].strip():
+            return False, f"{field} is required"
+    email = data.get('email', '').strip()
+    if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+        return False, "Invalid email format"
+    phone = data.get('contactNumber', '').strip()
+    if not re.match(r'^[\d\s\+\-\(\)]{10,15}$', phone):
+        return False, "Invalid phone number format"
+    if len(data.get('fullName', '')) > 100:
+        return False, "Name too long (max 100 characters)"
+    dangerous_chars = ['<', '>', 'script', 'javascript:', 'on']
+    for field, value in data.items():
+        if isinstance(value, str):
+            value_lower = value.lower()
+            if any(char in value_lower for char in dangerous_chars):
+                return False, "Invalid characters detected"
+    return True, ""
+
+def legacy_team(data):
+    is_valid, error = legacy_validate_input(data, ['teamName', 'captainName', 'captainContact', 'captainEmail'])
+    if not is_valid:
+        return False, error
+    team_name = data.get('teamName', '').strip()
+    if len(team_name) < 3 or len(team_name) > 50:
+        return False, "length"
+    if any(word in team_name.lower() for word in ['test', 'fake', 'spam', 'bot']):
+        return False, "Please use a proper team name"
+    return True, ""
+
+def legacy_sponsor(data):
+    is_valid, error = legacy_validate_input(data, ['contactNumber', 'email', 'companyName', 'sponsorshipLevel'])
+    if not is_valid:
+        return False, error
+    company_name = data.get('companyName', '').strip()
+    if len(company_name) < 2 or len(company_name) > 100:
+        return False, "length"
+    if data.get('sponsorshipLevel', '').lower().strip() not in ['title', 'gold', 'silver', 'bronze', 'supporting']:
+        return False, "Invalid sponsorship level"
+    return True, ""
+
+LEGACY = {
+    'player': lambda d: legacy_validate_input(d, ['fullName', 'contactNumber', 'email', 'playingPosition']),
+    'team': legacy_team,
+    'sponsor': legacy_sponsor,
+}
+
+def per_call_us(func, data, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(data)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50000)
+    args = parser.parse_args()
+
+    # Samples avoid "on" anywhere (the old check rejected names like
+    # "Menon") so both sides validate the whole record
+    print(f"{'schema':<10}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for kind, data in SAMPLES.items():
+        assert LEGACY[kind](data)[0] and not REGISTRATION_SCHEMAS[kind].validate(data), kind
+        before = per_call_us(LEGACY[kind], data, args.iterations)
+        after = per_call_us(REGISTRATION_SCHEMAS[kind].validate, data, args.iterations)
+        print(f"{kind:<10}{before:>14.2f}{after:>14.2f}{before / after:>9.1f}x")
+
+    records = [SAMPLES['sponsor']] * args.iterations
+    start = time.perf_counter()
+    invalid = REGISTRATION_SCHEMAS['sponsor'].validate_many(records)
+    elapsed = time.perf_counter() - start
+    print(f"batch: {len(records)} sponsor records in {elapsed * 1000:.1f} ms "
+          f"({len(records) / elapsed:,.0f}/s, {len(invalid)} invalid)")
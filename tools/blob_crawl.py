@@ -0,0 +1,52 @@
+"""
+Crawl a seeded local blob stub and check the listing client end to end.
+
+Lists the whole gallery through one prefix, then per category folder in
+parallel, and checks that both crawls see every blob.
+
+    python tools/blob_crawl.py --photos 20000 --latency 0.02 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from blob_stub import CATEGORIES, BlobStub  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--photos', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with BlobStub(latency=args.latency) as stub:
+        stub.seed(args.photos)
+        os.environ['BLOB_API_URL'] = stub.url
+        import blob_client
+
+        start = time.perf_counter()
+        first_blob_at = None
+        serial = 0
+        for _ in blob_client.iter_blobs('local-token', 'tournament-photos/'):
+            if first_blob_at is None:
+                first_blob_at = time.perf_counter() - start
+            serial += 1
+        serial_time = time.perf_counter() - start
+
+        prefixes = [f'tournament-photos/{category}/' for category in CATEGORIES]
+        start = time.perf_counter()
+        parallel = sum(1 for _ in blob_client.iter_prefixes('local-token', prefixes, args.workers))
+        parallel_time = time.perf_counter() - start
+
+    print(f"serial:   {serial} blobs in {serial_time:.3f}s (first blob after {first_blob_at * 1000:.1f} ms)")
+    print(f"parallel: {parallel} blobs in {parallel_time:.3f}s across {len(prefixes)} prefixes")
+    print(f"list calls: {stub.requests}")
+    if serial != args.photos or parallel != args.photos:
+        print("MISMATCH: crawl did not return every blob")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Local stand-in for the Vercel Blob API.
+
+Serves GET /list?prefix=&cursor=&limit= with the same blobs/cursor/hasMore
+shape as the real service, from an in-memory set of blobs, and accepts
+streamed PUT /<pathname> uploads (x-allow-overwrite: 0 makes an existing
+pathname a 409) and POST /delete. Uploaded bodies are kept and served at
+the blob's url (GET /files/<pathname>); seeded photos have no body. Point
+the API at it with BLOB_API_URL.
+
+    python tools/blob_stub.py --port 3001 --photos 5000 --latency 0.05
+"""
+import argparse
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = ['tournament', 'practice', 'venue', 'awards', 'team']
+
+class _BlobAPI(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    # Headers and body are separate writes; with Nagle on, every keep-alive
+    # response would wait out the client's delayed ACK (~40ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.requests += 1
+        url = urlparse(self.path)
+        if url.path.startswith('/files/'):
+            self._send_file(url.path[len('/files/'):])
+            return
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if url.path.rstrip('/') not in ('', '/list'):
+            self._send_json(404, {'error': 'not found'})
+            return
+        query = parse_qs(url.query)
+        prefix = query.get('prefix', [''])[0]
+        limit = int(query.get('limit', ['1000'])[0])
+        cursor = query.get('cursor', [''])[0]
+
+        with stub.lock:
+            pathnames = stub.pathnames
+            start = bisect.bisect_left(pathnames, prefix)
+            if cursor:
+                start = max(start, bisect.bisect_right(pathnames, cursor))
+            page = []
+            index = start
+            while index < len(pathnames) and len(page) < limit and pathnames[index].startswith(prefix):
+                page.append(stub.blobs[pathnames[index]])
+                index += 1
+            has_more = index < len(pathnames) and pathnames[index].startswith(prefix)
+
+        self._send_json(200, {
+            'blobs': page,
+            'cursor': page[-1]['pathname'] if has_more else None,
+            'hasMore': has_more,
+        })
+
+    def _send_file(self, pathname):
+        stub = self.server.stub
+        with stub.lock:
+            data = stub.bodies.get(pathname) if pathname in stub.blobs else None
+        if data is None:
+            self._send_json(404, {'error': 'not found'})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        """Consume the request body and return it"""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                chunk_size = int(self.rfile.readline().split(b';')[0], 16)
+                if chunk_size == 0:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(chunk_size))
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length)
+
+    def do_PUT(self):
+        stub = self.server.stub
+        pathname = urlparse(self.path).path.lstrip('/')
+        data = self._read_body()
+        with stub.lock:
+            stub.requests += 1
+            exists = pathname in stub.blobs
+        if exists and self.headers.get('x-allow-overwrite') == '0':
+            self._send_json(409, {'error': {'code': 'bad_request', 'message': 'This blob already exists'}})
+            return
+        stub.add(pathname, size=len(data), data=data)
+        with stub.lock:
+            blob = dict(stub.blobs[pathname])
+        blob['contentType'] = self.headers.get('x-content-type', 'application/octet-stream')
+        self._send_json(200, blob)
+
+    def do_POST(self):
+        stub = self.server.stub
+        if urlparse(self.path).path != '/delete':
+            self._send_json(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        urls = json.loads(self.rfile.read(length) or b'{}').get('urls', [])
+        with stub.lock:
+            stub.requests += 1
+            stub.delete_calls += 1
+            for url in urls:
+                pathname = url.split('/files/', 1)[-1]
+                if stub.blobs.pop(pathname, None) is not None:
+                    stub.pathnames.remove(pathname)
+                    stub.bodies.pop(pathname, None)
+        self._send_json(200, {})
+
+class BlobStub:
+    """Threaded fake blob store with start()/stop() and a request counter"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.delete_calls = 0
+        self.blobs = {}
+        self.bodies = {}
+        self.pathnames = []
+        self._server = ThreadingHTTPServer((host, port), _BlobAPI)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def add(self, pathname: str, size: int = 0, uploaded_at: str = '2025-08-30T10:00:00.000Z',
+            data: Optional[bytes] = None):
+        with self.lock:
+            if data is not None:
+                self.bodies[pathname] = data
+            else:
+                self.bodies.pop(pathname, None)
+            if pathname not in self.blobs:
+                bisect.insort(self.pathnames, pathname)
+            self.blobs[pathname] = {
+                'url': f"{self.url}/files/{pathname}",
+                'downloadUrl': f"{self.url}/files/{pathname}?download=1",
+                'pathname': pathname,
+                'size': size,
+                'uploadedAt': uploaded_at,
+            }
+
+    def seed(self, count: int, prefix: str = 'tournament-photos/'):
+        """Spread `count` photos across the category folders"""
+        for i in range(count):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            self.add(f"{prefix}{category}/photo-{i:06d}.jpg", size=2_000_000 + i)
+
+    def start(self) -> 'BlobStub':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--photos', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every list call')
+    args = parser.parse_args()
+
+    stub = BlobStub(args.host, args.port, args.latency).start()
+    stub.seed(args.photos)
+    print(f"Blob stub with {args.photos} photos on {stub.url} (set BLOB_API_URL)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,105 @@
+"""
+Find near-duplicate gallery photos by perceptual hash.
+
+Hashes every photo in the configured storage (Vercel Blob or the local
+folder) across a process pool, records the hashes in the photo hash
+database used by the upload check, and reports, for each photo kept, the
+later photos within the Hamming threshold of it. With --delete, those
+later photos are removed along with their variants.
+
+On Vercel the upload check's hash database is per instance (see
+api/photo_hash.py), so this is the pass that compares every photo with
+every other.
+
+    python tools/photo_dedupe.py --workers 8
+    python tools/photo_dedupe.py --threshold 6 --delete --json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+import photo_hash  # noqa: E402
+from photo_storage import get_storage  # noqa: E402
+
+_storage = None
+
+def _hash_photo(photo: dict) -> Tuple[str, Optional[int], Optional[str]]:
+    # Runs in a worker process; each one opens its own storage client
+    global _storage
+    if _storage is None:
+        _storage = get_storage()
+    try:
+        return photo['pathname'], photo_hash.dhash_file(io.BytesIO(_storage.read(photo))), None
+    except Exception as e:
+        return photo['pathname'], None, str(e)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threshold', type=int, default=photo_hash.HAMMING_THRESHOLD)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--rehash', action='store_true', help='hash photos already in the database again')
+    parser.add_argument('--delete', action='store_true', help='delete the later photos near each kept one')
+    parser.add_argument('--json', action='store_true', help='print groups as JSON')
+    args = parser.parse_args()
+
+    if not photo_hash.enabled():
+        sys.exit('Pillow is not installed (or PHOTO_DEDUP=0)')
+    storage = get_storage()
+    if storage is None:
+        sys.exit('No photo storage configured')
+
+    from gallery_index import fetch_listing
+    photos = {photo['pathname']: photo for photo in fetch_listing(storage).photos}
+    index = photo_hash.get_index()
+    todo = [photo for pathname, photo in photos.items() if args.rehash or pathname not in index.hashes]
+
+    start = time.perf_counter()
+    failed = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for pathname, value, error in executor.map(_hash_photo, todo, chunksize=16):
+                if value is None:
+                    print(f"{pathname}: {error}", file=sys.stderr)
+                    failed += 1
+                else:
+                    photo_hash.remember(pathname, value)
+    hash_time = time.perf_counter() - start
+
+    # Hashes of photos that have since been deleted don't count
+    stale = [pathname for pathname in index.hashes if pathname not in photos]
+    photo_hash.forget(stale)
+
+    # Oldest first, so each group keeps its oldest photo
+    order = sorted(photos, key=lambda p: (photos[p]['date'], photos[p]['id']))
+    groups = index.keeper_groups(order, args.threshold)
+    print(f"hashed {len(todo) - failed} of {len(photos)} photos in {hash_time:.1f}s "
+          f"({failed} failed), {len(groups)} groups within {args.threshold} bits", file=sys.stderr)
+
+    results = []
+    if args.delete and groups:
+        from gallery_bulk import bulk_delete
+        extras = {pathname: photos[pathname] for group in groups for pathname in group[1:]}
+        results = bulk_delete(storage, extras)
+
+    if args.json:
+        print(json.dumps({'threshold': args.threshold, 'groups': groups, 'deleted': results}, indent=2))
+    else:
+        for group in groups:
+            keep, *rest = group
+            print(keep)
+            for pathname in rest:
+                distance = photo_hash.hamming(index.hashes[keep], index.hashes[pathname])
+                print(f"  {distance:2d}  {pathname}")
+        for result in results:
+            if result['status'] != 'deleted':
+                print(f"{result['pathname']}: {result['status']}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
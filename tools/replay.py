@@ -0,0 +1,275 @@
+"""
+Replay captured (or synthesized) traffic against the whole API.
+
+Mounts every api/ endpoint in one local ThreadingHTTPServer (server.py),
+with the SMTP and blob stubs standing in for SES and Vercel Blob, then
+replays a trace at a chosen speed and reports throughput, per-endpoint
+latency percentiles and the 429 rate.
+
+Traces are the JSON lines written with TRAFFIC_CAPTURE_PATH set (see
+api/traffic_capture.py). Without one, --synthesize builds a
+registration-day style burst:
+
+    python tools/replay.py --trace capture.jsonl --speed 4
+    python tools/replay.py --synthesize 5000 --rate 200 --clients 800 --json report.json
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..'))
+
+from blob_stub import BlobStub  # noqa: E402
+from smtp_stub import SMTPStub  # noqa: E402
+
+# Endpoint mix for synthesized traces (weights), roughly registration day
+SYNTHETIC_MIX = {
+    'register-player': 45,
+    'register-team': 10,
+    'register-sponsor': 3,
+    'gallery-photos': 30,
+    'gallery-categories': 12,
+}
+
+def load_trace(path: str) -> List[dict]:
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e['ts'])
+    return entries
+
+def synthesize(count: int, rate: float, clients: int, duplicate_rate: float = 0.02, seed: int = 1) -> List[dict]:
+    """Poisson arrivals at `rate` req/s from `clients` distinct clients"""
+    rng = random.Random(seed)
+    endpoints, weights = zip(*SYNTHETIC_MIX.items())
+    entries, ts, emails = [], 0.0, []
+    for i in range(count):
+        ts += rng.expovariate(rate)
+        endpoint = rng.choices(endpoints, weights)[0]
+        client = rng.randrange(clients)
+        entry = {'ts': ts, 'endpoint': endpoint, 'ip': f"ip{client}", 'ua': f"ua{client % 50}",
+                 'method': 'POST' if endpoint.startswith('register-') else 'GET', 'query': {}}
+        if endpoint.startswith('register-'):
+            if emails and rng.random() < duplicate_rate:
+                entry['email'] = rng.choice(emails)
+            else:
+                entry['email'] = f"e{i}"
+                emails.append(entry['email'])
+        elif endpoint == 'gallery-photos':
+            entry['query'] = {'limit': '60'}
+        entries.append(entry)
+    return entries
+
+def _digits(token: str, length: int = 10) -> str:
+    return str(int(hashlib.sha1(token.encode()).hexdigest(), 16))[:length]
+
+def build_body(entry: dict) -> Optional[dict]:
+    """A valid request body for the entry; the email token decides duplicates"""
+    endpoint, token = entry['endpoint'], entry.get('email') or f"anon{id(entry)}"
+    email = f"{token}@replay.example.com"
+    phone = '9' + _digits(token, 9)
+    if endpoint == 'register-player':
+        return {'fullName': f"Player {token}", 'contactNumber': phone, 'email': email,
+                'playingPosition': 'midfielder'}
+    if endpoint == 'register-team':
+        return {'teamName': f"Club {_digits(token, 8)}", 'captainName': 'Replay Captain',
+                'captainContact': phone, 'captainEmail': email}
+    if endpoint == 'register-sponsor':
+        return {'companyName': f"Company {_digits(token, 8)}", 'contactNumber': phone, 'email': email,
+                'sponsorshipLevel': 'silver'}
+    if entry.get('method') in ('POST', 'PUT', 'DELETE') and entry.get('body_size'):
+        return {'padding': 'x' * max(0, entry['body_size'] - 15)}
+    return None
+
+def client_ip(token: str) -> str:
+    n = int(_digits(token, 9))
+    return f"10.{n % 256}.{n // 256 % 256}.{n // 65536 % 256}"
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+        self.lateness: List[float] = []
+
+    def add(self, endpoint: str, status: int, latency: float, late: float):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(latency)
+            counts = self.statuses.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+            self.lateness.append(late)
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def replay(base_host: str, base_port: int, entries: List[dict], speed: float, workers: int) -> dict:
+    recorder = Recorder()
+    local = threading.local()
+
+    def connection() -> http.client.HTTPConnection:
+        if getattr(local, 'conn', None) is None:
+            local.conn = http.client.HTTPConnection(base_host, base_port, timeout=30)
+        return local.conn
+
+    def send(entry: dict, due: float):
+        late = max(0.0, time.perf_counter() - due)
+        body = build_body(entry)
+        payload = json.dumps(body).encode() if body is not None else None
+        path = f"/api/{entry['endpoint']}"
+        if entry.get('query'):
+            path += '?' + '&'.join(f"{k}={v}" for k, v in entry['query'].items())
+        headers = {'X-Forwarded-For': client_ip(entry['ip']), 'User-Agent': f"replay-{entry['ua']}"}
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                conn = connection()
+                conn.request(entry.get('method', 'GET'), path, payload, headers)
+                response = conn.getresponse()
+                response.read()
+                if response.will_close:
+                    conn.close()
+                    local.conn = None
+                status = response.status
+                break
+            except (OSError, http.client.HTTPException):
+                # Stale keep-alive connection; retry once on a fresh one
+                local.conn = None
+                status = 0
+        recorder.add(entry['endpoint'], status, time.perf_counter() - start, late)
+
+    origin = entries[0]['ts'] if entries else 0.0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for entry in entries:
+            due = start + (entry['ts'] - origin) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, entry, due)
+    elapsed = time.perf_counter() - start
+    return report(recorder, elapsed)
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    total = limited = errors = 0
+    for endpoint, samples in sorted(recorder.samples.items()):
+        samples.sort()
+        statuses = recorder.statuses[endpoint]
+        count = len(samples)
+        endpoints[endpoint] = {
+            'requests': count,
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p90_ms': round(percentile(samples, 90) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            'max_ms': round(samples[-1] * 1000, 2),
+            'rate_429': round(statuses.get(429, 0) / count, 4),
+            'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        }
+        total += count
+        limited += statuses.get(429, 0)
+        errors += sum(v for k, v in statuses.items() if k == 0 or k >= 500)
+    lateness = sorted(recorder.lateness)
+    return {
+        'requests': total,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'rate_429': round(limited / total, 4) if total else 0.0,
+        'errors': errors,
+        # How far behind schedule requests were sent (client-side saturation)
+        'schedule_lag_p99_ms': round(percentile(lateness, 99) * 1000, 2),
+        'endpoints': endpoints,
+    }
+
+def print_report(result: dict):
+    print(f"\n{result['requests']} requests in {result['elapsed_s']}s: {result['throughput_rps']} req/s, "
+          f"429 rate {result['rate_429']:.1%}, {result['errors']} errors, "
+          f"schedule lag p99 {result['schedule_lag_p99_ms']} ms")
+    print(f"\n{'endpoint':<22}{'reqs':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'429':>8}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"{endpoint:<22}{stats['requests']:>7}{stats['p50_ms']:>9}{stats['p90_ms']:>9}"
+              f"{stats['p99_ms']:>9}{stats['max_ms']:>9}{stats['rate_429']:>8.1%}")
+
+def start_environment(photos: int, smtp_delay: float, blob_latency: float):
+    """Start the stubs and point the API's environment at them (before importing api/)"""
+    scratch = tempfile.mkdtemp(prefix='onam-replay-')
+    smtp = SMTPStub(handshake_delay=smtp_delay).start()
+    blob = BlobStub(latency=blob_latency).start()
+    blob.seed(photos)
+    host, port = smtp.address
+    os.environ.update({
+        'SENDER_EMAIL': 'admin@replay.example.com',
+        'SES_SMTP_USERNAME': 'replay', 'SES_SMTP_PASSWORD': 'replay',
+        'SES_SMTP_HOST': host, 'SES_SMTP_PORT': str(port), 'SES_SMTP_STARTTLS': '0',
+        'BLOB_API_URL': blob.url, 'BLOB_READ_WRITE_TOKEN': 'replay-token',
+        'EMAIL_SPOOL_PATH': os.path.join(scratch, 'spool.db'),
+        'REGISTRATION_DB_PATH': os.path.join(scratch, 'registrations.db'),
+        'STATE_BACKEND': os.getenv('STATE_BACKEND', 'memory'),
+        'STATE_SQLITE_PATH': os.path.join(scratch, 'state.db'),
+        'UPLOAD_STAGING_DIR': os.path.join(scratch, 'uploads'),
+    })
+    os.environ.pop('GALLERY_STORAGE', None)
+    os.environ.pop('TRAFFIC_CAPTURE_PATH', None)  # don't capture the replay itself
+    return smtp, blob
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--trace', help='JSON-lines capture from TRAFFIC_CAPTURE_PATH')
+    source.add_argument('--synthesize', type=int, metavar='N', help='generate N requests instead')
+    parser.add_argument('--rate', type=float, default=100.0, help='synthetic arrival rate (req/s)')
+    parser.add_argument('--clients', type=int, default=500, help='distinct synthetic clients')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier')
+    parser.add_argument('--workers', type=int, default=64, help='concurrent client connections')
+    parser.add_argument('--photos', type=int, default=2000, help='photos seeded into the blob stub')
+    parser.add_argument('--smtp-delay', type=float, default=0.05, help='SMTP handshake delay (s)')
+    parser.add_argument('--blob-latency', type=float, default=0.03, help='blob list latency (s)')
+    parser.add_argument('--json', help='also write the report here')
+    args = parser.parse_args()
+
+    smtp, blob = start_environment(args.photos, args.smtp_delay, args.blob_latency)
+    import server  # noqa: E402  (reads the environment set above)
+
+    entries = load_trace(args.trace) if args.trace else synthesize(args.synthesize, args.rate, args.clients)
+    endpoints = server.load_endpoints()
+    httpd = server.make_server('127.0.0.1', 0, endpoints)
+    httpd.RequestHandlerClass.log_message = lambda *a: None
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address
+
+    span = (entries[-1]['ts'] - entries[0]['ts']) / args.speed if entries else 0
+    print(f"Replaying {len(entries)} requests over ~{span:.1f}s against {len(endpoints)} endpoints "
+          f"(speed x{args.speed})", flush=True)
+    result = replay(host, port, entries, args.speed, args.workers)
+
+    # Let the email queue drain so the SMTP numbers mean something
+    registered = sum(stats['statuses'].get('200', 0) for name, stats in result['endpoints'].items()
+                     if name.startswith('register-'))
+    deadline = time.time() + 10
+    while time.time() < deadline and smtp.messages < registered:
+        time.sleep(0.1)
+    result['smtp'] = {'connections': smtp.connections, 'messages': smtp.messages}
+    result['blob_requests'] = blob.requests
+    print_report(result)
+    print(f"\nSMTP stub: {smtp.messages} messages over {smtp.connections} connections; "
+          f"blob stub: {blob.requests} requests")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    httpd.shutdown()
+    smtp.stop()
+    blob.stop()
@@ -0,0 +1,186 @@
+"""
+Local Redis-protocol stand-in for testing the shared state backend.
+
+Implements the handful of commands RedisStore uses (PING, AUTH, SELECT,
+GET, SET with NX/XX/PX/EX, INCR, INCRBY, DECR, DEL, EXISTS, PTTL, PEXPIRE,
+DBSIZE, FLUSHALL, and MULTI/EXEC/DISCARD transactions) on one in-memory
+keyspace.
+
+    python tools/resp_stub.py --port 6390
+    STATE_BACKEND=redis REDIS_URL=redis://127.0.0.1:6390/0 ...
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class _Keyspace:
+    def __init__(self):
+        self.data = {}  # key -> (value bytes, expires_at or None)
+        self.lock = threading.Lock()
+
+    def live(self, key, now=None):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= (now or time.time()):
+            del self.data[key]
+            return None
+        return entry
+
+def _bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+def _int(value):
+    return b':%d\r\n' % value
+
+class _RESPSession(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True  # replies are small writes; don't wait for ACKs
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.strip().split()  # inline command
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        keyspace = self.server.keyspace
+        queued = None  # commands inside MULTI, run together at EXEC
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            name = args[0].upper().decode()
+            if name == 'MULTI':
+                reply = b'-ERR MULTI calls can not be nested\r\n' if queued is not None else b'+OK\r\n'
+                queued = [] if queued is None else queued
+            elif name in ('EXEC', 'DISCARD'):
+                if queued is None:
+                    reply = b'-ERR %s without MULTI\r\n' % name.encode()
+                elif name == 'DISCARD':
+                    reply = b'+OK\r\n'
+                else:
+                    # Like Redis, the whole transaction sees one clock reading
+                    with keyspace.lock:
+                        now = time.time()
+                        replies = [self._execute(keyspace, n, a, now) for n, a in queued]
+                    reply = b'*%d\r\n' % len(replies) + b''.join(replies)
+                queued = None
+            elif queued is not None:
+                queued.append((name, args[1:]))
+                reply = b'+QUEUED\r\n'
+            else:
+                with keyspace.lock:
+                    reply = self._execute(keyspace, name, args[1:])
+            self.wfile.write(reply)
+
+    def _execute(self, ks, name, args, now=None):
+        now = now or time.time()
+        if name == 'PING':
+            return b'+PONG\r\n'
+        if name in ('AUTH', 'SELECT'):
+            return b'+OK\r\n'
+        if name == 'FLUSHALL':
+            ks.data.clear()
+            return b'+OK\r\n'
+        if name == 'DBSIZE':
+            return _int(sum(1 for k in list(ks.data) if ks.live(k, now)))
+        if name == 'GET':
+            entry = ks.live(args[0], now)
+            return _bulk(entry[0] if entry else None)
+        if name == 'SET':
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            expires_at = None
+            for i, option in enumerate(options):
+                if option == b'PX':
+                    expires_at = now + int(args[2 + i + 1]) / 1000
+                elif option == b'EX':
+                    expires_at = now + int(args[2 + i + 1])
+            exists = ks.live(key, now) is not None
+            if (b'NX' in options and exists) or (b'XX' in options and not exists):
+                return _bulk(None)
+            ks.data[key] = (value, expires_at)
+            return b'+OK\r\n'
+        if name in ('INCR', 'INCRBY', 'DECR'):
+            entry = ks.live(args[0], now)
+            try:
+                value = int(entry[0]) if entry else 0
+                value += int(args[1]) if name == 'INCRBY' else 1 if name == 'INCR' else -1
+            except ValueError:
+                return b'-ERR value is not an integer or out of range\r\n'
+            ks.data[args[0]] = (str(value).encode(), entry[1] if entry else None)
+            return _int(value)
+        if name == 'DEL':
+            return _int(sum(1 for key in args if ks.live(key, now) and ks.data.pop(key)))
+        if name == 'EXISTS':
+            return _int(sum(1 for key in args if ks.live(key, now)))
+        if name == 'PTTL':
+            entry = ks.live(args[0], now)
+            if entry is None:
+                return _int(-2)
+            return _int(-1 if entry[1] is None else int((entry[1] - now) * 1000))
+        if name == 'PEXPIRE':
+            entry = ks.live(args[0], now)
+            if entry is None:
+                return _int(0)
+            ks.data[args[0]] = (entry[0], now + int(args[1]) / 1000)
+            return _int(1)
+        return b'-ERR unknown command \'%s\'\r\n' % name.encode()
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class RESPStub:
+    """Threaded Redis-protocol server with start()/stop()"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self._server = _Server((host, port), _RESPSession)
+        self._server.keyspace = _Keyspace()
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> 'RESPStub':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+
+    stub = RESPStub(args.host, args.port).start()
+    print(f"RESP stub listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
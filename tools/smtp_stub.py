@@ -0,0 +1,123 @@
+"""
+Local SMTP stand-in for offline testing of the email queue and pool.
+
+Speaks just enough SMTP (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, NOOP,
+RSET, QUIT) for smtplib. Plain text only, so run the API with
+SES_SMTP_STARTTLS=0 when pointing it here.
+
+    python tools/smtp_stub.py --port 2525 --handshake-delay 0.2
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class _SMTPSession(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write((line + '\r\n').encode('ascii'))
+
+    def handle(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.connections += 1
+        if stub.handshake_delay:
+            time.sleep(stub.handshake_delay)  # stands in for TLS + auth round trips
+        self._reply('220 onam-smtp-stub ESMTP ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb in ('EHLO', 'HELO'):
+                self.wfile.write(b'250-onam-smtp-stub\r\n250 AUTH PLAIN LOGIN\r\n')
+            elif verb == 'AUTH':
+                if command.upper().startswith('AUTH LOGIN'):
+                    self._reply('334 VXNlcm5hbWU6')
+                    self.rfile.readline()
+                    self._reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                self._reply('235 Authentication successful')
+            elif verb in ('MAIL', 'RCPT', 'RSET'):
+                self._reply('250 OK')
+            elif verb == 'NOOP':
+                with stub.lock:
+                    stub.noops += 1
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b'.\r\n':
+                        break
+                    size += len(data_line)
+                if stub.message_delay:
+                    time.sleep(stub.message_delay)
+                with stub.lock:
+                    stub.messages += 1
+                    stub.bytes_received += size
+                self._reply('250 OK queued')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class SMTPStub:
+    """Threaded SMTP sink with start()/stop() and delivery counters"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 handshake_delay: float = 0.0, message_delay: float = 0.0):
+        self.handshake_delay = handshake_delay
+        self.message_delay = message_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.noops = 0
+        self.bytes_received = 0
+        self._server = _Server((host, port), _SMTPSession)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self) -> 'SMTPStub':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--handshake-delay', type=float, default=0.0)
+    parser.add_argument('--message-delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = SMTPStub(args.host, args.port, args.handshake_delay, args.message_delay).start()
+    print(f"SMTP stub listening on {args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"connections={stub.connections} messages={stub.messages} noops={stub.noops}")
+    except KeyboardInterrupt:
+        stub.stop()
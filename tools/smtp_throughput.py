@@ -0,0 +1,66 @@
+"""
+Measure notification throughput against the local SMTP stub.
+
+Compares one fresh connection per message (the old send_email path) with
+the pooled session used by the email queue.
+
+    python tools/smtp_throughput.py --messages 200 --handshake-delay 0.05
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from email_queue import build_message  # noqa: E402
+from smtp_pool import SMTPPool  # noqa: E402
+from smtp_stub import SMTPStub  # noqa: E402
+
+SENDER = 'admin@example.com'
+
+def _messages(count: int):
+    return [(SENDER, [SENDER], build_message(SENDER, f"Registration {i}", f"<p>Player {i}</p>").as_string())
+            for i in range(count)]
+
+def run_fresh(host: str, port: int, messages) -> float:
+    start = time.perf_counter()
+    for sender, recipients, body in messages:
+        with smtplib.SMTP(host, port) as server:
+            server.login('user', 'pass')
+            server.sendmail(sender, recipients, body)
+    return time.perf_counter() - start
+
+def run_pooled(host: str, port: int, messages, batch_size: int) -> float:
+    pool = SMTPPool(host, port, 'user', 'pass', starttls=False)
+    start = time.perf_counter()
+    for i in range(0, len(messages), batch_size):
+        errors = [e for e in pool.send_batch(messages[i:i + batch_size]) if e is not None]
+        if errors:
+            raise errors[0]
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--handshake-delay', type=float, default=0.05,
+                        help='simulated TLS + auth cost per connection (seconds)')
+    args = parser.parse_args()
+
+    messages = _messages(args.messages)
+    with SMTPStub(handshake_delay=args.handshake_delay) as stub:
+        host, port = stub.address
+        fresh = run_fresh(host, port, messages)
+        fresh_connections = stub.connections
+        pooled = run_pooled(host, port, messages, args.batch_size)
+        pooled_connections = stub.connections - fresh_connections
+
+    print(f"fresh:  {args.messages / fresh:8.1f} msg/s  ({fresh_connections} connections)")
+    print(f"pooled: {args.messages / pooled:8.1f} msg/s  ({pooled_connections} connections)")
+
+if __name__ == '__main__':
+    main()